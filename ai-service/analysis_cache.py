@@ -0,0 +1,91 @@
+"""
+音频分析结果缓存模块
+按文件身份（设备号+inode+大小+修改时间）缓存验证结果、预处理输出和特征，
+同一文件在上传、训练各阶段只分析一次
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Any
+
+FileKey = Tuple[int, int, int, int, str]
+
+
+class AudioAnalysisCache:
+    """音频分析缓存"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[FileKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_key(file_path: str) -> Optional[FileKey]:
+        """生成文件身份键，文件不存在时返回None"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        suffix = os.path.splitext(file_path)[1].lower()
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, suffix)
+
+    def get(self, file_path: str, field: str) -> Optional[Any]:
+        """读取缓存字段"""
+        key = self.file_key(file_path)
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or field not in entry:
+                self.misses += 1
+                return None
+
+            value = entry[field]
+            # 预处理输出可能已被清理
+            if field == "preprocessed_path" and not os.path.exists(value):
+                del entry[field]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, file_path: str, field: str, value: Any):
+        """写入缓存字段"""
+        key = self.file_key(file_path)
+        if key is None:
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {}
+                self._entries[key] = entry
+            entry[field] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, file_path: str):
+        """删除文件对应的全部缓存"""
+        key = self.file_key(file_path)
+        if key is None:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计信息"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,359 @@
+"""
+音频文件头解析模块
+纯Python读取WAV/FLAC/OGG/MP3/M4A的时长、采样率和声道数，只读取文件头（及必要的尾部/索引）
+"""
+
+import os
+import struct
+from typing import Optional, Dict, Iterator, Tuple, BinaryIO
+
+# 文件头读取长度
+HEAD_SIZE = 64 * 1024
+# OGG末页查找范围
+OGG_TAIL_SIZE = 64 * 1024
+# M4A moov原子的最大读取长度
+MAX_MOOV_SIZE = 16 * 1024 * 1024
+
+
+def probe_audio(file_path: str) -> Optional[Dict]:
+    """
+    解析音频文件信息
+
+    Returns:
+        {'duration', 'sample_rate', 'channels', 'format'}，无法识别时返回None
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, "rb") as f:
+            head = f.read(HEAD_SIZE)
+
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _probe_wav(f, file_size)
+            if head[:4] == b"OggS":
+                return _probe_ogg(f, head, file_size)
+            if head[4:8] == b"ftyp":
+                return _probe_mp4(f, file_size)
+
+            audio_start = _id3v2_size(head)
+            if head[audio_start:audio_start + 4] == b"fLaC":
+                return _probe_flac(head, audio_start)
+            if audio_start > len(head) - 4:
+                # ID3标签较大，重新定位到音频数据
+                f.seek(audio_start)
+                head = head[:audio_start] + f.read(HEAD_SIZE)
+                if head[audio_start:audio_start + 4] == b"fLaC":
+                    return _probe_flac(head, audio_start)
+            return _probe_mp3(f, head, audio_start, file_size)
+
+    except (OSError, struct.error, ValueError, IndexError, ZeroDivisionError):
+        return None
+
+
+def _result(duration: float, sample_rate: int, channels: int, fmt: str) -> Optional[Dict]:
+    if sample_rate <= 0 or channels <= 0 or duration < 0:
+        return None
+    return {
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "format": fmt
+    }
+
+
+# ==================== WAV ====================
+
+def _probe_wav(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    """遍历RIFF块，读取fmt和data块大小"""
+    offset = 12
+    fmt = None
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        body_start = offset + 8
+
+        if chunk_id == b"fmt ":
+            fmt = f.read(min(chunk_size, 40))
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            _, channels, sample_rate, _, block_align = struct.unpack_from("<HHIIH", fmt, 0)
+            # 流式写入的WAV数据长度可能为占位值
+            data_size = min(chunk_size, file_size - body_start)
+            if block_align == 0:
+                return None
+            frames = data_size // block_align
+            return _result(frames / sample_rate, sample_rate, channels, "wav")
+
+        offset = body_start + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+# ==================== FLAC ====================
+
+def _probe_flac(head: bytes, start: int) -> Optional[Dict]:
+    """读取STREAMINFO元数据块"""
+    block_start = start + 4
+    block_type = head[block_start] & 0x7F
+    if block_type != 0:
+        return None
+
+    info = head[block_start + 4:block_start + 4 + 34]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+
+    duration = total_samples / sample_rate if sample_rate else 0.0
+    return _result(duration, sample_rate, channels, "flac")
+
+
+# ==================== OGG ====================
+
+def _probe_ogg(f: BinaryIO, head: bytes, file_size: int) -> Optional[Dict]:
+    """从首页识别编码参数，从末页读取granule位置计算时长"""
+    segment_count = head[26]
+    packet = head[27 + segment_count:]
+
+    pre_skip = 0
+    if packet[:7] == b"\x01vorbis":
+        channels = packet[11]
+        sample_rate = struct.unpack_from("<I", packet, 12)[0]
+        granule_rate = sample_rate
+        fmt = "ogg"
+    elif packet[:8] == b"OpusHead":
+        channels = packet[9]
+        pre_skip = struct.unpack_from("<H", packet, 10)[0]
+        sample_rate = struct.unpack_from("<I", packet, 12)[0] or 48000
+        # Opus的granule始终以48kHz计
+        granule_rate = 48000
+        fmt = "opus"
+    else:
+        return None
+
+    serial = head[14:18]
+    tail_start = max(0, file_size - OGG_TAIL_SIZE)
+    f.seek(tail_start)
+    tail = f.read()
+
+    granule = -1
+    position = len(tail)
+    while granule < 0:
+        position = tail.rfind(b"OggS", 0, position)
+        if position < 0 or position + 27 > len(tail):
+            break
+        if tail[position + 14:position + 18] == serial:
+            granule = struct.unpack_from("<q", tail, position + 6)[0]
+
+    if granule < 0:
+        return None
+
+    duration = max(0, granule - pre_skip) / granule_rate
+    return _result(duration, sample_rate, channels, fmt)
+
+
+# ==================== MP3 ====================
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+_MP3_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+def _id3v2_size(head: bytes) -> int:
+    """ID3v2标签长度（无标签时为0）"""
+    if head[:3] != b"ID3" or len(head) < 10:
+        return 0
+    size = 0
+    for byte in head[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _parse_mp3_header(header: int) -> Optional[Tuple]:
+    """解析帧头，返回(版本, 层, 比特率kbps, 采样率, 声道数, 帧长度, 每帧采样数)"""
+    if (header >> 21) & 0x7FF != 0x7FF:
+        return None
+
+    version = {0: 2.5, 2: 2, 3: 1}.get((header >> 19) & 0x3)
+    layer = {1: 3, 2: 2, 3: 1}.get((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    padding = (header >> 9) & 0x1
+    channels = 1 if ((header >> 6) & 0x3) == 3 else 2
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+
+    if layer == 1:
+        samples_per_frame = 384
+        frame_length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples_per_frame = 1152 if (layer == 2 or version == 1) else 576
+        frame_length = samples_per_frame // 8 * bitrate * 1000 // sample_rate + padding
+
+    return version, layer, bitrate, sample_rate, channels, frame_length, samples_per_frame
+
+
+def _confirm_next_mp3_frame(f: BinaryIO, head: bytes, next_position: int, frame: Tuple) -> bool:
+    """校验下一帧帧头（超出已读缓冲时从文件补读），版本/层/采样率需与首帧一致，避免误判"""
+    if next_position + 4 <= len(head):
+        data = head[next_position:next_position + 4]
+    else:
+        f.seek(next_position)
+        data = f.read(4)
+    if len(data) < 4:
+        return False
+    next_frame = _parse_mp3_header(struct.unpack(">I", data)[0])
+    return next_frame is not None and next_frame[:2] == frame[:2] and next_frame[3] == frame[3]
+
+
+def _probe_mp3(f: BinaryIO, head: bytes, audio_start: int, file_size: int) -> Optional[Dict]:
+    """定位首个有效帧，优先读取Xing/Info/VBRI帧数，否则按CBR估算"""
+    position = audio_start
+    frame = None
+    while position + 4 <= len(head):
+        position = head.find(b"\xff", position)
+        if position < 0 or position + 4 > len(head):
+            return None
+        frame = _parse_mp3_header(struct.unpack_from(">I", head, position)[0])
+        if frame and _confirm_next_mp3_frame(f, head, position + frame[5], frame):
+            break
+        frame = None
+        position += 1
+
+    if frame is None:
+        return None
+
+    version, layer, bitrate, sample_rate, channels, frame_length, samples_per_frame = frame
+
+    # Xing/Info头位于side information之后
+    if version == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing_offset = position + 4 + side_info
+    tag = head[xing_offset:xing_offset + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", head, xing_offset + 4)[0]
+        if flags & 0x1:
+            frames = struct.unpack_from(">I", head, xing_offset + 8)[0]
+            return _result(frames * samples_per_frame / sample_rate, sample_rate, channels, "mp3")
+
+    vbri_offset = position + 4 + 32
+    if head[vbri_offset:vbri_offset + 4] == b"VBRI":
+        frames = struct.unpack_from(">I", head, vbri_offset + 14)[0]
+        return _result(frames * samples_per_frame / sample_rate, sample_rate, channels, "mp3")
+
+    # CBR：按音频数据长度估算
+    audio_bytes = file_size - position
+    f.seek(max(0, file_size - 128))
+    if f.read(3) == b"TAG":
+        audio_bytes -= 128
+    duration = audio_bytes * 8 / (bitrate * 1000)
+    return _result(duration, sample_rate, channels, "mp3")
+
+
+# ==================== M4A / MP4 ====================
+
+def _iter_atoms(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """遍历原子，返回(类型, 内容起始, 内容结束)"""
+    offset = start
+    while offset + 8 <= end:
+        size, atom_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield atom_type, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _find_atom(data: bytes, start: int, end: int, path: Tuple[bytes, ...]) -> Optional[Tuple[int, int]]:
+    for atom_type, body_start, body_end in _iter_atoms(data, start, end):
+        if atom_type == path[0]:
+            if len(path) == 1:
+                return body_start, body_end
+            return _find_atom(data, body_start, body_end, path[1:])
+    return None
+
+
+def _read_moov(f: BinaryIO, file_size: int) -> Optional[bytes]:
+    """按顶层原子跳转定位moov（可能位于文件末尾）"""
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, atom_type = struct.unpack_from(">I4s", header, 0)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return None
+
+        if atom_type == b"moov":
+            if size > MAX_MOOV_SIZE:
+                return None
+            f.seek(offset + header_size)
+            return f.read(size - header_size)
+
+        offset += size
+
+    return None
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    """读取moov中音频轨道的mdhd时长和stsd采样参数"""
+    moov = _read_moov(f, file_size)
+    if moov is None:
+        return None
+
+    for atom_type, trak_start, trak_end in _iter_atoms(moov, 0, len(moov)):
+        if atom_type != b"trak":
+            continue
+
+        hdlr = _find_atom(moov, trak_start, trak_end, (b"mdia", b"hdlr"))
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+
+        mdhd = _find_atom(moov, trak_start, trak_end, (b"mdia", b"mdhd"))
+        stsd = _find_atom(moov, trak_start, trak_end, (b"mdia", b"minf", b"stbl", b"stsd"))
+        if not mdhd or not stsd:
+            continue
+
+        mdhd_start = mdhd[0]
+        if moov[mdhd_start] == 1:
+            timescale, duration = struct.unpack_from(">IQ", moov, mdhd_start + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, mdhd_start + 12)
+
+        # stsd: 版本/标志(4) 条目数(4) 条目头(8) 保留(6) 数据引用(2) 音频条目...
+        entry = stsd[0] + 8 + 8 + 8
+        channels = struct.unpack_from(">H", moov, entry + 8)[0]
+        sample_rate = struct.unpack_from(">I", moov, entry + 16)[0] >> 16
+        if not sample_rate:
+            sample_rate = timescale
+
+        return _result(duration / timescale if timescale else 0.0, sample_rate, channels, "m4a")
+
+    return None
@@ -12,19 +12,79 @@ import wave
 import struct
 import math
 
+import pcm
+from audio_probe import probe_audio
+from analysis_cache import AudioAnalysisCache
+from feature_extraction import extract_wav_features
+from executors import run_cpu, run_io
+
+def convert_wav_file(input_path: str, output_path: str, sample_rate: int, channels: int) -> bool:
+    """进程内转换WAV（CPU密集，异步场景在CPU进程池中执行），失败时返回False"""
+    try:
+        return pcm.convert_wav(input_path, output_path, sample_rate=sample_rate, channels=channels)
+    except Exception as e:
+        print(f"WAV进程内转换失败，改用ffmpeg: {str(e)}")
+        return False
+
+
+def _preprocess_with_ffmpeg(input_path: str, output_path: str, sample_rate: int, channels: int) -> bool:
+    """使用ffmpeg解码并转换压缩格式"""
+    try:
+        cmd = [
+            'ffmpeg', '-i', input_path,
+            '-ar', str(sample_rate),      # 设置采样率
+            '-ac', str(channels),         # 设置声道数
+            '-acodec', 'pcm_s16le',       # 设置编码格式
+            '-y',                         # 覆盖输出文件
+            output_path
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        
+        if result.returncode == 0:
+            return True
+        else:
+            print(f"音频预处理失败: {result.stderr}")
+            return False
+            
+    except subprocess.TimeoutExpired:
+        print("音频预处理超时")
+        return False
+    except Exception as e:
+        print(f"音频预处理异常: {str(e)}")
+        # 如果ffmpeg不可用，尝试简单的复制
+        try:
+            import shutil
+            shutil.copy2(input_path, output_path)
+            return True
+        except Exception:
+            return False
+
+
 class AudioProcessor:
     """音频处理器"""
     
-    def __init__(self):
+    def __init__(self, analysis_cache: Optional[AudioAnalysisCache] = None):
         self.supported_formats = ['.wav', '.mp3', '.m4a', '.flac', '.ogg']
         self.target_sample_rate = 22050  # MockingBird推荐的采样率
         self.target_channels = 1  # 单声道
+        self.analysis_cache = analysis_cache or AudioAnalysisCache()
         
     def validate_audio_file(self, file_path: str) -> Dict[str, any]:
         """
         验证音频文件
-        返回音频信息或错误信息
+        返回音频信息或错误信息，同一文件只验证一次
         """
+        cached = self.analysis_cache.get(str(file_path), "validation")
+        if cached is not None:
+            return cached
+        
+        result = self._validate_audio_file(file_path)
+        self.analysis_cache.set(str(file_path), "validation", result)
+        return result
+    
+    def _validate_audio_file(self, file_path: str) -> Dict[str, any]:
+        """验证音频文件（不使用缓存）"""
         try:
             file_path = Path(file_path)
             
@@ -70,6 +130,19 @@ class AudioProcessor:
     
     def _get_audio_info(self, file_path: str) -> Optional[Dict]:
         """获取音频文件信息"""
+        # 优先在进程内解析文件头
+        info = probe_audio(file_path)
+        if info:
+            return {
+                'duration': info['duration'],
+                'sample_rate': info['sample_rate'],
+                'channels': info['channels']
+            }
+        
+        return self._get_audio_info_ffprobe(file_path)
+    
+    def _get_audio_info_ffprobe(self, file_path: str) -> Optional[Dict]:
+        """使用ffprobe获取音频文件信息（文件头无法解析时的回退方案）"""
         try:
             # 使用ffprobe获取音频信息
             cmd = [
@@ -126,79 +199,101 @@ class AudioProcessor:
     def preprocess_audio(self, input_path: str, output_path: str) -> bool:
         """
         预处理音频文件
-        转换为MockingBird需要的格式
+        转换为MockingBird需要的格式：WAV直接在进程内转换，其他格式（或进程内转换失败时）使用ffmpeg
         """
-        try:
-            # 使用ffmpeg进行音频预处理
-            cmd = [
-                'ffmpeg', '-i', input_path,
-                '-ar', str(self.target_sample_rate),  # 设置采样率
-                '-ac', str(self.target_channels),     # 设置声道数
-                '-acodec', 'pcm_s16le',              # 设置编码格式
-                '-y',                                # 覆盖输出文件
-                output_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return True
-            else:
-                print(f"音频预处理失败: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("音频预处理超时")
-            return False
-        except Exception as e:
-            print(f"音频预处理异常: {str(e)}")
-            # 如果ffmpeg不可用，尝试简单的复制
-            try:
-                import shutil
-                shutil.copy2(input_path, output_path)
-                return True
-            except Exception:
-                return False
+        args = (input_path, output_path, self.target_sample_rate, self.target_channels)
+        if pcm.is_wav_file(input_path) and convert_wav_file(*args):
+            return True
+        return _preprocess_with_ffmpeg(*args)
+    
+    async def preprocess_audio_async(self, input_path: str, output_path: str) -> bool:
+        """
+        异步预处理音频文件
+        WAV重采样在CPU进程池中执行，ffmpeg子进程在I/O线程池中等待，不占用CPU进程池
+        """
+        args = (input_path, output_path, self.target_sample_rate, self.target_channels)
+        if pcm.is_wav_file(input_path) and await run_cpu(convert_wav_file, *args):
+            return True
+        return await run_io(_preprocess_with_ffmpeg, *args)
     
     def extract_features(self, audio_path: str) -> Optional[Dict]:
         """
         提取音频特征
-        为声音克隆做准备
+        为声音克隆做准备，同一文件只提取一次
+        """
+        cached, audio_info = self._lookup_features(audio_path)
+        if audio_info is None:
+            return cached
+        
+        try:
+            signal_features = extract_wav_features(audio_path) if pcm.is_wav_file(audio_path) else None
+        except Exception as e:
+            print(f"特征提取失败: {str(e)}")
+            return None
+        return self._store_features(audio_path, audio_info, signal_features)
+    
+    async def extract_features_async(self, audio_path: str) -> Optional[Dict]:
         """
+        异步提取音频特征
+        分析缓存在本进程中读写，只有信号分析交给CPU进程池
+        """
+        cached, audio_info = self._lookup_features(audio_path)
+        if audio_info is None:
+            return cached
+        
         try:
-            # 这里应该集成真实的特征提取算法
-            # 目前返回模拟数据
-            validation_result = self.validate_audio_file(audio_path)
-            
-            if not validation_result["valid"]:
-                return None
-            
-            audio_info = validation_result["info"]
-            
-            # 模拟特征提取
-            features = {
-                "mfcc": [0.1, 0.2, 0.3] * 13,  # 模拟MFCC特征
-                "pitch": {
-                    "mean": 150.0,
-                    "std": 20.0,
-                    "min": 100.0,
-                    "max": 200.0
-                },
-                "energy": {
-                    "mean": 0.5,
-                    "std": 0.1
-                },
-                "duration": audio_info["duration"],
-                "quality_score": self._calculate_quality_score(audio_info)
-            }
-            
-            return features
-            
+            signal_features = None
+            if pcm.is_wav_file(audio_path):
+                signal_features = await run_cpu(extract_wav_features, audio_path)
         except Exception as e:
             print(f"特征提取失败: {str(e)}")
             return None
+        return self._store_features(audio_path, audio_info, signal_features)
+    
+    def _lookup_features(self, audio_path: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        查询特征缓存
+
+        Returns:
+            (缓存的特征, None)；未命中时为 (None, 通过验证的音频信息)，验证失败时两者均为None
+        """
+        cached = self.analysis_cache.get(audio_path, "features")
+        if cached is not None:
+            return cached, None
+        return None, self._get_valid_audio_info(audio_path)
+    
+    def _store_features(self, audio_path: str, audio_info: Dict,
+                        signal_features: Optional[Dict]) -> Dict:
+        """合并特征并写入缓存"""
+        features = self._assemble_features(audio_info, signal_features)
+        self.analysis_cache.set(audio_path, "features", features)
+        return features
+    
+    def _get_valid_audio_info(self, audio_path: str) -> Optional[Dict]:
+        """返回通过验证的音频信息，验证失败返回None"""
+        validation_result = self.validate_audio_file(audio_path)
+        if not validation_result["valid"]:
+            return None
+        return validation_result["info"]
     
-    def _calculate_quality_score(self, audio_info: Dict) -> float:
+    def _assemble_features(self, audio_info: Dict, signal_features: Optional[Dict]) -> Dict:
+        """合并信号特征与文件信息并计算质量分数"""
+        if signal_features is None:
+            # 无法在进程内解码（如ffmpeg不可用时的压缩格式），仅根据文件信息评分
+            return {
+                "mfcc": [],
+                "pitch": {},
+                "energy": {},
+                "duration": audio_info["duration"],
+                "quality_score": self._calculate_quality_score(audio_info)
+            }
+        
+        features = dict(signal_features)
+        features["duration"] = audio_info["duration"]
+        features["quality_score"] = self._calculate_quality_score(audio_info, features)
+        return features
+    
+    def _calculate_quality_score(self, audio_info: Dict, features: Optional[Dict] = None) -> float:
         """计算音频质量分数 (0-1)"""
         score = 1.0
         
@@ -221,6 +316,15 @@ class AudioProcessor:
         if channels > 2:
             score *= 0.9
         
+        # 根据信号特征评分
+        if features:
+            if features.get("snr_db", 0) < 10:
+                score *= 0.85
+            if features.get("voiced_ratio", 0) < 0.2:
+                score *= 0.8
+            if features.get("clipping_ratio", 0) > 0.01:
+                score *= 0.9
+        
         return min(1.0, max(0.0, score))
     
     def create_temp_file(self, suffix: str = '.wav') -> str:
@@ -0,0 +1,169 @@
+"""
+任务回调模块
+任务状态变化时向调用方提供的回调地址POST事件（HMAC-SHA256签名，失败重试），
+取代调用方对状态接口的轮询
+"""
+
+import os
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+# 回调配置
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET", "")
+CALLBACK_TIMEOUT = float(os.getenv("CALLBACK_TIMEOUT", "5"))
+CALLBACK_MAX_RETRIES = int(os.getenv("CALLBACK_MAX_RETRIES", "5"))
+# 允许回调的目标主机（逗号分隔，hostname 或 hostname:port），通常只配置后端服务地址；
+# 回调地址由调用方提交，不限制目标时可被用来让本服务向任意内网地址发请求
+CALLBACK_ALLOWED_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+# 重试退避基数（秒），第n次重试等待 base * 2^(n-1)
+CALLBACK_RETRY_BASE = 0.5
+
+# 可重试的4xx状态码：超时、冲突（接收方尚未登记该任务）、限流；其余4xx重试也不会成功
+RETRYABLE_STATUS_CODES = (408, 409, 425, 429)
+
+SIGNATURE_HEADER = "X-Callback-Signature"
+TIMESTAMP_HEADER = "X-Callback-Timestamp"
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """对 "时间戳.请求体" 计算HMAC-SHA256签名"""
+    message = timestamp.encode("ascii") + b"." + body
+    return "sha256=" + hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def callbacks_enabled() -> bool:
+    """配置了签名密钥和目标主机白名单时才发送回调"""
+    return bool(CALLBACK_SECRET and CALLBACK_ALLOWED_HOSTS)
+
+
+def is_valid_callback_url(url: Optional[str]) -> bool:
+    """回调地址只允许http/https，且主机在CALLBACK_ALLOWED_HOSTS白名单内"""
+    if not url:
+        return False
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False
+    if parsed.username or parsed.password:
+        return False
+
+    hostname = parsed.hostname.lower()
+    host_port = f"{hostname}:{parsed.port}" if parsed.port else hostname
+    return hostname in CALLBACK_ALLOWED_HOSTS or host_port in CALLBACK_ALLOWED_HOSTS
+
+
+class CallbackDispatcher:
+    """
+    回调分发器
+
+    每个任务同一时刻只有一个投递在进行；投递期间的新事件只保留最新一条，
+    进度更新会被合并，终态事件总是最后送达
+    """
+
+    def __init__(self, secret: str = CALLBACK_SECRET, timeout: float = CALLBACK_TIMEOUT,
+                 max_retries: int = CALLBACK_MAX_RETRIES):
+        self.secret = secret
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: Dict[str, Tuple[str, Dict]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.superseded = 0
+
+        if not callbacks_enabled():
+            print("⚠️ 未配置CALLBACK_SECRET或CALLBACK_ALLOWED_HOSTS，任务回调已禁用")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    def notify(self, task_id: str, url: str, payload: Dict):
+        """登记任务事件并在后台投递（须在事件循环线程中调用）"""
+        # 不发送未签名的回调
+        if not self.secret:
+            return
+        if task_id in self._pending:
+            self.superseded += 1
+        self._pending[task_id] = (url, payload)
+
+        if task_id not in self._workers:
+            self._workers[task_id] = asyncio.create_task(self._drain(task_id))
+
+    async def _drain(self, task_id: str):
+        try:
+            while task_id in self._pending:
+                url, payload = self._pending.pop(task_id)
+                await self._deliver(task_id, url, payload)
+        finally:
+            self._workers.pop(task_id, None)
+
+    async def _deliver(self, task_id: str, url: str, payload: Dict) -> bool:
+        """投递一条事件，失败时指数退避重试"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                # 已有更新的事件待投递时放弃重试旧事件
+                if task_id in self._pending:
+                    self.superseded += 1
+                    return False
+                self.retries += 1
+                await asyncio.sleep(CALLBACK_RETRY_BASE * 2 ** (attempt - 1))
+
+            timestamp = str(int(time.time()))
+            headers = {
+                "Content-Type": "application/json",
+                TIMESTAMP_HEADER: timestamp,
+                SIGNATURE_HEADER: sign_payload(self.secret, timestamp, body)
+            }
+
+            try:
+                response = await self._get_client().post(url, content=body, headers=headers)
+                if response.status_code < 400:
+                    self.delivered += 1
+                    return True
+                if response.status_code not in RETRYABLE_STATUS_CODES and response.status_code < 500:
+                    break
+            except httpx.HTTPError as e:
+                print(f"任务回调失败 {task_id} (第{attempt + 1}次): {str(e)}")
+
+        self.failed += 1
+        print(f"任务回调放弃 {task_id}: {url}")
+        return False
+
+    async def close(self):
+        """等待进行中的投递结束并关闭HTTP客户端"""
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.wait(workers, timeout=self.timeout)
+        for worker in workers:
+            worker.cancel()
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, int]:
+        """回调统计信息"""
+        return {
+            "in_flight": len(self._workers),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "superseded": self.superseded,
+            "signed": bool(self.secret)
+        }
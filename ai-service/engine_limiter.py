@@ -0,0 +1,70 @@
+"""
+TTS引擎并发限制模块
+每个引擎的合成调用共用一个并发上限，超出上限的请求排队等待，
+避免同时启动过多子进程或网络请求
+
+只限制并发，不维护常驻的引擎进程：espeak、say、SAPI以及edge-tts命令行
+每次合成仍各启动一个子进程；只有安装了edge-tts库时Edge TTS才在进程内合成
+"""
+
+import asyncio
+from typing import Optional, Dict, Callable, Awaitable
+
+# 引擎执行函数签名: (text, voice_id, output_path, speed, pitch) -> 输出路径或None
+EngineRunner = Callable[[str, str, str, float, float], Awaitable[Optional[str]]]
+
+
+class EngineLimiter:
+    """单个引擎的并发限制器"""
+
+    def __init__(self, engine: str, runner: EngineRunner, concurrency: int = 4):
+        self.engine = engine
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+
+        # 在事件循环中延迟创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        self.waiting = 0
+        self.busy = 0
+
+    async def run(self, text: str, voice_id: str, output_path: str,
+                  speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
+        """执行一次合成，达到并发上限时排队等待"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.busy += 1
+        try:
+            result = await self.runner(text, voice_id, output_path, speed, pitch)
+        except Exception:
+            self.jobs_failed += 1
+            raise
+        finally:
+            self.busy -= 1
+            self._semaphore.release()
+
+        if result:
+            self.jobs_completed += 1
+        else:
+            self.jobs_failed += 1
+        return result
+
+    def stats(self) -> Dict[str, any]:
+        """并发限制统计信息"""
+        return {
+            "engine": self.engine,
+            "concurrency": self.concurrency,
+            "busy": self.busy,
+            "waiting": self.waiting,
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed
+        }
@@ -0,0 +1,149 @@
+"""
+TTS引擎注册表模块
+进程内共享的引擎探测结果：并发探测候选命令，并按PATH与可执行文件修改时间缓存到磁盘
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Dict
+
+try:
+    import edge_tts  # noqa: F401  仅用于判断库是否可用
+    EDGE_TTS_LIBRARY_AVAILABLE = True
+except ImportError:
+    EDGE_TTS_LIBRARY_AVAILABLE = False
+
+# 探测结果缓存文件
+ENGINE_CACHE_FILE = os.getenv(
+    "TTS_ENGINE_CACHE_FILE",
+    str(Path(tempfile.gettempdir()) / "tts_engine_probe.json")
+)
+
+# 单个命令探测超时（秒）
+PROBE_TIMEOUT = 5
+
+_lock = threading.Lock()
+_engines: Optional[List[str]] = None
+
+
+def _candidate_commands(system: str) -> Dict[str, str]:
+    """当前系统需要探测的引擎及其命令"""
+    candidates = {}
+    if system == "linux":
+        candidates["espeak"] = "espeak"
+        candidates["festival"] = "festival"
+    candidates["edge-tts"] = "edge-tts"
+    return candidates
+
+
+def _fingerprint(system: str, candidates: Dict[str, str]) -> str:
+    """根据PATH和各候选可执行文件的位置、修改时间计算指纹"""
+    parts = [system, os.environ.get("PATH", ""), str(EDGE_TTS_LIBRARY_AVAILABLE)]
+    for engine, command in sorted(candidates.items()):
+        resolved = shutil.which(command)
+        mtime = ""
+        if resolved:
+            try:
+                mtime = str(os.stat(resolved).st_mtime_ns)
+            except OSError:
+                pass
+        parts.append(f"{engine}={resolved or ''}@{mtime}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _probe_command(command: str) -> bool:
+    """检查命令是否存在且可执行"""
+    if shutil.which(command) is None:
+        return False
+    try:
+        subprocess.run([command, "--help"],
+                       capture_output=True,
+                       timeout=PROBE_TIMEOUT)
+        return True
+    except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError, subprocess.CalledProcessError):
+        return False
+
+
+def _load_cached(fingerprint: str) -> Optional[List[str]]:
+    try:
+        with open(ENGINE_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("fingerprint") == fingerprint:
+            return list(data.get("engines", []))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_cached(fingerprint: str, engines: List[str]):
+    temp_path = f"{ENGINE_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "engines": engines}, f)
+        os.replace(temp_path, ENGINE_CACHE_FILE)
+    except OSError as e:
+        print(f"保存引擎探测结果失败: {str(e)}")
+
+
+def _detect(system: str) -> List[str]:
+    """探测可用引擎（优先读取磁盘缓存）"""
+    candidates = _candidate_commands(system)
+    fingerprint = _fingerprint(system, candidates)
+
+    cached = _load_cached(fingerprint)
+    if cached is not None:
+        return cached
+
+    # 并发探测所有候选命令
+    with ThreadPoolExecutor(max_workers=max(1, len(candidates))) as executor:
+        results = dict(zip(candidates, executor.map(_probe_command, candidates.values())))
+
+    engines = []
+
+    # 检测系统TTS
+    if system == "windows":
+        engines.append("sapi")
+    elif system == "darwin":  # macOS
+        engines.append("say")
+    elif system == "linux":
+        if results.get("espeak"):
+            engines.append("espeak")
+        if results.get("festival"):
+            engines.append("festival")
+
+    # 检测edge-tts (如果安装了库或命令行)
+    if EDGE_TTS_LIBRARY_AVAILABLE or results.get("edge-tts"):
+        engines.append("edge-tts")
+
+    _save_cached(fingerprint, engines)
+    return engines
+
+
+def get_available_engines() -> List[str]:
+    """获取可用引擎列表，进程内只探测一次"""
+    global _engines
+    if _engines is None:
+        with _lock:
+            if _engines is None:
+                _engines = _detect(platform.system().lower())
+    return list(_engines)
+
+
+def refresh_available_engines() -> List[str]:
+    """忽略缓存重新探测（安装或卸载引擎后调用）"""
+    global _engines
+    with _lock:
+        try:
+            os.unlink(ENGINE_CACHE_FILE)
+        except OSError:
+            pass
+        _engines = _detect(platform.system().lower())
+    return list(_engines)
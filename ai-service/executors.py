@@ -0,0 +1,76 @@
+"""
+执行器模块
+CPU密集型任务（特征提取、重采样、音频拼接）交给独立进程池，
+阻塞I/O（子进程调用、文件读写）交给独立线程池，避免阻塞事件循环
+"""
+
+import os
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Callable, Any, Dict
+
+# 执行器配置
+AI_CPU_WORKERS = int(os.getenv("AI_CPU_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+AI_IO_WORKERS = int(os.getenv("AI_IO_WORKERS", "8"))
+
+_cpu_executor: Optional[Executor] = None
+_io_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_cpu_executor() -> Executor:
+    """获取CPU进程池（延迟创建）"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        try:
+            # 使用spawn避免fork时复制事件循环和线程状态
+            _cpu_executor = ProcessPoolExecutor(
+                max_workers=AI_CPU_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        except (OSError, NotImplementedError) as e:
+            print(f"⚠️ 无法创建进程池，CPU任务改用线程池: {str(e)}")
+            _cpu_executor = ThreadPoolExecutor(max_workers=AI_CPU_WORKERS, thread_name_prefix="cpu")
+    return _cpu_executor
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """获取I/O线程池（延迟创建）"""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=AI_IO_WORKERS, thread_name_prefix="io")
+    return _io_executor
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """在进程池中执行CPU密集型函数（函数和参数须可序列化）"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """在线程池中执行阻塞I/O函数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = True):
+    """关闭执行器（应用关闭时调用）"""
+    global _cpu_executor, _io_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=wait)
+        _cpu_executor = None
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=wait)
+        _io_executor = None
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """执行器配置和状态"""
+    return {
+        "cpu_workers": AI_CPU_WORKERS,
+        "cpu_executor": type(_cpu_executor).__name__ if _cpu_executor else None,
+        "io_workers": AI_IO_WORKERS,
+        "io_executor_started": _io_executor is not None
+    }
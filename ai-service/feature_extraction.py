@@ -0,0 +1,263 @@
+"""
+音频特征提取模块
+基于NumPy的批量计算：STFT、梅尔滤波器组、MFCC、YIN基频、RMS能量
+WAV文件按固定长度分块读取和分析，MFCC和削波统计逐块累加；
+采样和STFT中间结果的内存占用只与块长度有关，
+只有逐帧的基频和能量（每帧移8字节，用于分位数统计）随音频时长增长
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+import pcm
+
+# 分析参数
+FRAME_LENGTH = 1024
+HOP_LENGTH = 256
+N_MELS = 40
+N_MFCC = 13
+PITCH_MIN_HZ = 60.0
+PITCH_MAX_HZ = 500.0
+YIN_THRESHOLD = 0.15
+# 单次处理的块长度（秒）
+BLOCK_SECONDS = 10.0
+
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """构造三角梅尔滤波器组，形状为(n_mels, n_fft//2+1)"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2.0), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for index in range(n_mels):
+        left, center, right = bins[index], bins[index + 1], bins[index + 2]
+        if center > left:
+            filters[index, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[index, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """正交DCT-II矩阵，形状为(n_mfcc, n_mels)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, np.newaxis]
+    matrix = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+@lru_cache(maxsize=4)
+def _window(length: int) -> np.ndarray:
+    return np.hanning(length).astype(np.float32)
+
+
+def _frame(signal: np.ndarray) -> np.ndarray:
+    """切分为重叠帧，形状为(帧数, FRAME_LENGTH)，不复制数据"""
+    if len(signal) < FRAME_LENGTH:
+        signal = np.pad(signal, (0, FRAME_LENGTH - len(signal)))
+    frames = np.lib.stride_tricks.sliding_window_view(signal, FRAME_LENGTH)
+    return frames[::HOP_LENGTH]
+
+
+def _mfcc(frames: np.ndarray, sample_rate: int) -> np.ndarray:
+    """计算MFCC，形状为(帧数, N_MFCC)"""
+    spectrum = np.fft.rfft(frames * _window(FRAME_LENGTH), axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32) / FRAME_LENGTH
+    mel = power @ _mel_filterbank(sample_rate, FRAME_LENGTH, N_MELS).T
+    log_mel = np.log(mel + 1e-10)
+    return log_mel @ _dct_matrix(N_MFCC, N_MELS).T
+
+
+def _yin(frames: np.ndarray, sample_rate: int) -> np.ndarray:
+    """YIN基频估计，返回每帧基频（Hz），清音帧为0"""
+    window = FRAME_LENGTH // 2
+    tau_min = max(2, int(sample_rate / PITCH_MAX_HZ))
+    tau_max = min(window - 1, int(sample_rate / PITCH_MIN_HZ))
+
+    # 差分函数 d(τ) = Σ(x_j - x_{j+τ})²，用FFT互相关批量计算
+    n_fft = 2 * FRAME_LENGTH
+    spectrum = np.fft.rfft(frames, n_fft, axis=1)
+    head_spectrum = np.fft.rfft(frames[:, :window], n_fft, axis=1)
+    correlation = np.fft.irfft(spectrum * np.conj(head_spectrum), n_fft, axis=1)[:, :window]
+
+    squares = np.cumsum(np.pad(frames.astype(np.float64) ** 2, ((0, 0), (1, 0))), axis=1)
+    energy_head = squares[:, window][:, np.newaxis]
+    taus = np.arange(window)
+    energy_shifted = squares[:, taus + window] - squares[:, taus]
+    difference = np.maximum(energy_head + energy_shifted - 2.0 * correlation, 0.0)
+
+    # 累积均值归一化
+    cumulative = np.cumsum(difference[:, 1:], axis=1)
+    normalized = np.ones_like(difference)
+    normalized[:, 1:] = difference[:, 1:] * taus[1:] / np.maximum(cumulative, 1e-12)
+
+    search = normalized[:, tau_min:tau_max]
+    below = search < YIN_THRESHOLD
+    voiced = below.any(axis=1)
+    candidate = np.argmax(below, axis=1)
+
+    # 向后移动到局部最小值
+    rows = np.arange(len(search))
+    for _ in range(tau_max - tau_min):
+        next_index = np.minimum(candidate + 1, search.shape[1] - 1)
+        improving = search[rows, next_index] < search[rows, candidate]
+        if not improving.any():
+            break
+        candidate = np.where(improving, next_index, candidate)
+
+    # 抛物线插值提高精度
+    tau = (candidate + tau_min).astype(np.float64)
+    left = normalized[rows, np.maximum(candidate + tau_min - 1, 0)]
+    center = normalized[rows, candidate + tau_min]
+    right = normalized[rows, np.minimum(candidate + tau_min + 1, window - 1)]
+    denominator = left - 2.0 * center + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(np.abs(denominator) > 1e-12, 0.5 * (left - right) / denominator, 0.0)
+    tau = tau + np.clip(shift, -1.0, 1.0)
+
+    return np.where(voiced, sample_rate / tau, 0.0)
+
+
+def _analysis_blocks(chunks: Iterable[np.ndarray], block_length: int, overlap: int) -> Iterator[np.ndarray]:
+    """
+    将任意长度的连续采样片段重组为分析块
+
+    每块长block_length+overlap，相邻块重叠overlap个采样，保证帧序列连续；
+    至少输出一块（空音频时为空块）
+    """
+    buffer = np.zeros(0, dtype=np.float32)
+    emitted = False
+    for chunk in chunks:
+        buffer = np.concatenate((buffer, chunk))
+        while len(buffer) >= block_length + overlap:
+            yield buffer[:block_length + overlap]
+            buffer = buffer[block_length:]
+            emitted = True
+
+    # 剩余部分还含有未分析的帧，或尚未输出任何块
+    if len(buffer) > overlap or not emitted:
+        yield buffer
+
+
+def _extract_from_chunks(chunks: Iterable[np.ndarray], sample_rate: int,
+                         block_seconds: float = BLOCK_SECONDS) -> Dict:
+    """对连续的单声道采样片段逐块提取特征"""
+    block_hops = max(1, int(block_seconds * sample_rate) // HOP_LENGTH)
+    block_length = block_hops * HOP_LENGTH
+    # 相邻块重叠(帧长-帧移)个采样，保证帧序列连续
+    overlap = FRAME_LENGTH - HOP_LENGTH
+
+    mfcc_sum = np.zeros(N_MFCC, dtype=np.float64)
+    mfcc_sq_sum = np.zeros(N_MFCC, dtype=np.float64)
+    pitches = []
+    energies = []
+    frame_count = 0
+    sample_count = 0
+    clipped_count = 0
+
+    def counted(chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        # 削波统计在原始片段上累加，不受分析块重叠影响
+        nonlocal sample_count, clipped_count
+        for chunk in chunks:
+            sample_count += len(chunk)
+            clipped_count += int(np.count_nonzero(np.abs(chunk) >= 0.999))
+            yield chunk
+
+    for block in _analysis_blocks(counted(chunks), block_length, overlap):
+        frames = _frame(block)
+
+        mfcc = _mfcc(frames, sample_rate).astype(np.float64)
+        mfcc_sum += mfcc.sum(axis=0)
+        mfcc_sq_sum += (mfcc ** 2).sum(axis=0)
+
+        pitches.append(_yin(frames, sample_rate).astype(np.float32))
+        energies.append(np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1)).astype(np.float32))
+
+        frame_count += len(frames)
+
+    pitch = np.concatenate(pitches)
+    energy = np.concatenate(energies)
+
+    # 只统计有声且非静音的帧
+    voiced_pitch = pitch[(pitch > 0) & (energy > energy.max() * 0.05)] if len(energy) else pitch[:0]
+
+    mfcc_mean = mfcc_sum / frame_count
+    mfcc_std = np.sqrt(np.maximum(mfcc_sq_sum / frame_count - mfcc_mean ** 2, 0.0))
+
+    # 估算信噪比：高能量帧与低能量帧的电平差
+    loud = float(np.percentile(energy, 95)) if len(energy) else 0.0
+    quiet = float(np.percentile(energy, 5)) if len(energy) else 0.0
+    snr_db = 20.0 * np.log10((loud + 1e-5) / (quiet + 1e-5))
+
+    return {
+        "mfcc": [round(float(value), 4) for value in mfcc_mean],
+        "mfcc_std": [round(float(value), 4) for value in mfcc_std],
+        "pitch": _stats(voiced_pitch),
+        "energy": _stats(energy, with_range=False),
+        "voiced_ratio": round(float(len(voiced_pitch)) / max(1, frame_count), 4),
+        "snr_db": round(float(snr_db), 2),
+        "clipping_ratio": round(clipped_count / sample_count, 6) if sample_count else 0.0,
+        "frame_count": frame_count
+    }
+
+
+def extract_features(samples: np.ndarray, sample_rate: int,
+                     block_seconds: float = BLOCK_SECONDS) -> Dict:
+    """
+    提取音频特征
+
+    Args:
+        samples: 单声道float32采样
+        sample_rate: 采样率
+        block_seconds: 分块长度（秒）
+
+    Returns:
+        MFCC均值/标准差、基频统计、能量统计及信号质量指标
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 2:
+        samples = samples.mean(axis=1)
+    return _extract_from_chunks([samples], sample_rate, block_seconds)
+
+
+def extract_wav_features(file_path: str, block_seconds: float = BLOCK_SECONDS) -> Dict:
+    """
+    按块读取WAV文件并提取特征（供进程池调用，只传递文件路径）
+
+    不把整段音频读入内存，每次只解码和分析一个块
+    """
+    with open(file_path, "rb") as f:
+        sample_rate = pcm.read_wav_format(f).sample_rate
+    block_frames = max(1, int(block_seconds * sample_rate))
+    chunks = (pcm.downmix(block, 1)[:, 0] for block in pcm.iter_wav_blocks(file_path, block_frames))
+    return _extract_from_chunks(chunks, sample_rate, block_seconds)
+
+
+def _stats(values: np.ndarray, with_range: bool = True) -> Dict[str, Optional[float]]:
+    if len(values) == 0:
+        result = {"mean": 0.0, "std": 0.0}
+        if with_range:
+            result.update({"min": 0.0, "max": 0.0})
+        return result
+
+    result = {
+        "mean": round(float(np.mean(values)), 4),
+        "std": round(float(np.std(values)), 4)
+    }
+    if with_range:
+        result.update({
+            "min": round(float(np.min(values)), 4),
+            "max": round(float(np.max(values)), 4)
+        })
+    return result
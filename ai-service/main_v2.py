@@ -3,9 +3,9 @@ AI语音服务 - 主服务文件 v2
 集成真实的音频处理和TTS功能
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 import uvicorn
 import os
 import tempfile
@@ -20,6 +20,13 @@ import json
 from audio_processor import AudioProcessor
 from tts_engine import TTSEngine
 from voice_cloning import VoiceCloningService
+from synthesis_cache import SynthesisCache
+from engine_registry import get_available_engines
+from executors import shutdown_executors, get_executor_stats, run_io
+from task_events import TaskEventBus, TERMINAL_STATUSES
+from callbacks import CallbackDispatcher, callbacks_enabled, is_valid_callback_url
+from media_files import serve_audio_file, store_content_addressed
+from task_store import TaskStore
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -42,17 +49,48 @@ UPLOAD_DIR = Path("uploads")
 MODELS_DIR = Path("models")
 AUDIO_OUTPUT_DIR = Path("audio_output")
 TEMP_DIR = Path("temp")
+CACHE_DIR = Path("cache")
 
-for directory in [UPLOAD_DIR, MODELS_DIR, AUDIO_OUTPUT_DIR, TEMP_DIR]:
+for directory in [UPLOAD_DIR, MODELS_DIR, AUDIO_OUTPUT_DIR, TEMP_DIR, CACHE_DIR]:
     directory.mkdir(exist_ok=True)
 
+# 单次合成的最大文本长度（长文本分段并行合成）
+MAX_TEXT_LENGTH = 2000
+
+# 音色样本上传大小限制
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 合成结果缓存配置
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+
 # 初始化服务组件
 audio_processor = AudioProcessor()
-tts_engine = TTSEngine()
-voice_cloning_service = VoiceCloningService(str(MODELS_DIR), str(TEMP_DIR))
+synthesis_cache = SynthesisCache(str(CACHE_DIR / "tts"), max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024)
+tts_engine = TTSEngine(cache=synthesis_cache)
+task_events = TaskEventBus()
+callback_dispatcher = CallbackDispatcher()
+voice_cloning_service = VoiceCloningService(
+    str(MODELS_DIR),
+    str(TEMP_DIR),
+    tts_engine=tts_engine,
+    audio_processor=audio_processor,
+    events=task_events
+)
 
-# 任务存储
-synthesis_tasks = {}
+# 任务存储（已结束的任务保留一段时间后自动淘汰）
+synthesis_tasks = TaskStore(terminal_statuses=TERMINAL_STATUSES)
+
+def _accept_callback_url(callback_url: Optional[str]) -> Optional[str]:
+    """校验调用方提供的回调地址；本服务未启用回调时忽略（调用方退回轮询）"""
+    if not callback_url:
+        return None
+    if not callbacks_enabled():
+        return None
+    if not is_valid_callback_url(callback_url):
+        raise HTTPException(status_code=400, detail="回调地址无效")
+    return callback_url
 
 @app.get("/")
 async def root():
@@ -77,7 +115,18 @@ async def health_check():
             "audio_processor": "available",
             "voice_cloning": "available"
         },
-        "available_tts_engines": tts_engine.available_engines
+        "available_tts_engines": tts_engine.available_engines,
+        "synthesis_cache": synthesis_cache.stats(),
+        "analysis_cache": audio_processor.analysis_cache.stats(),
+        "engine_limits": tts_engine.get_limiter_stats(),
+        "executors": get_executor_stats(),
+        "training_scheduler": voice_cloning_service.get_scheduler_stats(),
+        "task_events": task_events.stats(),
+        "callbacks": callback_dispatcher.stats(),
+        "task_stores": {
+            "synthesis": synthesis_tasks.stats(),
+            "training": voice_cloning_service.training_tasks.stats()
+        }
     }
 
 @app.get("/voices")
@@ -100,16 +149,19 @@ async def synthesize_speech(
     text: str = Form(...),
     voice_id: str = Form("default"),
     speed: float = Form(1.0),
-    pitch: float = Form(1.0)
+    pitch: float = Form(1.0),
+    callback_url: Optional[str] = Form(None)
 ):
-    """语音合成"""
+    """语音合成，可选callback_url在任务状态变化时接收回调"""
     try:
         # 验证输入
         if not text.strip():
             raise HTTPException(status_code=400, detail="文本不能为空")
         
-        if len(text) > 500:
-            raise HTTPException(status_code=400, detail="文本长度不能超过500字符")
+        if len(text) > MAX_TEXT_LENGTH:
+            raise HTTPException(status_code=400, detail=f"文本长度不能超过{MAX_TEXT_LENGTH}字符")
+        
+        callback_url = _accept_callback_url(callback_url)
         
         # 生成任务ID
         task_id = str(uuid.uuid4())
@@ -119,9 +171,12 @@ async def synthesize_speech(
             "id": task_id,
             "text": text,
             "voice_id": voice_id,
+            "speed": speed,
+            "pitch": pitch,
             "status": "processing",
             "progress": 0,
             "audio_url": None,
+            "callback_url": callback_url,
             "created_at": datetime.now().isoformat()
         }
         
@@ -144,33 +199,77 @@ async def synthesize_speech(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"语音合成失败: {str(e)}")
 
+@app.post("/synthesize/stream")
+async def synthesize_speech_stream(
+    text: str = Form(...),
+    voice_id: str = Form("default"),
+    speed: float = Form(1.0),
+    pitch: float = Form(1.0)
+):
+    """流式语音合成 - 按句合成并边合成边返回音频"""
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="文本不能为空")
+    
+    if len(text) > MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"文本长度不能超过{MAX_TEXT_LENGTH}字符")
+    
+    return StreamingResponse(
+        voice_cloning_service.synthesize_stream_with_voice(text, voice_id, speed=speed, pitch=pitch),
+        media_type=tts_engine.stream_media_type(),
+        headers={"Cache-Control": "no-store"}
+    )
+
 @app.get("/synthesize/status/{task_id}")
 async def get_synthesis_status(task_id: str):
     """获取合成任务状态"""
     if task_id not in synthesis_tasks:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    task = synthesis_tasks[task_id]
-    
     return {
         "success": True,
-        "data": {
-            "task_id": task_id,
-            "status": task["status"],
-            "progress": task["progress"],
-            "audio_url": task["audio_url"],
-            "text": task["text"],
-            "voice_id": task["voice_id"],
-            "error": task.get("error")
-        }
+        "data": _synthesis_status_data(task_id, synthesis_tasks[task_id])
     }
 
+@app.get("/synthesize/events/{task_id}")
+async def stream_synthesis_events(task_id: str):
+    """合成任务进度事件流（SSE），状态变化时推送，到达终态后结束"""
+    if task_id not in synthesis_tasks:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    def snapshot():
+        task = synthesis_tasks.get(task_id)
+        return _synthesis_status_data(task_id, task) if task else None
+    
+    return _event_stream_response(task_events.stream(task_id, snapshot))
+
+def _save_upload_file(source, output_path: str, max_bytes: int) -> int:
+    """将上传文件分块复制到磁盘，超过大小限制时抛出ValueError，返回写入字节数"""
+    written = 0
+    with open(output_path, "wb") as f:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                raise ValueError("上传文件过大")
+            f.write(chunk)
+    return written
+
 @app.post("/voice/upload")
 async def upload_voice_sample(
     audio_file: UploadFile = File(...),
-    voice_name: str = Form(...)
+    voice_name: str = Form(...),
+    callback_url: Optional[str] = Form(None),
+    x_callback_url: Optional[str] = Header(None)
 ):
-    """上传音频样本用于声音克隆"""
+    """
+    上传音频样本用于声音克隆
+
+    可选callback_url（表单字段，或由转发原始请求体的代理通过X-Callback-Url请求头传入）
+    在训练状态变化时接收回调
+    """
+    callback_url = callback_url or x_callback_url
     try:
         # 验证文件类型
         if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
@@ -180,14 +279,19 @@ async def upload_voice_sample(
         if not voice_name.strip() or len(voice_name) > 20:
             raise HTTPException(status_code=400, detail="音色名称长度应在1-20字符之间")
         
+        callback_url = _accept_callback_url(callback_url)
+        
         # 保存上传文件
         upload_id = str(uuid.uuid4())
         file_extension = os.path.splitext(audio_file.filename or "audio.wav")[1]
         file_path = UPLOAD_DIR / f"{upload_id}{file_extension}"
         
-        content = await audio_file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # 分块写入磁盘并累计大小，不在内存中保留整个文件
+        try:
+            await run_io(_save_upload_file, audio_file.file, str(file_path), MAX_UPLOAD_BYTES)
+        except ValueError:
+            file_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=413, detail=f"文件大小不能超过{MAX_UPLOAD_MB}MB")
         
         # 验证音频文件
         validation_result = audio_processor.validate_audio_file(str(file_path))
@@ -199,13 +303,15 @@ async def upload_voice_sample(
         # 开始声音训练
         training_result = await voice_cloning_service.start_voice_training(
             str(file_path), 
-            voice_name.strip()
+            voice_name.strip(),
+            callback_url=callback_url
         )
         
         if not training_result["success"]:
             # 删除文件
             file_path.unlink()
-            raise HTTPException(status_code=400, detail=training_result["error"])
+            status_code = 503 if training_result.get("queue_full") else 400
+            raise HTTPException(status_code=status_code, detail=training_result["error"])
         
         return {
             "success": True,
@@ -216,6 +322,7 @@ async def upload_voice_sample(
                 "voice_name": voice_name,
                 "status": "training",
                 "estimated_time": training_result["estimated_time"],
+                "queue_position": training_result["queue_position"],
                 "audio_info": validation_result["info"]
             }
         }
@@ -235,17 +342,35 @@ async def get_training_status(task_id: str):
     
     return {
         "success": True,
-        "data": {
-            "task_id": task_id,
-            "voice_id": task["voice_id"],
-            "voice_name": task["voice_name"],
-            "status": task["status"],
-            "progress": task["progress"],
-            "current_step": task.get("current_step", ""),
-            "created_at": task["created_at"],
-            "completed_at": task.get("completed_at"),
-            "error": task.get("error")
-        }
+        "data": _training_status_data(task_id, task)
+    }
+
+@app.get("/voice/training/events/{task_id}")
+async def stream_training_events(task_id: str):
+    """训练任务进度事件流（SSE），状态变化时推送，到达终态后结束"""
+    if not voice_cloning_service.get_training_status(task_id):
+        raise HTTPException(status_code=404, detail="训练任务不存在")
+    
+    def snapshot():
+        task = voice_cloning_service.get_training_status(task_id)
+        return _training_status_data(task_id, task) if task else None
+    
+    return _event_stream_response(task_events.stream(task_id, snapshot))
+
+@app.delete("/voice/training/{task_id}")
+async def cancel_training(task_id: str):
+    """取消排队中或训练中的任务"""
+    task = voice_cloning_service.get_training_status(task_id)
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="训练任务不存在")
+    
+    if not voice_cloning_service.cancel_training(task_id):
+        raise HTTPException(status_code=409, detail=f"任务当前状态无法取消: {task['status']}")
+    
+    return {
+        "success": True,
+        "message": "训练任务已取消"
     }
 
 @app.delete("/voice/{voice_id}")
@@ -268,16 +393,88 @@ async def delete_voice(voice_id: str):
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @app.get("/audio/{filename}")
-async def get_audio_file(filename: str):
-    """获取音频文件"""
+async def get_audio_file(filename: str, request: Request):
+    """获取音频文件，支持Range分段请求和ETag条件请求"""
     file_path = AUDIO_OUTPUT_DIR / filename
-    if not file_path.exists():
+    try:
+        return await serve_audio_file(request, str(file_path))
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="音频文件不存在")
+
+@app.on_event("startup")
+async def startup_event():
+    """应用启动时在后台线程预热引擎探测，不阻塞服务启动"""
+    asyncio.get_event_loop().run_in_executor(None, get_available_engines)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止训练调度、投递剩余回调并释放执行器"""
+    await voice_cloning_service.scheduler.close()
+    await callback_dispatcher.close()
+    shutdown_executors()
+
+# ==================== 任务状态 ====================
+
+def _synthesis_status_data(task_id: str, task: dict) -> dict:
+    """合成任务状态（状态接口和事件流共用）"""
+    return {
+        "task_id": task_id,
+        "status": task["status"],
+        "progress": task["progress"],
+        "audio_url": task["audio_url"],
+        "text": task["text"],
+        "voice_id": task["voice_id"],
+        "error": task.get("error")
+    }
+
+def _training_status_data(task_id: str, task: dict) -> dict:
+    """训练任务状态（状态接口和事件流共用）"""
+    return {
+        "task_id": task_id,
+        "voice_id": task["voice_id"],
+        "voice_name": task["voice_name"],
+        "status": task["status"],
+        "progress": task["progress"],
+        "current_step": task.get("current_step", ""),
+        "queue_position": task.get("queue_position") if task["status"] == "pending" else None,
+        "created_at": task["created_at"],
+        "completed_at": task.get("completed_at"),
+        "error": task.get("error")
+    }
+
+def _send_task_callback(task_id: str):
+    """任务状态变化时向任务登记的回调地址推送最新状态"""
+    task = synthesis_tasks.get(task_id)
+    if task is not None:
+        task_type = "synthesis"
+        data = _synthesis_status_data(task_id, task)
+    else:
+        task = voice_cloning_service.get_training_status(task_id)
+        if task is None:
+            return
+        task_type = "training"
+        data = _training_status_data(task_id, task)
     
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": f"inline; filename={filename}"}
+    if not task.get("callback_url"):
+        return
+    
+    callback_dispatcher.notify(task_id, task["callback_url"], {
+        "type": task_type,
+        "event": "done" if data["status"] in TERMINAL_STATUSES else "progress",
+        "task_id": task_id,
+        "data": data
+    })
+
+task_events.add_listener(_send_task_callback)
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
     )
 
 # ==================== 异步任务处理 ====================
@@ -289,34 +486,36 @@ async def process_synthesis_task(task_id: str):
         
         # 更新进度
         task["progress"] = 20
+        task_events.publish(task_id)
         
         # 使用声音克隆服务进行合成
         audio_path = await voice_cloning_service.synthesize_with_voice(
             task["text"], 
-            task["voice_id"]
+            task["voice_id"],
+            speed=task.get("speed", 1.0),
+            pitch=task.get("pitch", 1.0)
         )
         
         task["progress"] = 80
+        task_events.publish(task_id)
         
         if audio_path and os.path.exists(audio_path):
-            # 移动文件到输出目录
-            audio_filename = f"synthesis_{task_id}.wav"
-            output_path = AUDIO_OUTPUT_DIR / audio_filename
-            
-            import shutil
-            shutil.move(audio_path, output_path)
+            # 以内容哈希命名移动到输出目录，相同音频只保存一份并可被客户端永久缓存
+            audio_filename = await run_io(store_content_addressed, audio_path, str(AUDIO_OUTPUT_DIR))
             
             # 更新任务状态
             task["status"] = "completed"
             task["progress"] = 100
             task["audio_url"] = f"/audio/{audio_filename}"
             task["completed_at"] = datetime.now().isoformat()
+            task_events.publish(task_id)
         else:
             raise Exception("语音合成失败")
             
     except Exception as e:
         task["status"] = "failed"
         task["error"] = str(e)
+        task_events.publish(task_id)
         print(f"合成任务失败 {task_id}: {str(e)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""
+音频文件响应模块
+按文件头识别实际容器格式，支持Range分段请求（206）、基于内容哈希的强ETag和条件请求，
+内容寻址文件名（内容哈希.扩展名）使用immutable长缓存；
+ASGI服务器支持zerocopysend扩展时零拷贝发送文件
+
+单一来源为 shared/media_files.py，各服务目录下的副本由 scripts/sync_shared_modules.py 同步，请勿直接修改副本
+"""
+
+import os
+import re
+import stat
+import asyncio
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# 内容寻址文件名：64位sha256十六进制摘要 + 扩展名
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+CHUNK_SIZE = 256 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (媒体类型, 扩展名)
+AUDIO_TYPES = {
+    "wav": ("audio/wav", ".wav"),
+    "mp3": ("audio/mpeg", ".mp3"),
+    "flac": ("audio/flac", ".flac"),
+    "ogg": ("audio/ogg", ".ogg"),
+    "mp4": ("audio/mp4", ".m4a"),
+    "webm": ("audio/webm", ".webm"),
+}
+DEFAULT_AUDIO_TYPE = ("application/octet-stream", "")
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def detect_audio_type(file_path: str) -> Tuple[str, str]:
+    """根据文件头识别音频容器，返回 (媒体类型, 扩展名)"""
+    try:
+        with open(file_path, "rb") as f:
+            header = f.read(12)
+    except OSError:
+        return DEFAULT_AUDIO_TYPE
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return AUDIO_TYPES["wav"]
+    if header[:3] == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return AUDIO_TYPES["mp3"]
+    if header[:4] == b"fLaC":
+        return AUDIO_TYPES["flac"]
+    if header[:4] == b"OggS":
+        return AUDIO_TYPES["ogg"]
+    if header[4:8] == b"ftyp":
+        return AUDIO_TYPES["mp4"]
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return AUDIO_TYPES["webm"]
+    return DEFAULT_AUDIO_TYPE
+
+
+def hash_file(file_path: str) -> str:
+    """计算文件内容的sha256十六进制摘要"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_content_addressed(source_path: str, directory: str) -> str:
+    """
+    将文件以 "内容哈希.扩展名" 移入目录，返回文件名
+
+    同内容文件已存在时直接删除源文件（内容寻址天然去重）
+    """
+    digest = hash_file(source_path)
+    _, extension = detect_audio_type(source_path)
+    filename = f"{digest}{extension or '.bin'}"
+    target_path = os.path.join(directory, filename)
+
+    if os.path.exists(target_path):
+        os.remove(source_path)
+    else:
+        shutil.move(source_path, target_path)
+    return filename
+
+
+class _DigestMemo:
+    """按文件身份（设备号+inode+大小+修改时间）缓存内容摘要，文件不变时不重复读取"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str, stat_result: os.stat_result) -> str:
+        key = (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is not None:
+                self._entries.move_to_end(key)
+                return digest
+
+        digest = hash_file(file_path)
+        with self._lock:
+            self._entries[key] = digest
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+
+_digests = _DigestMemo()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围
+
+    Returns:
+        (起始, 结束)闭区间；不支持的格式或多段范围返回None（按完整响应处理）
+
+    Raises:
+        ValueError: 范围无法满足（416）
+    """
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header)
+    if not match:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+
+    if not start_text:
+        # 后缀范围：最后N个字节
+        length = int(end_text)
+        if length == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - length), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+class AudioFileResponse(Response):
+    """发送文件的指定字节区间"""
+
+    def __init__(self, file_path: str, start: int, end: int, status_code: int, headers: dict,
+                 media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.file_path = file_path
+        self.start = start
+        self.count = max(0, end - start + 1)
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, open, self.file_path, "rb")
+        try:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                # 由服务器使用sendfile直接从文件描述符发送
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            await loop.run_in_executor(None, file.seek, self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, file.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 文件在发送过程中被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            file.close()
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any((tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == etag
+               for tag in header.split(","))
+
+
+async def serve_audio_file(request: Request, file_path: str) -> Response:
+    """
+    返回音频文件响应
+
+    处理If-None-Match（304）、Range/If-Range（206/416），
+    文件名为内容哈希时直接作为ETag并允许永久缓存
+    """
+    loop = asyncio.get_running_loop()
+    stat_result = await loop.run_in_executor(None, os.stat, file_path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(file_path)
+
+    filename = os.path.basename(file_path)
+    addressed = CONTENT_ADDRESSED_NAME.match(filename)
+    if addressed:
+        digest = addressed.group(1)
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        digest = await loop.run_in_executor(None, _digests.get, file_path, stat_result)
+        cache_control = REVALIDATE_CACHE_CONTROL
+
+    media_type, _ = await loop.run_in_executor(None, detect_audio_type, file_path)
+    etag = f'"{digest}"'
+    size = stat_result.st_size
+    headers = {
+        "etag": etag,
+        "accept-ranges": "bytes",
+        "cache-control": cache_control,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "content-disposition": f"inline; filename={filename}",
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range与当前版本不一致时忽略Range，返回完整文件
+    if range_header and (not if_range or if_range.strip() in (etag, headers["last-modified"])):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            return AudioFileResponse(file_path, start, end, 206, headers, media_type)
+
+    return AudioFileResponse(file_path, 0, size - 1, 200, headers, media_type)
@@ -0,0 +1,282 @@
+"""
+PCM音频工具模块
+基于NumPy/SciPy的进程内音频处理：WAV读写、重采样、声道混合、增益、拼接、静音
+采样统一使用float32表示，取值范围[-1, 1]，形状为(帧数,)或(帧数, 声道数)
+"""
+
+import os
+import struct
+from math import gcd
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy.signal import resample_poly
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavFormat(NamedTuple):
+    """WAV格式及data块位置"""
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+
+def read_wav_format(f: BinaryIO) -> WavFormat:
+    """
+    解析WAV文件头，只读取块头和fmt块，不读取音频数据
+
+    Args:
+        f: 以二进制模式打开的文件，从文件开头读取
+    """
+    header = f.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("不是有效的WAV文件")
+
+    file_size = os.fstat(f.fileno()).st_size
+    fmt = None
+    offset = 12
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        body_start = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+        elif chunk_id == b"data":
+            if fmt is None:
+                break
+            format_tag, channels, sample_rate = struct.unpack_from("<HHI", fmt, 0)
+            bits_per_sample = struct.unpack_from("<H", fmt, 14)[0]
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                format_tag = struct.unpack_from("<H", fmt, 24)[0]
+            # 流式写入的WAV数据长度可能为占位值，以实际文件长度为准
+            data_size = min(chunk_size, file_size - body_start)
+            return WavFormat(format_tag, channels, sample_rate, bits_per_sample, body_start, data_size)
+        offset = body_start + chunk_size + (chunk_size & 1)
+
+    raise ValueError("WAV文件缺少fmt或data块")
+
+
+def read_wav(path: str) -> Tuple[np.ndarray, int]:
+    """
+    读取WAV文件
+
+    支持8/16/24/32位整数PCM、32/64位浮点及WAVE_FORMAT_EXTENSIBLE
+
+    Returns:
+        (采样数组(帧数, 声道数), 采样率)
+    """
+    with open(path, "rb") as f:
+        wav_format = read_wav_format(f)
+        f.seek(wav_format.data_offset)
+        raw = f.read(wav_format.data_size)
+
+    return _decode_frames(raw, wav_format), wav_format.sample_rate
+
+
+def iter_wav_blocks(path: str, block_frames: int) -> Iterator[np.ndarray]:
+    """
+    按块读取WAV采样，每块最多block_frames帧，形状为(帧数, 声道数)
+
+    内存占用只与块大小有关，适合长音频的逐块分析
+    """
+    with open(path, "rb") as f:
+        wav_format = read_wav_format(f)
+        frame_bytes = wav_format.channels * (wav_format.bits_per_sample // 8)
+        if frame_bytes <= 0:
+            raise ValueError("WAV声道数或位宽无效")
+
+        f.seek(wav_format.data_offset)
+        remaining = wav_format.data_size
+        block_bytes = max(1, block_frames) * frame_bytes
+        while remaining >= frame_bytes:
+            raw = f.read(min(block_bytes, remaining))
+            if not raw:
+                break
+            remaining -= len(raw)
+            yield _decode_frames(raw, wav_format)
+
+
+def _decode_frames(raw: bytes, wav_format: WavFormat) -> np.ndarray:
+    """将data块字节解码为(帧数, 声道数)的float32采样，不完整的末帧丢弃"""
+    samples = _decode_samples(raw, wav_format.format_tag, wav_format.bits_per_sample)
+    channels = wav_format.channels
+    frame_count = len(samples) // channels
+    return samples[:frame_count * channels].reshape(frame_count, channels)
+
+
+def _decode_samples(raw: bytes, format_tag: int, bits_per_sample: int) -> np.ndarray:
+    """将原始字节解码为float32采样"""
+    sample_width = bits_per_sample // 8
+    raw = raw[:len(raw) - len(raw) % sample_width]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        if bits_per_sample == 32:
+            return np.frombuffer(raw, dtype="<f4").astype(np.float32)
+        if bits_per_sample == 64:
+            return np.frombuffer(raw, dtype="<f8").astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM:
+        if bits_per_sample == 8:
+            return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        if bits_per_sample == 16:
+            return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+        if bits_per_sample == 24:
+            # 24位补齐到32位后按整数解码
+            packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+            padded = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+            padded[:, 1:] = packed
+            return padded.view("<i4").reshape(-1).astype(np.float32) / 2147483648.0
+        if bits_per_sample == 32:
+            return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+
+    raise ValueError(f"不支持的WAV编码: format={format_tag}, bits={bits_per_sample}")
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int, sample_width: int = 2):
+    """将float32采样写为整数PCM WAV文件"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+    channels = samples.shape[1]
+
+    clipped = np.clip(samples, -1.0, 1.0)
+    if sample_width == 1:
+        payload = (clipped * 127.0 + 128.0).astype(np.uint8).tobytes()
+    elif sample_width == 2:
+        payload = (clipped * 32767.0).astype("<i2").tobytes()
+    elif sample_width == 4:
+        payload = (clipped * 2147483647.0).astype("<i4").tobytes()
+    else:
+        raise ValueError(f"不支持的采样位宽: {sample_width * 8}位")
+
+    block_align = channels * sample_width
+    header = (
+        b"RIFF" + struct.pack("<I", 36 + len(payload)) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, WAVE_FORMAT_PCM, channels, sample_rate,
+                                sample_rate * block_align, block_align, sample_width * 8)
+        + b"data" + struct.pack("<I", len(payload))
+    )
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+
+
+def downmix(samples: np.ndarray, channels: int = 1) -> np.ndarray:
+    """声道转换：多声道取平均混为单声道，单声道复制为多声道"""
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+
+    if samples.shape[1] == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, keepdims=True)
+    mono = samples.mean(axis=1, keepdims=True)
+    return np.repeat(mono, channels, axis=1)
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    多相滤波重采样，对所有声道一次完成
+
+    先以整数倍上采样、经带抗混叠低通的FIR滤波后再抽取，
+    降采样时高于目标奈奎斯特频率的成分被滤除，不会混叠到可听频段
+    """
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    divisor = gcd(source_rate, target_rate)
+    resampled = resample_poly(samples, target_rate // divisor, source_rate // divisor, axis=0)
+    return resampled.astype(np.float32, copy=False)
+
+
+def apply_gain(samples: np.ndarray, gain_db: float) -> np.ndarray:
+    """按分贝调整增益"""
+    return samples * np.float32(10.0 ** (gain_db / 20.0))
+
+
+def normalize_peak(samples: np.ndarray, peak_db: float = -1.0) -> np.ndarray:
+    """峰值归一化到指定电平"""
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak <= 0.0:
+        return samples
+    return samples * np.float32(10.0 ** (peak_db / 20.0) / peak)
+
+
+def silence(duration: float, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """生成指定时长的静音"""
+    frames = max(0, int(duration * sample_rate))
+    if channels == 1:
+        return np.zeros(frames, dtype=np.float32)
+    return np.zeros((frames, channels), dtype=np.float32)
+
+
+def concat(segments: List[np.ndarray], crossfade_samples: int = 0) -> np.ndarray:
+    """拼接多个片段，相邻片段之间做线性交叉淡化"""
+    if not segments:
+        return np.zeros(0, dtype=np.float32)
+
+    total = sum(len(segment) for segment in segments)
+    output = np.zeros((total,) + segments[0].shape[1:], dtype=np.float32)
+
+    position = 0
+    for index, segment in enumerate(segments):
+        overlap = 0
+        if index > 0:
+            overlap = min(crossfade_samples, position, len(segment))
+
+        start = position - overlap
+        if overlap > 0:
+            fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            if segment.ndim == 2:
+                fade_in = fade_in[:, np.newaxis]
+            output[start:position] = output[start:position] * (1.0 - fade_in) + segment[:overlap] * fade_in
+
+        output[position:position + len(segment) - overlap] = segment[overlap:]
+        position = start + len(segment)
+
+    return output[:position]
+
+
+def convert_wav(input_path: str, output_path: str, sample_rate: Optional[int] = None,
+                channels: Optional[int] = None) -> bool:
+    """WAV格式转换（采样率、声道数），输出16位PCM"""
+    samples, source_rate = read_wav(input_path)
+    if channels is not None:
+        samples = downmix(samples, channels)
+    if sample_rate is not None:
+        samples = resample(samples, source_rate, sample_rate)
+    else:
+        sample_rate = source_rate
+    write_wav(output_path, samples, sample_rate)
+    return True
+
+
+def concat_wav_files(paths: List[str], output_path: str, crossfade_ms: int = 0) -> bool:
+    """拼接多个WAV文件为单声道WAV，统一到首个文件的采样率并做交叉淡化"""
+    segments = []
+    sample_rate = None
+    for path in paths:
+        samples, rate = read_wav(path)
+        samples = downmix(samples, 1)[:, 0]
+        if sample_rate is None:
+            sample_rate = rate
+        segments.append(resample(samples, rate, sample_rate))
+
+    write_wav(output_path, concat(segments, int(sample_rate * crossfade_ms / 1000)), sample_rate)
+    return True
+
+
+def is_wav_file(path: str) -> bool:
+    """根据文件头判断是否为WAV"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+        return header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+    except OSError:
+        return False
@@ -0,0 +1,179 @@
+"""
+语音合成结果缓存模块
+按规范化请求内容寻址的磁盘缓存，内存索引 + 容量上限LRU淘汰；
+事件循环中使用异步方法，文件复制和淘汰删除在I/O线程池中执行
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict
+
+from executors import run_io
+
+
+class SynthesisCache:
+    """合成结果缓存"""
+
+    def __init__(self, cache_dir: str = "cache/tts", max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        # key -> 文件大小，按最近使用顺序排列（末尾为最新）
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, voice_id: str, speed: float = 1.0,
+                 pitch: float = 1.0, engine: str = "") -> str:
+        """根据规范化后的请求生成缓存键"""
+        normalized_text = " ".join(unicodedata.normalize("NFKC", text).split())
+        payload = "\x1f".join([
+            normalized_text,
+            voice_id or "default",
+            f"{float(speed):.2f}",
+            f"{float(pitch):.2f}",
+            engine or ""
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.audio"
+
+    def _load_index(self):
+        """启动时扫描缓存目录重建索引（按访问时间排序）"""
+        entries = []
+        for file_path in self.cache_dir.glob("*.audio"):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, file_path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+        self._evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """查询缓存，命中返回缓存文件路径"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            cached_path = self._path_for(key)
+            if not cached_path.exists():
+                # 文件被外部删除，同步索引
+                self._total_bytes -= self._index.pop(key)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+            return str(cached_path)
+
+    def materialize(self, key: str, output_path: str) -> Optional[str]:
+        """将缓存结果放到指定路径（优先硬链接，失败时复制）"""
+        cached_path = self.get(key)
+        if cached_path is None:
+            return None
+
+        try:
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+            try:
+                os.link(cached_path, output_path)
+            except OSError:
+                shutil.copyfile(cached_path, output_path)
+            return output_path
+        except Exception as e:
+            print(f"读取合成缓存失败: {str(e)}")
+            return None
+
+    async def materialize_async(self, key: str, output_path: str) -> Optional[str]:
+        """异步版本的materialize（在I/O线程池中执行）"""
+        return await run_io(self.materialize, key, output_path)
+
+    def put(self, key: str, source_path: str) -> bool:
+        """将合成结果写入缓存"""
+        try:
+            size = os.path.getsize(source_path)
+        except OSError:
+            return False
+
+        if size == 0 or size > self.max_bytes:
+            return False
+
+        cached_path = self._path_for(key)
+        temp_path = cached_path.with_suffix(f".{os.getpid()}.tmp")
+
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, cached_path)
+        except Exception as e:
+            print(f"写入合成缓存失败: {str(e)}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return False
+
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)
+            self._index[key] = size
+            self._total_bytes += size
+            self._evict()
+
+        return True
+
+    async def put_async(self, key: str, source_path: str) -> bool:
+        """异步版本的put（复制文件和LRU淘汰在I/O线程池中执行）"""
+        return await run_io(self.put, key, source_path)
+
+    def _evict(self):
+        """超出容量时按LRU顺序淘汰"""
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path_for(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    self._path_for(key).unlink()
+                except OSError:
+                    pass
+            self._index.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, any]:
+        """缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
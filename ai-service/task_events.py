@@ -0,0 +1,116 @@
+"""
+任务事件模块
+进程内发布/订阅：任务状态变化时通知订阅者，通过Server-Sent Events推送给客户端，
+替代客户端每秒轮询状态接口
+"""
+
+import json
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+# 终态，推送后结束事件流
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# 无状态变化时发送心跳的间隔（秒），防止代理断开空闲连接
+SSE_HEARTBEAT_SECONDS = 15.0
+# 客户端断线重连间隔（毫秒）
+SSE_RETRY_MS = 3000
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """格式化一条SSE消息"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class TaskEventBus:
+    """
+    任务事件总线
+
+    发布只标记"有变化"，订阅者被唤醒后读取任务的最新快照；
+    连续多次进度更新会合并为一次推送，慢客户端不会积压消息
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Event]] = {}
+        self._listeners: List[Callable[[str], None]] = []
+
+        self.published = 0
+        self.streams_opened = 0
+
+    def publish(self, task_id: str):
+        """通知任务状态已变化（须在事件循环线程中调用）"""
+        self.published += 1
+        for event in self._subscribers.get(task_id, ()):
+            event.set()
+        for listener in self._listeners:
+            try:
+                listener(task_id)
+            except Exception as e:
+                print(f"任务事件监听器异常 {task_id}: {str(e)}")
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """注册同步监听器，每次发布时以任务ID调用"""
+        self._listeners.append(listener)
+
+    def subscribe(self, task_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._subscribers.setdefault(task_id, set()).add(event)
+        return event
+
+    def unsubscribe(self, task_id: str, event: asyncio.Event):
+        subscribers = self._subscribers.get(task_id)
+        if subscribers is None:
+            return
+        subscribers.discard(event)
+        if not subscribers:
+            del self._subscribers[task_id]
+
+    async def stream(self, task_id: str, snapshot: Callable[[], Optional[Dict]],
+                     heartbeat: float = SSE_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """
+        生成任务的SSE事件流
+
+        先推送当前状态，之后每次状态变化推送一次，到达终态后发送done事件并结束
+
+        Args:
+            task_id: 任务ID
+            snapshot: 返回任务当前状态的函数，任务不存在时返回None
+            heartbeat: 心跳间隔（秒）
+        """
+        changed = self.subscribe(task_id)
+        self.streams_opened += 1
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+
+            last = None
+            while True:
+                changed.clear()
+                data = snapshot()
+                if data is None:
+                    yield format_sse("error", {"task_id": task_id, "detail": "任务不存在"})
+                    return
+
+                if data["status"] in TERMINAL_STATUSES:
+                    yield format_sse("done", data)
+                    return
+
+                if data != last:
+                    yield format_sse("progress", data)
+                    last = data
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(task_id, changed)
+
+    def stats(self) -> Dict[str, int]:
+        """事件总线统计信息"""
+        return {
+            "subscribed_tasks": len(self._subscribers),
+            "subscribers": sum(len(events) for events in self._subscribers.values()),
+            "published": self.published,
+            "streams_opened": self.streams_opened
+        }
@@ -0,0 +1,67 @@
+"""
+文本分句模块
+按标点将文本切分为适合逐句合成的片段
+"""
+
+import re
+from typing import List
+
+# 句末标点（中英文，连同其后的引号、括号），分句后标点保留在句尾；
+# 英文句号只在其后（含引号、括号）为空白或文本结尾时断句，不切分小数、版本号等
+_SENTENCE_END = re.compile(r'(?:[。！？!?；;…\n]+|\.+(?=["”’）)]*(?:\s|$)))["”’）)]*')
+# 句内停顿标点，用于切分过长的句子
+_CLAUSE_BREAK = re.compile(r'[，,、：:]+')
+
+
+def split_sentences(text: str, max_chars: int = 80) -> List[str]:
+    """
+    将文本切分为句子
+
+    Args:
+        text: 原始文本
+        max_chars: 单个片段的最大长度，超长句子会在逗号等处继续切分
+
+    Returns:
+        非空片段列表，拼接后与原文（去除空白）一致
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    sentences = _split_by(_SENTENCE_END, text)
+
+    segments = []
+    for sentence in sentences:
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+
+        # 超长句子按逗号切分后再合并到不超过max_chars
+        buffer = ""
+        for clause in _split_by(_CLAUSE_BREAK, sentence):
+            while len(clause) > max_chars:
+                if buffer:
+                    segments.append(buffer)
+                    buffer = ""
+                segments.append(clause[:max_chars])
+                clause = clause[max_chars:]
+            if len(buffer) + len(clause) > max_chars and buffer:
+                segments.append(buffer)
+                buffer = ""
+            buffer += clause
+        if buffer:
+            segments.append(buffer)
+
+    return [segment.strip() for segment in segments if segment.strip()]
+
+
+def _split_by(pattern: "re.Pattern", text: str) -> List[str]:
+    """在匹配到的标点之后切分（只匹配标点，线性时间），末尾无标点的剩余部分单独成段"""
+    parts = []
+    end = 0
+    for match in pattern.finditer(text):
+        parts.append(text[end:match.end()])
+        end = match.end()
+    if end < len(text):
+        parts.append(text[end:])
+    return parts
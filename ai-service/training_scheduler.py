@@ -0,0 +1,146 @@
+"""
+训练任务调度模块
+限制同时运行的训练任务数，排队任务按优先级（预计耗时短的优先）出队，
+等待时间越长优先级越高（老化），耗时长的任务不会被持续到达的短任务饿死；
+支持查询排队位置和取消任务
+"""
+
+import os
+import time
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Awaitable, Dict, List, Optional
+
+# 老化系数：每等待1秒，优先级值减少的量（与预计耗时同单位）
+TRAINING_AGING_FACTOR = float(os.getenv("TRAINING_AGING_FACTOR", "1.0"))
+
+# 训练执行函数签名: (task_id) -> None
+TrainingRunner = Callable[[str], Awaitable[None]]
+
+
+class TrainingQueueFull(Exception):
+    """训练队列已满"""
+
+
+class TrainingScheduler:
+    """
+    有界优先级训练调度器
+
+    有效优先级 = 优先级 - aging_factor × 已等待秒数，值小的先出队。
+    对所有排队任务而言 aging_factor × 当前时间 是同一个量，
+    因此按 优先级 + aging_factor × 提交时间 排序与按有效优先级排序等价，堆键在提交时即可确定，
+    无需随时间重新计算。优先级为C的任务提交C/aging_factor秒后，不会再被新提交的任务超过
+    """
+
+    def __init__(self, runner: TrainingRunner, max_concurrent: int = 2, max_queued: int = 100,
+                 aging_factor: float = TRAINING_AGING_FACTOR):
+        self.runner = runner
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.aging_factor = max(0.0, aging_factor)
+
+        # 堆元素为 [老化后的排序键, 序号, task_id, 有效标记]，取消时只清除标记（延迟删除）
+        self._heap: List[list] = []
+        self._queued: Dict[str, list] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._counter = itertools.count()
+
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def submit(self, task_id: str, priority: float) -> int:
+        """
+        提交训练任务
+
+        Returns:
+            排队位置（从1开始），0表示已直接开始运行
+        """
+        if len(self._queued) >= self.max_queued and len(self._running) >= self.max_concurrent:
+            raise TrainingQueueFull("训练队列已满，请稍后再试")
+
+        entry = [priority + self.aging_factor * time.monotonic(), next(self._counter), task_id, True]
+        heapq.heappush(self._heap, entry)
+        self._queued[task_id] = entry
+        self.submitted += 1
+
+        self._dispatch()
+        return self.position(task_id) or 0
+
+    def cancel(self, task_id: str) -> bool:
+        """取消排队中或运行中的任务"""
+        entry = self._queued.pop(task_id, None)
+        if entry is not None:
+            entry[3] = False
+            self.cancelled += 1
+            return True
+
+        running = self._running.get(task_id)
+        if running is not None and not running.done():
+            running.cancel()
+            self.cancelled += 1
+            return True
+
+        return False
+
+    def position(self, task_id: str) -> Optional[int]:
+        """排队位置（从1开始），不在队列中时返回None"""
+        entry = self._queued.get(task_id)
+        if entry is None:
+            return None
+        key = (entry[0], entry[1])
+        return 1 + sum(1 for other in self._queued.values() if (other[0], other[1]) < key)
+
+    def queued_task_ids(self) -> List[str]:
+        """排队中的任务ID"""
+        return list(self._queued)
+
+    def is_running(self, task_id: str) -> bool:
+        return task_id in self._running
+
+    def _dispatch(self):
+        """有空闲名额时按优先级启动排队任务"""
+        while self._heap and len(self._running) < self.max_concurrent:
+            priority, _, task_id, active = heapq.heappop(self._heap)
+            if not active:
+                continue
+
+            del self._queued[task_id]
+            task = asyncio.create_task(self.runner(task_id))
+            self._running[task_id] = task
+            task.add_done_callback(lambda done, task_id=task_id: self._on_done(task_id, done))
+
+    def _on_done(self, task_id: str, task: asyncio.Task):
+        self._running.pop(task_id, None)
+        if not task.cancelled():
+            self.completed += 1
+            if task.exception() is not None:
+                print(f"训练任务异常退出 {task_id}: {task.exception()}")
+        self._dispatch()
+
+    async def close(self):
+        """清空队列并取消运行中的任务"""
+        for entry in self._queued.values():
+            entry[3] = False
+        self._queued.clear()
+        self._heap.clear()
+
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        """调度器统计信息"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "aging_factor": self.aging_factor,
+            "running": len(self._running),
+            "queued": len(self._queued),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "cancelled": self.cancelled
+        }
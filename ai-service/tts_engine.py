@@ -5,55 +5,76 @@ TTS引擎模块
 
 import os
 import tempfile
-import subprocess
 import platform
+import shutil
+import struct
+import wave
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple, AsyncIterator
 import asyncio
 import uuid
 
+import pcm
+from executors import run_cpu, run_io
+from synthesis_cache import SynthesisCache
+from engine_limiter import EngineLimiter, EngineRunner
+from text_segmenter import split_sentences
+from engine_registry import get_available_engines
+
+try:
+    import edge_tts  # 可选：进程内调用Edge TTS，避免每次启动CLI解释器
+except ImportError:
+    edge_tts = None
+
+# 每个引擎同时进行的合成数上限（仅限流，命令行引擎每次合成仍启动一个子进程）
+TTS_ENGINE_CONCURRENCY = int(os.getenv("TTS_ENGINE_CONCURRENCY", "4"))
+
+# 静音占位与say输出的采样率
+SILENCE_SAMPLE_RATE = 22050
+
+# 流式输出的分块大小
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# 长文本模式：分段长度与片段间交叉淡化时长
+LONG_FORM_SEGMENT_CHARS = 80
+LONG_FORM_CROSSFADE_MS = 30
+
 class TTSEngine:
     """TTS引擎基类"""
     
-    def __init__(self):
+    # Edge TTS中文语音
+    EDGE_VOICE_MAP = {
+        "default": "zh-CN-XiaoxiaoNeural",
+        "teacher": "zh-CN-XiaoyiNeural", 
+        "mom": "zh-CN-XiaohanNeural",
+        "dad": "zh-CN-YunxiNeural"
+    }
+    
+    def __init__(self, cache: Optional[SynthesisCache] = None,
+                 concurrency: int = TTS_ENGINE_CONCURRENCY):
         self.system = platform.system().lower()
-        self.available_engines = self._detect_available_engines()
-        
-    def _detect_available_engines(self) -> List[str]:
-        """检测可用的TTS引擎"""
-        engines = []
-        
-        # 检测系统TTS
-        if self.system == "windows":
-            engines.append("sapi")
-        elif self.system == "darwin":  # macOS
-            engines.append("say")
-        elif self.system == "linux":
-            # 检测espeak
-            if self._command_exists("espeak"):
-                engines.append("espeak")
-            # 检测festival
-            if self._command_exists("festival"):
-                engines.append("festival")
-        
-        # 检测edge-tts (如果安装了)
-        if self._command_exists("edge-tts"):
-            engines.append("edge-tts")
-            
-        return engines
+        self._available_engines: Optional[List[str]] = None
+        self.cache = cache
+        self.concurrency = concurrency
+        self._limiters: Dict[str, EngineLimiter] = {}
     
-    def _command_exists(self, command: str) -> bool:
-        """检查命令是否存在"""
-        try:
-            subprocess.run([command, "--help"], 
-                         capture_output=True, 
-                         timeout=5)
-            return True
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.CalledProcessError):
-            return False
+    @property
+    def available_engines(self) -> List[str]:
+        """可用的TTS引擎（首次访问时从进程级注册表获取）"""
+        if self._available_engines is None:
+            self._available_engines = get_available_engines()
+        return self._available_engines
+    
+    def _select_engine(self) -> str:
+        """按优先级选择合成引擎"""
+        for engine in ("edge-tts", "sapi", "say", "espeak"):
+            if engine in self.available_engines:
+                return engine
+        return "silence"
     
     async def synthesize(self, text: str, voice_id: str = "default", 
-                        output_path: Optional[str] = None) -> Optional[str]:
+                        output_path: Optional[str] = None,
+                        speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
         """
         合成语音
         
@@ -61,6 +82,8 @@ class TTSEngine:
             text: 要合成的文本
             voice_id: 音色ID
             output_path: 输出文件路径，如果为None则自动生成
+            speed: 语速倍率
+            pitch: 音调倍率
             
         Returns:
             生成的音频文件路径，失败返回None
@@ -71,36 +94,97 @@ class TTSEngine:
         if output_path is None:
             output_path = self._create_temp_audio_file()
         
-        # 根据可用引擎选择合成方法
-        if "edge-tts" in self.available_engines:
-            return await self._synthesize_with_edge_tts(text, voice_id, output_path)
-        elif "sapi" in self.available_engines:
-            return await self._synthesize_with_sapi(text, voice_id, output_path)
-        elif "say" in self.available_engines:
-            return await self._synthesize_with_say(text, voice_id, output_path)
-        elif "espeak" in self.available_engines:
-            return await self._synthesize_with_espeak(text, voice_id, output_path)
+        engine = self._select_engine()
+        
+        # 优先使用缓存结果，命中时无需启动任何子进程
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(text, voice_id, speed, pitch, engine)
+            cached = await self.cache.materialize_async(cache_key, output_path)
+            if cached:
+                return cached
+        
+        # 超出引擎并发上限时排队
+        result = await self._get_limiter(engine).run(text, voice_id, output_path, speed, pitch)
+        
+        if result and cache_key is not None:
+            await self.cache.put_async(cache_key, result)
+        
+        return result
+    
+    def _get_limiter(self, engine: str) -> EngineLimiter:
+        """获取（或创建）指定引擎的并发限制器"""
+        limiter = self._limiters.get(engine)
+        if limiter is None:
+            limiter = EngineLimiter(engine, self._engine_runner(engine), self.concurrency)
+            self._limiters[engine] = limiter
+        return limiter
+    
+    def _engine_runner(self, engine: str) -> EngineRunner:
+        """指定引擎的合成函数"""
+        if engine == "edge-tts":
+            # 能导入edge_tts库时直接在进程内合成，否则回退到CLI
+            if edge_tts is not None:
+                return self._synthesize_with_edge_tts_library
+            return self._synthesize_with_edge_tts
+        elif engine == "sapi":
+            return lambda text, voice_id, output_path, speed, pitch: \
+                self._synthesize_with_sapi(text, voice_id, output_path)
+        elif engine == "say":
+            return lambda text, voice_id, output_path, speed, pitch: \
+                self._synthesize_with_say(text, voice_id, output_path)
+        elif engine == "espeak":
+            return self._synthesize_with_espeak
         else:
             # 如果没有可用引擎，生成静音文件
-            return await self._generate_silence(text, output_path)
+            return lambda text, voice_id, output_path, speed, pitch: \
+                self._generate_silence(text, output_path)
     
-    async def _synthesize_with_edge_tts(self, text: str, voice_id: str, output_path: str) -> Optional[str]:
-        """使用Edge TTS合成语音"""
+    def get_limiter_stats(self) -> List[Dict[str, any]]:
+        """获取各引擎并发限制统计"""
+        return [limiter.stats() for limiter in self._limiters.values()]
+    
+    @staticmethod
+    def _edge_prosody(speed: float, pitch: float) -> Tuple[str, str]:
+        """将语速/音调倍率转换为Edge TTS参数"""
+        rate = f"{int(round((speed - 1) * 100)):+d}%"
+        pitch_hz = f"{int(round((pitch - 1) * 50)):+d}Hz"
+        return rate, pitch_hz
+    
+    async def _synthesize_with_edge_tts_library(self, text: str, voice_id: str, output_path: str,
+                                                speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
+        """在进程内调用edge_tts库合成语音"""
         try:
-            # Edge TTS中文语音
-            voice_map = {
-                "default": "zh-CN-XiaoxiaoNeural",
-                "teacher": "zh-CN-XiaoyiNeural", 
-                "mom": "zh-CN-XiaohanNeural",
-                "dad": "zh-CN-YunxiNeural"
-            }
+            voice = self.EDGE_VOICE_MAP.get(voice_id, self.EDGE_VOICE_MAP["default"])
+            rate, pitch_hz = self._edge_prosody(speed, pitch)
+            
+            communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch_hz)
+            await asyncio.wait_for(communicate.save(output_path), timeout=30)
+            
+            if os.path.exists(output_path):
+                return output_path
+            return None
             
-            voice = voice_map.get(voice_id, voice_map["default"])
+        except asyncio.TimeoutError:
+            print("Edge TTS合成超时")
+            return None
+        except Exception as e:
+            print(f"Edge TTS合成异常: {str(e)}")
+            return None
+    
+    async def _synthesize_with_edge_tts(self, text: str, voice_id: str, output_path: str,
+                                        speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
+        """使用Edge TTS合成语音"""
+        try:
+            voice = self.EDGE_VOICE_MAP.get(voice_id, self.EDGE_VOICE_MAP["default"])
+            rate, pitch_hz = self._edge_prosody(speed, pitch)
             
             cmd = [
                 "edge-tts",
                 "--voice", voice,
                 "--text", text,
+                f"--rate={rate}",
+                f"--pitch={pitch_hz}",
                 "--write-media", output_path
             ]
             
@@ -157,10 +241,16 @@ class TTSEngine:
     async def _synthesize_with_say(self, text: str, voice_id: str, output_path: str) -> Optional[str]:
         """使用macOS say命令合成语音"""
         try:
-            # 先生成AIFF文件，然后转换为WAV
-            temp_aiff = output_path.replace('.wav', '.aiff')
+            # say直接输出16位小端WAV，无需再调用ffmpeg转换
+            temp_wav = output_path.replace('.wav', '.say.wav')
             
-            cmd = ["say", "-o", temp_aiff, text]
+            cmd = [
+                "say",
+                "--file-format=WAVE",
+                f"--data-format=LEI16@{SILENCE_SAMPLE_RATE}",
+                "-o", temp_wav,
+                text
+            ]
             
             process = await asyncio.create_subprocess_exec(
                 *cmd,
@@ -170,19 +260,12 @@ class TTSEngine:
             
             await asyncio.wait_for(process.communicate(), timeout=30)
             
-            if process.returncode == 0 and os.path.exists(temp_aiff):
-                # 转换为WAV格式
-                convert_cmd = ["ffmpeg", "-i", temp_aiff, "-y", output_path]
-                convert_process = await asyncio.create_subprocess_exec(
-                    *convert_cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                await convert_process.communicate()
+            if process.returncode == 0 and os.path.exists(temp_wav):
+                # 统一为单声道
+                pcm.convert_wav(temp_wav, output_path, channels=1)
                 
                 # 清理临时文件
-                if os.path.exists(temp_aiff):
-                    os.unlink(temp_aiff)
+                os.unlink(temp_wav)
                 
                 if os.path.exists(output_path):
                     return output_path
@@ -193,13 +276,15 @@ class TTSEngine:
             print(f"Say合成异常: {str(e)}")
             return None
     
-    async def _synthesize_with_espeak(self, text: str, voice_id: str, output_path: str) -> Optional[str]:
+    async def _synthesize_with_espeak(self, text: str, voice_id: str, output_path: str,
+                                      speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
         """使用espeak合成语音"""
         try:
             cmd = [
                 "espeak", 
                 "-v", "zh",  # 中文语音
-                "-s", "150", # 语速
+                "-s", str(int(150 * speed)), # 语速
+                "-p", str(min(99, max(0, int(50 * pitch)))),  # 音调
                 "-w", output_path,  # 输出文件
                 text
             ]
@@ -223,61 +308,206 @@ class TTSEngine:
     
     async def _generate_silence(self, text: str, output_path: str) -> Optional[str]:
         """生成静音文件作为占位符"""
-        try:
-            # 根据文本长度生成对应时长的静音
-            duration = max(1, len(text) * 0.1)  # 每个字符0.1秒
-            
-            # 使用ffmpeg生成静音
-            cmd = [
-                "ffmpeg",
-                "-f", "lavfi",
-                "-i", f"anullsrc=channel_layout=mono:sample_rate=22050",
-                "-t", str(duration),
-                "-y", output_path
-            ]
-            
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            await asyncio.wait_for(process.communicate(), timeout=10)
-            
-            if process.returncode == 0 and os.path.exists(output_path):
-                return output_path
-            else:
-                # 如果ffmpeg也不可用，创建一个简单的WAV文件
-                return self._create_simple_wav(duration, output_path)
-                
-        except Exception as e:
-            print(f"生成静音文件异常: {str(e)}")
-            return self._create_simple_wav(1.0, output_path)
+        # 根据文本长度生成对应时长的静音
+        duration = max(1, len(text) * 0.1)  # 每个字符0.1秒
+        return self._create_simple_wav(duration, output_path)
     
     def _create_simple_wav(self, duration: float, output_path: str) -> Optional[str]:
         """创建简单的WAV文件"""
         try:
-            import wave
-            import struct
+            pcm.write_wav(output_path, pcm.silence(duration, SILENCE_SAMPLE_RATE), SILENCE_SAMPLE_RATE)
+            return output_path
             
-            sample_rate = 22050
-            frames = int(duration * sample_rate)
+        except Exception as e:
+            print(f"创建WAV文件失败: {str(e)}")
+            return None
+    
+    async def synthesize_long(self, text: str, voice_id: str = "default",
+                              output_path: Optional[str] = None,
+                              speed: float = 1.0, pitch: float = 1.0,
+                              max_concurrency: Optional[int] = None,
+                              crossfade_ms: int = LONG_FORM_CROSSFADE_MS) -> Optional[str]:
+        """
+        长文本合成
+        
+        在标点处分段，在引擎并发上限内并发合成各段，再在进程内按统一采样率
+        拼接并做短交叉淡化，总耗时约等于最长片段的合成时间
+        
+        Args:
+            text: 要合成的文本
+            voice_id: 音色ID
+            output_path: 输出文件路径，如果为None则自动生成
+            speed: 语速倍率
+            pitch: 音调倍率
+            max_concurrency: 并发合成的片段数上限，默认为引擎并发上限
+            crossfade_ms: 片段间交叉淡化时长（毫秒）
             
-            with wave.open(output_path, 'wb') as wav_file:
-                wav_file.setnchannels(1)  # 单声道
-                wav_file.setsampwidth(2)  # 16位
-                wav_file.setframerate(sample_rate)
-                
-                # 写入静音数据
-                for _ in range(frames):
-                    wav_file.writeframes(struct.pack('<h', 0))
+        Returns:
+            生成的音频文件路径，失败返回None
+        """
+        segments = split_sentences(text, max_chars=LONG_FORM_SEGMENT_CHARS)
+        if len(segments) <= 1:
+            return await self.synthesize(text, voice_id, output_path, speed=speed, pitch=pitch)
+        
+        if output_path is None:
+            output_path = self._create_temp_audio_file()
+        
+        # 整段文本命中缓存时直接返回
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(text, voice_id, speed, pitch, self._select_engine())
+            cached = await self.cache.materialize_async(cache_key, output_path)
+            if cached:
+                return cached
+        
+        semaphore = asyncio.Semaphore(max_concurrency or self.concurrency)
+        
+        async def render(segment: str) -> Optional[str]:
+            async with semaphore:
+                return await self.synthesize(segment, voice_id, speed=speed, pitch=pitch)
+        
+        segment_paths = await asyncio.gather(*[render(segment) for segment in segments])
+        
+        try:
+            if not all(segment_paths):
+                print("长文本合成失败：部分片段合成失败")
+                return None
             
+            result = await self._stitch_segments(segment_paths, output_path, crossfade_ms)
+        finally:
+            self.cleanup_temp_files([path for path in segment_paths if path])
+        
+        if result and cache_key is not None:
+            await self.cache.put_async(cache_key, result)
+        
+        return result
+    
+    async def _stitch_segments(self, segment_paths: List[str], output_path: str,
+                               crossfade_ms: int) -> Optional[str]:
+        """拼接片段音频：WAV片段在CPU进程池中统一采样率后交叉淡化，MP3等帧格式直接拼接"""
+        try:
+            if all(pcm.is_wav_file(path) for path in segment_paths):
+                await run_cpu(pcm.concat_wav_files, segment_paths, output_path, crossfade_ms)
+            else:
+                await run_io(self._concat_files, segment_paths, output_path)
             return output_path
             
         except Exception as e:
-            print(f"创建WAV文件失败: {str(e)}")
+            print(f"拼接音频片段失败: {str(e)}")
             return None
     
+    @staticmethod
+    def _concat_files(paths: List[str], output_path: str):
+        """按字节顺序拼接文件"""
+        with open(output_path, "wb") as out:
+            for path in paths:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, out, STREAM_CHUNK_SIZE)
+    
+    def stream_media_type(self) -> str:
+        """流式合成输出的媒体类型"""
+        # Edge TTS输出MP3帧，可直接拼接；其他引擎输出WAV
+        return "audio/mpeg" if self._select_engine() == "edge-tts" else "audio/wav"
+    
+    async def synthesize_stream(self, text: str, voice_id: str = "default",
+                                speed: float = 1.0, pitch: float = 1.0,
+                                lookahead: int = 2) -> AsyncIterator[bytes]:
+        """
+        分句流式合成
+        
+        按句切分文本，顺序输出每句的音频数据；当前句输出时后续句子已在合成，
+        首句完成即可开始播放
+        
+        Args:
+            text: 要合成的文本
+            voice_id: 音色ID
+            speed: 语速倍率
+            pitch: 音调倍率
+            lookahead: 预先并行合成的句子数
+        """
+        sentences = split_sentences(text)
+        pending: List[Tuple[asyncio.Task, str]] = []
+        # 本次流式合成分配过的全部临时文件，结束时统一清理
+        temp_files: List[str] = []
+        wav_header_sent = False
+        next_index = 0
+        
+        def schedule():
+            nonlocal next_index
+            while next_index < len(sentences) and len(pending) < max(1, lookahead):
+                output_path = self._create_temp_audio_file()
+                temp_files.append(output_path)
+                task = asyncio.create_task(
+                    self.synthesize(sentences[next_index], voice_id, output_path,
+                                    speed=speed, pitch=pitch)
+                )
+                pending.append((task, output_path))
+                next_index += 1
+        
+        try:
+            schedule()
+            while pending:
+                task, output_path = pending.pop(0)
+                result = await task
+                schedule()
+                
+                if not result:
+                    print("流式合成片段失败，已跳过")
+                    self.cleanup_temp_files([output_path])
+                    continue
+                if result != output_path:
+                    temp_files.append(result)
+                
+                with open(result, "rb") as f:
+                    is_wav = f.read(4) == b"RIFF"
+                
+                if not is_wav:
+                    # MP3等帧格式可直接拼接输出
+                    with open(result, "rb") as f:
+                        while True:
+                            chunk = f.read(STREAM_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            yield chunk
+                else:
+                    with wave.open(result, "rb") as wav_file:
+                        if not wav_header_sent:
+                            yield self._streaming_wav_header(
+                                wav_file.getnchannels(),
+                                wav_file.getsampwidth(),
+                                wav_file.getframerate()
+                            )
+                            wav_header_sent = True
+                        frames_per_chunk = max(1, STREAM_CHUNK_SIZE // (
+                            wav_file.getnchannels() * wav_file.getsampwidth()))
+                        while True:
+                            frames = wav_file.readframes(frames_per_chunk)
+                            if not frames:
+                                break
+                            yield frames
+                
+                self.cleanup_temp_files([result, output_path])
+        finally:
+            # 客户端断开或出错时取消尚未输出的合成任务，等其结束后清理所有临时文件
+            # （包括正在输出的句子和合成失败留下的文件）
+            for task, _ in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*(task for task, _ in pending), return_exceptions=True)
+            self.cleanup_temp_files(temp_files)
+    
+    @staticmethod
+    def _streaming_wav_header(channels: int, sample_width: int, sample_rate: int) -> bytes:
+        """生成长度未知的WAV文件头（数据长度字段填最大值）"""
+        byte_rate = sample_rate * channels * sample_width
+        block_align = channels * sample_width
+        return (
+            b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                    byte_rate, block_align, sample_width * 8)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF)
+        )
+    
     def _create_temp_audio_file(self) -> str:
         """创建临时音频文件"""
         temp_dir = Path(tempfile.gettempdir())
@@ -14,21 +14,41 @@ import tempfile
 
 from audio_processor import AudioProcessor
 from tts_engine import TTSEngine
+from training_scheduler import TrainingScheduler, TrainingQueueFull
+from task_events import TaskEventBus, TERMINAL_STATUSES
+from task_store import TaskStore
+
+# 训练调度配置
+TRAINING_MAX_CONCURRENCY = int(os.getenv("TRAINING_MAX_CONCURRENCY", "2"))
+TRAINING_MAX_QUEUE = int(os.getenv("TRAINING_MAX_QUEUE", "100"))
 
 class VoiceCloningService:
     """声音克隆服务"""
     
-    def __init__(self, models_dir: str = "models", cache_dir: str = "cache"):
+    def __init__(self, models_dir: str = "models", cache_dir: str = "cache",
+                 tts_engine: Optional[TTSEngine] = None,
+                 audio_processor: Optional[AudioProcessor] = None,
+                 events: Optional[TaskEventBus] = None,
+                 max_concurrent_trainings: int = TRAINING_MAX_CONCURRENCY,
+                 max_queued_trainings: int = TRAINING_MAX_QUEUE):
         self.models_dir = Path(models_dir)
         self.cache_dir = Path(cache_dir)
         self.models_dir.mkdir(exist_ok=True)
         self.cache_dir.mkdir(exist_ok=True)
         
-        self.audio_processor = AudioProcessor()
-        self.tts_engine = TTSEngine()
+        self.audio_processor = audio_processor or AudioProcessor()
+        self.tts_engine = tts_engine or TTSEngine()
+        self.events = events or TaskEventBus()
+        
+        # 训练任务状态（已结束的任务保留一段时间后自动淘汰）
+        self.training_tasks = TaskStore(terminal_statuses=TERMINAL_STATUSES)
         
-        # 训练任务状态
-        self.training_tasks = {}
+        # 训练调度器：限制并发，预计耗时短的任务优先
+        self.scheduler = TrainingScheduler(
+            self._train_voice_model,
+            max_concurrent=max_concurrent_trainings,
+            max_queued=max_queued_trainings
+        )
         
         # 加载已有模型
         self.voice_models = self._load_existing_models()
@@ -51,7 +71,8 @@ class VoiceCloningService:
         return models
     
     async def start_voice_training(self, audio_file_path: str, voice_name: str, 
-                                 voice_id: Optional[str] = None) -> Dict[str, any]:
+                                 voice_id: Optional[str] = None,
+                                 callback_url: Optional[str] = None) -> Dict[str, any]:
         """
         开始声音训练
         
@@ -59,6 +80,7 @@ class VoiceCloningService:
             audio_file_path: 音频文件路径
             voice_name: 音色名称
             voice_id: 音色ID，如果为None则自动生成
+            callback_url: 任务状态变化时的回调地址
             
         Returns:
             训练任务信息
@@ -76,6 +98,7 @@ class VoiceCloningService:
         
         # 创建训练任务
         task_id = str(uuid.uuid4())
+        estimated_time = self._estimate_training_time(validation_result["info"])
         task_info = {
             "task_id": task_id,
             "voice_id": voice_id,
@@ -84,19 +107,30 @@ class VoiceCloningService:
             "status": "pending",
             "progress": 0,
             "created_at": datetime.now().isoformat(),
-            "audio_info": validation_result["info"]
+            "audio_info": validation_result["info"],
+            "estimated_time": estimated_time,
+            "callback_url": callback_url
         }
         
         self.training_tasks[task_id] = task_info
         
-        # 启动异步训练任务
-        asyncio.create_task(self._train_voice_model(task_id))
+        # 提交到调度器排队
+        try:
+            queue_position = self.scheduler.submit(task_id, estimated_time)
+        except TrainingQueueFull as e:
+            del self.training_tasks[task_id]
+            return {
+                "success": False,
+                "error": str(e),
+                "queue_full": True
+            }
         
         return {
             "success": True,
             "task_id": task_id,
             "voice_id": voice_id,
-            "estimated_time": self._estimate_training_time(validation_result["info"])
+            "estimated_time": estimated_time,
+            "queue_position": queue_position
         }
     
     async def _train_voice_model(self, task_id: str):
@@ -105,23 +139,37 @@ class VoiceCloningService:
         if not task:
             return
         
+        processed_audio_path = None
         try:
             task["status"] = "processing"
             task["progress"] = 10
+            task["started_at"] = datetime.now().isoformat()
+            self.events.publish(task_id)
+            self._publish_queue_positions()
             
-            # 步骤1: 音频预处理
-            await self._update_task_progress(task_id, 20, "预处理音频文件...")
-            processed_audio_path = await self._preprocess_audio(task["audio_file_path"])
-            
-            if not processed_audio_path:
-                raise Exception("音频预处理失败")
+            analysis_cache = self.audio_processor.analysis_cache
+            source_path = task["audio_file_path"]
             
-            # 步骤2: 特征提取
-            await self._update_task_progress(task_id, 40, "提取音频特征...")
-            features = self.audio_processor.extract_features(processed_audio_path)
-            
-            if not features:
-                raise Exception("特征提取失败")
+            # 同一音频已分析过时直接复用特征
+            features = analysis_cache.get(source_path, "features")
+            if features is None:
+                # 步骤1: 音频预处理
+                await self._update_task_progress(task_id, 20, "预处理音频文件...")
+                processed_audio_path = await self._preprocess_audio(source_path)
+                
+                if not processed_audio_path:
+                    raise Exception("音频预处理失败")
+                
+                # 步骤2: 特征提取
+                await self._update_task_progress(task_id, 40, "提取音频特征...")
+                features = await self.audio_processor.extract_features_async(processed_audio_path)
+                
+                if not features:
+                    raise Exception("特征提取失败")
+                
+                analysis_cache.set(source_path, "features", features)
+            else:
+                await self._update_task_progress(task_id, 40, "复用已提取的音频特征...")
             
             # 步骤3: 模型训练 (模拟)
             await self._update_task_progress(task_id, 60, "训练声音模型...")
@@ -143,34 +191,45 @@ class VoiceCloningService:
             task["status"] = "completed"
             task["completed_at"] = datetime.now().isoformat()
             task["model_path"] = model_path
+            self.events.publish(task_id)
             
             # 添加到可用模型列表
             self.voice_models[task["voice_id"]] = model_data
             
             # 清理临时文件
-            self.audio_processor.cleanup_temp_file(processed_audio_path)
+            if processed_audio_path:
+                self.audio_processor.cleanup_temp_file(processed_audio_path)
+            
+        except asyncio.CancelledError:
+            task["status"] = "cancelled"
+            task["cancelled_at"] = datetime.now().isoformat()
+            self.events.publish(task_id)
+            if processed_audio_path:
+                self.audio_processor.cleanup_temp_file(processed_audio_path)
+            print(f"声音训练已取消 {task_id}")
+            raise
             
         except Exception as e:
             task["status"] = "failed"
             task["error"] = str(e)
             task["failed_at"] = datetime.now().isoformat()
+            self.events.publish(task_id)
             print(f"声音训练失败 {task_id}: {str(e)}")
     
     async def _preprocess_audio(self, input_path: str) -> Optional[str]:
         """预处理音频文件"""
+        cached_path = self.audio_processor.analysis_cache.get(input_path, "preprocessed_path")
+        if cached_path:
+            return cached_path
+        
         try:
             output_path = self.audio_processor.create_temp_file('.wav')
             
-            # 异步执行音频预处理
-            loop = asyncio.get_event_loop()
-            success = await loop.run_in_executor(
-                None, 
-                self.audio_processor.preprocess_audio,
-                input_path, 
-                output_path
-            )
+            # 重采样在CPU进程池、ffmpeg调用在I/O线程池中执行
+            success = await self.audio_processor.preprocess_audio_async(input_path, output_path)
             
             if success:
+                self.audio_processor.analysis_cache.set(input_path, "preprocessed_path", output_path)
                 return output_path
             else:
                 self.audio_processor.cleanup_temp_file(output_path)
@@ -241,6 +300,12 @@ class VoiceCloningService:
         if task_id in self.training_tasks:
             self.training_tasks[task_id]["progress"] = progress
             self.training_tasks[task_id]["current_step"] = message
+            self.events.publish(task_id)
+    
+    def _publish_queue_positions(self):
+        """队列变化时通知排队中的任务（排队位置随之变化）"""
+        for queued_id in self.scheduler.queued_task_ids():
+            self.events.publish(queued_id)
     
     def _estimate_training_time(self, audio_info: Dict) -> int:
         """估算训练时间（秒）"""
@@ -251,13 +316,14 @@ class VoiceCloningService:
         
         return int(base_time * duration_factor)
     
-    async def synthesize_with_voice(self, text: str, voice_id: str) -> Optional[str]:
+    async def synthesize_with_voice(self, text: str, voice_id: str,
+                                    speed: float = 1.0, pitch: float = 1.0) -> Optional[str]:
         """使用指定音色合成语音"""
         try:
             # 检查音色是否存在
             if voice_id not in self.voice_models:
                 # 如果是系统预设音色，使用TTS引擎
-                return await self.tts_engine.synthesize(text, voice_id)
+                return await self.tts_engine.synthesize_long(text, voice_id, speed=speed, pitch=pitch)
             
             # 使用克隆的音色 (目前使用TTS引擎模拟)
             # 在真实实现中，这里应该调用MockingBird进行推理
@@ -267,7 +333,8 @@ class VoiceCloningService:
             output_path = self.tts_engine._create_temp_audio_file()
             
             # 目前使用系统TTS作为占位符
-            result = await self.tts_engine.synthesize(text, "default", output_path)
+            result = await self.tts_engine.synthesize_long(text, "default", output_path,
+                                                           speed=speed, pitch=pitch)
             
             return result
             
@@ -275,9 +342,41 @@ class VoiceCloningService:
             print(f"语音合成失败: {str(e)}")
             return None
     
+    def synthesize_stream_with_voice(self, text: str, voice_id: str,
+                                     speed: float = 1.0, pitch: float = 1.0):
+        """使用指定音色流式合成语音，返回音频数据块的异步迭代器"""
+        # 克隆音色目前使用系统TTS作为占位符，与synthesize_with_voice保持一致
+        engine_voice_id = "default" if voice_id in self.voice_models else voice_id
+        return self.tts_engine.synthesize_stream(text, engine_voice_id, speed=speed, pitch=pitch)
+    
     def get_training_status(self, task_id: str) -> Optional[Dict]:
-        """获取训练任务状态"""
-        return self.training_tasks.get(task_id)
+        """获取训练任务状态，排队中的任务附带排队位置"""
+        task = self.training_tasks.get(task_id)
+        if task is not None and task["status"] == "pending":
+            task["queue_position"] = self.scheduler.position(task_id)
+        return task
+    
+    def cancel_training(self, task_id: str) -> bool:
+        """取消排队中或训练中的任务"""
+        task = self.training_tasks.get(task_id)
+        if not task or task["status"] not in ("pending", "processing"):
+            return False
+        
+        if not self.scheduler.cancel(task_id):
+            return False
+        
+        # 排队中的任务不会再启动，直接标记；运行中的任务在取消异常处理中标记
+        if task["status"] == "pending":
+            task["status"] = "cancelled"
+            task["cancelled_at"] = datetime.now().isoformat()
+            task["queue_position"] = None
+            self.events.publish(task_id)
+            self._publish_queue_positions()
+        return True
+    
+    def get_scheduler_stats(self) -> Dict[str, int]:
+        """训练调度器统计信息"""
+        return self.scheduler.stats()
     
     def get_available_voices(self) -> List[Dict]:
         """获取可用音色列表"""
@@ -3,7 +3,6 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from datetime import datetime
 import uuid
-import httpx
 import os
 from typing import Optional, List
 import logging
@@ -12,7 +11,8 @@ import logging
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # 引入内联OpenVoice实现（避免导入问题）
-from .openvoice_inline import text_to_speech_inline
+from .openvoice_inline import text_to_speech_inline, get_http_client, close_http_client
+from .task_store import TaskStore
 # 尝试导入voices模块中的内存数据库（同一无服务器实例内可用）
 try:
     from ..voices.index import user_voices_db  # type: ignore
@@ -33,20 +33,20 @@ class TTSRequest(BaseModel):
     text: str
     voice_id: str | None = None
 
-# 简易内存任务表
-_tasks = {}
+# 简易内存任务表（已结束的任务保留一段时间后自动淘汰）
+_tasks = TaskStore()
 
 # 从 voices API 获取音色列表
 async def _get_voices() -> Optional[List[dict]]:
     """从内部voices API获取音色列表"""
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            # 调用内部API
-            r = await client.get("http://localhost:3000/api/voices")
-            if r.status_code == 200:
-                data = r.json()
-                if data.get("success") and data.get("data"):
-                    return data["data"]
+        client = get_http_client()
+        # 调用内部API
+        r = await client.get("http://localhost:3000/api/voices", timeout=5.0)
+        if r.status_code == 200:
+            data = r.json()
+            if data.get("success") and data.get("data"):
+                return data["data"]
     except Exception:
         pass
     return None
@@ -129,3 +129,7 @@ async def get_tts_status(task_id: str):
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     return {"success": True, "data": task}
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_client()
@@ -8,6 +8,26 @@ from typing import Optional, Dict, Any
 OPENVOICE_SPACES = ["https://myshell-openvoice-openvoice-v2.hf.space"]
 EDGE_TTS_ENABLED = True
 
+# 模块级共享客户端：同一无服务器实例内的多次调用复用连接和TLS会话
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享HTTP客户端（延迟创建，关闭后自动重建）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+        )
+    return _http_client
+
+async def close_http_client():
+    """关闭共享HTTP客户端"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 # 系统预设音色映射到Edge TTS声音
 SYSTEM_VOICE_MAPPING = {
     "teacher-female": "zh-CN-XiaoxiaoNeural",  # 女老师
@@ -27,73 +47,73 @@ async def text_to_speech_inline(
     # 如果有参考音频，尝试OpenVoice
     if reference_audio_url and voice_id != "default":
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                # 下载参考音频
-                ref_resp = await client.get(reference_audio_url)
-                if ref_resp.status_code == 200:
-                    ref_audio = ref_resp.content
-                    
-                    # 调用OpenVoice Space
-                    payload = {
-                        "fn_index": 0,
-                        "data": [
-                            text,
-                            "zh",
-                            {
-                                "name": "ref.wav",
-                                "data": f"data:audio/wav;base64,{base64.b64encode(ref_audio).decode()}"
-                            },
-                            1.0,
-                            "default"
-                        ]
-                    }
-                    
-                    for space_url in OPENVOICE_SPACES:
-                        try:
-                            api_url = f"{space_url}/api/predict"
-                            resp = await client.post(api_url, json=payload)
-                            
-                            if resp.status_code == 200:
-                                result = resp.json()
-                                if "data" in result and result["data"]:
-                                    audio_data = result["data"][0]
-                                    
-                                    # 如果是base64音频
-                                    if isinstance(audio_data, str) and audio_data.startswith("data:audio"):
-                                        base64_audio = audio_data.split(",")[1]
-                                        audio_bytes = base64.b64decode(base64_audio)
-                                        
-                                        # 上传到Blob
-                                        token = os.getenv("BLOB_READ_WRITE_TOKEN")
-                                        if token:
-                                            blob_name = f"tts/audio_{uuid.uuid4().hex}.wav"
-                                            blob_resp = await client.put(
-                                                "https://blob.vercel-storage.com",
-                                                headers={
-                                                    "authorization": f"Bearer {token}",
-                                                    "x-content-type": "audio/wav",
-                                                },
-                                                params={"filename": blob_name},
-                                                content=audio_bytes,
-                                            )
-                                            if blob_resp.status_code == 200:
-                                                blob_url = blob_resp.json().get("url")
-                                                return {
-                                                    "success": True,
-                                                    "audio_url": blob_url,
-                                                    "method": "openvoice"
-                                                }
+            client = get_http_client()
+            # 下载参考音频
+            ref_resp = await client.get(reference_audio_url)
+            if ref_resp.status_code == 200:
+                ref_audio = ref_resp.content
+                
+                # 调用OpenVoice Space
+                payload = {
+                    "fn_index": 0,
+                    "data": [
+                        text,
+                        "zh",
+                        {
+                            "name": "ref.wav",
+                            "data": f"data:audio/wav;base64,{base64.b64encode(ref_audio).decode()}"
+                        },
+                        1.0,
+                        "default"
+                    ]
+                }
+                
+                for space_url in OPENVOICE_SPACES:
+                    try:
+                        api_url = f"{space_url}/api/predict"
+                        resp = await client.post(api_url, json=payload)
+                        
+                        if resp.status_code == 200:
+                            result = resp.json()
+                            if "data" in result and result["data"]:
+                                audio_data = result["data"][0]
+                                
+                                # 如果是base64音频
+                                if isinstance(audio_data, str) and audio_data.startswith("data:audio"):
+                                    base64_audio = audio_data.split(",")[1]
+                                    audio_bytes = base64.b64decode(base64_audio)
                                     
-                                    # 如果是URL
-                                    elif isinstance(audio_data, str) and audio_data.startswith("http"):
-                                        return {
-                                            "success": True,
-                                            "audio_url": audio_data,
-                                            "method": "openvoice"
-                                        }
-                        except Exception as e:
-                            print(f"OpenVoice失败: {e}")
-                            continue
+                                    # 上传到Blob
+                                    token = os.getenv("BLOB_READ_WRITE_TOKEN")
+                                    if token:
+                                        blob_name = f"tts/audio_{uuid.uuid4().hex}.wav"
+                                        blob_resp = await client.put(
+                                            "https://blob.vercel-storage.com",
+                                            headers={
+                                                "authorization": f"Bearer {token}",
+                                                "x-content-type": "audio/wav",
+                                            },
+                                            params={"filename": blob_name},
+                                            content=audio_bytes,
+                                        )
+                                        if blob_resp.status_code == 200:
+                                            blob_url = blob_resp.json().get("url")
+                                            return {
+                                                "success": True,
+                                                "audio_url": blob_url,
+                                                "method": "openvoice"
+                                            }
+                                
+                                # 如果是URL
+                                elif isinstance(audio_data, str) and audio_data.startswith("http"):
+                                    return {
+                                        "success": True,
+                                        "audio_url": audio_data,
+                                        "method": "openvoice"
+                                    }
+                    except Exception as e:
+                        print(f"OpenVoice失败: {e}")
+                        continue
         except Exception as e:
             print(f"OpenVoice处理错误: {e}")
     
@@ -114,24 +134,24 @@ async def text_to_speech_inline(
             # 上传到Blob
             token = os.getenv("BLOB_READ_WRITE_TOKEN")
             if token:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    blob_name = f"tts/edge_{uuid.uuid4().hex}.mp3"
-                    blob_resp = await client.put(
-                        "https://blob.vercel-storage.com",
-                        headers={
-                            "authorization": f"Bearer {token}",
-                            "x-content-type": "audio/mpeg",
-                        },
-                        params={"filename": blob_name},
-                        content=audio_data,
-                    )
-                    if blob_resp.status_code == 200:
-                        blob_url = blob_resp.json().get("url")
-                        return {
-                            "success": True,
-                            "audio_url": blob_url,
-                            "method": "edge-tts"
-                        }
+                client = get_http_client()
+                blob_name = f"tts/edge_{uuid.uuid4().hex}.mp3"
+                blob_resp = await client.put(
+                    "https://blob.vercel-storage.com",
+                    headers={
+                        "authorization": f"Bearer {token}",
+                        "x-content-type": "audio/mpeg",
+                    },
+                    params={"filename": blob_name},
+                    content=audio_data,
+                )
+                if blob_resp.status_code == 200:
+                    blob_url = blob_resp.json().get("url")
+                    return {
+                        "success": True,
+                        "audio_url": blob_url,
+                        "method": "edge-tts"
+                    }
         except Exception as e:
             print(f"Edge TTS失败: {e}")
     
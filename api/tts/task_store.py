@@ -0,0 +1,159 @@
+"""
+任务存储模块
+替代模块级的任务字典：接口与dict一致，已结束的任务保留TTL后淘汰，
+任务数超过上限时优先淘汰最早结束的任务，写入时按间隔顺带清理，内存占用不随运行时间增长；
+已结束的任务另按结束顺序记录，过期和淘汰都从最早结束的任务取，不扫描进行中的任务
+
+单一来源为 shared/task_store.py，各服务目录下的副本由 scripts/sync_shared_modules.py 同步，请勿直接修改副本
+"""
+
+import os
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# 已结束任务的保留时间（秒）
+TASK_STORE_TTL = float(os.getenv("TASK_STORE_TTL", "3600"))
+# 任务数上限（只淘汰已结束的任务，进行中的任务由各自的超时/队列上限约束）
+TASK_STORE_MAX_SIZE = int(os.getenv("TASK_STORE_MAX_SIZE", "10000"))
+# 过期清理的最小间隔（秒）
+TASK_STORE_SWEEP_INTERVAL = float(os.getenv("TASK_STORE_SWEEP_INTERVAL", "60"))
+# 超出上限但没有已知的已结束任务时，提前清理的最小间隔（秒）
+TASK_STORE_OVERFLOW_SWEEP_INTERVAL = 1.0
+
+DEFAULT_TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class _Entry:
+    """任务条目：任务字典 + 首次观察到结束的时间"""
+
+    __slots__ = ("task", "finished_at")
+
+    def __init__(self, task: Dict[str, Any]):
+        self.task = task
+        self.finished_at: Optional[float] = None
+
+
+class TaskStore(MutableMapping):
+    """
+    有界、自动过期的任务存储
+
+    任务字典由调用方原地修改状态，存储在清理时根据status字段判断任务是否已结束；
+    因此已结束任务的实际保留时间为TTL加上最多一个清理间隔
+    """
+
+    def __init__(self, ttl: float = TASK_STORE_TTL, max_size: int = TASK_STORE_MAX_SIZE,
+                 sweep_interval: float = TASK_STORE_SWEEP_INTERVAL,
+                 terminal_statuses: Iterable[str] = DEFAULT_TERMINAL_STATUSES):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.sweep_interval = sweep_interval
+        self.terminal_statuses = frozenset(terminal_statuses)
+
+        self._entries: Dict[str, _Entry] = {}
+        # 已结束的任务ID，按观察到结束的先后排列（过期和淘汰都从最早结束的开始）
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._next_sweep = self._last_sweep + sweep_interval
+        self._last_overflow_warning = float("-inf")
+
+        self.expired = 0
+        self.evicted = 0
+
+    def __getitem__(self, task_id: str) -> Dict[str, Any]:
+        return self._entries[task_id].task
+
+    def __setitem__(self, task_id: str, task: Dict[str, Any]):
+        entry = self._entries.get(task_id)
+        if entry is not None:
+            entry.task = task
+            entry.finished_at = None
+            self._finished.pop(task_id, None)
+        else:
+            self._entries[task_id] = _Entry(task)
+
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        if len(self._entries) > self.max_size:
+            self._evict_finished(now)
+
+    def __delitem__(self, task_id: str):
+        del self._entries[task_id]
+        self._finished.pop(task_id, None)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_finished(self, entry: _Entry) -> bool:
+        return entry.task.get("status") in self.terminal_statuses
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """标记新结束的任务并移除超过TTL的任务，返回移除数量"""
+        now = time.monotonic() if now is None else now
+        self._last_sweep = now
+        self._next_sweep = now + self.sweep_interval
+
+        # 任务状态由调用方原地修改，只能在清理时逐个检查
+        for task_id, entry in self._entries.items():
+            if not self._is_finished(entry):
+                if entry.finished_at is not None:
+                    entry.finished_at = None
+                    self._finished.pop(task_id, None)
+            elif entry.finished_at is None:
+                entry.finished_at = now
+                self._finished[task_id] = None
+
+        expired = 0
+        while self._finished:
+            task_id = next(iter(self._finished))
+            if now - self._entries[task_id].finished_at < self.ttl:
+                break
+            self._finished.popitem(last=False)
+            del self._entries[task_id]
+            expired += 1
+
+        self.expired += expired
+        return expired
+
+    def _evict_finished(self, now: float):
+        # 一次多淘汰10%，避免每次写入都触发淘汰
+        excess = len(self._entries) - int(self.max_size * 0.9)
+        if len(self._finished) < excess and now - self._last_sweep >= TASK_STORE_OVERFLOW_SWEEP_INTERVAL:
+            # 上次清理后结束的任务尚未登记，提前清理一次（限频，避免每次写入都全量扫描）
+            self.sweep(now)
+            excess = len(self._entries) - int(self.max_size * 0.9)
+
+        evicted = 0
+        while evicted < excess and self._finished:
+            task_id, _ = self._finished.popitem(last=False)
+            entry = self._entries[task_id]
+            if not self._is_finished(entry):
+                # 任务已被重新启动，下次清理时重新登记
+                entry.finished_at = None
+                continue
+            del self._entries[task_id]
+            evicted += 1
+        self.evicted += evicted
+
+        if len(self._entries) > self.max_size and now - self._last_overflow_warning >= self.sweep_interval:
+            self._last_overflow_warning = now
+            print(f"⚠️ 进行中的任务数超过存储上限: {len(self._entries)}/{self.max_size}")
+
+    def stats(self) -> Dict[str, Any]:
+        """任务存储统计信息"""
+        return {
+            "tasks": len(self._entries),
+            "finished": len(self._finished),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
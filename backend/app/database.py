@@ -3,19 +3,132 @@
 """
 
 import os
-from typing import Optional
+import time
+import asyncio
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from prisma import Prisma
 from contextlib import asynccontextmanager
 
+# 连接池配置：连接数上限、查询引擎等待空闲连接的时间（秒）
+DATABASE_CONNECTION_LIMIT = int(os.getenv("DATABASE_CONNECTION_LIMIT", "10"))
+DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "10"))
+# 请求获取数据库会话的等待上限（秒），超时返回503而不是无限排队
+DATABASE_ACQUIRE_TIMEOUT = float(os.getenv("DATABASE_ACQUIRE_TIMEOUT", "5"))
+# 启动时预先建立的连接数
+DATABASE_WARMUP_CONNECTIONS = int(os.getenv("DATABASE_WARMUP_CONNECTIONS", str(DATABASE_CONNECTION_LIMIT)))
+
 # 全局数据库实例
 db: Optional[Prisma] = None
 
+
+class DatabaseBusy(Exception):
+    """等待数据库会话超时（连接池已满）"""
+
+
+class _SessionLimiter:
+    """
+    请求级数据库会话限流
+
+    同时持有会话的请求数不超过连接池大小，多出的请求在应用内排队并限时等待，
+    不把排队压力转移到查询引擎的连接池上；同时记录连接池饱和度指标
+    """
+
+    def __init__(self, limit: int, timeout: float):
+        self.limit = max(1, limit)
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DatabaseBusy(f"等待数据库连接超过{self.timeout}秒")
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def release(self):
+        self.in_use -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "connection_limit": self.limit,
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "waiting": self.waiting,
+            "saturation": round(self.in_use / self.limit, 2),
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+
+_sessions = _SessionLimiter(DATABASE_CONNECTION_LIMIT, DATABASE_ACQUIRE_TIMEOUT)
+
+
+def _pooled_database_url() -> Tuple[Optional[str], int]:
+    """
+    在数据库URL上附加连接池参数（URL中已显式配置的参数优先）
+
+    Returns:
+        (数据库URL, 实际生效的连接数上限)
+    """
+    url = os.getenv("PRISMA_DATABASE_URL")
+    if not url:
+        return None, DATABASE_CONNECTION_LIMIT
+
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    params.setdefault("connection_limit", str(DATABASE_CONNECTION_LIMIT))
+    params.setdefault("pool_timeout", str(DATABASE_POOL_TIMEOUT))
+    return urlunsplit(parts._replace(query=urlencode(params))), int(params["connection_limit"])
+
+
+async def _warm_up(database: Prisma):
+    """并发执行轻量查询，让查询引擎提前建立连接，避免首批请求承担建连耗时"""
+    count = min(DATABASE_WARMUP_CONNECTIONS, _sessions.limit)
+    if count <= 0:
+        return
+    try:
+        await asyncio.gather(*(database.query_raw("SELECT 1") for _ in range(count)))
+        print(f"✅ 数据库连接池预热完成: {count}个连接")
+    except Exception as e:
+        print(f"⚠️ 数据库连接池预热失败: {str(e)}")
+
+
 async def connect_database():
     """连接数据库"""
     global db
     if db is None:
-        db = Prisma()
+        url, connection_limit = _pooled_database_url()
+        # 会话数上限与查询引擎的连接池大小保持一致
+        _sessions.limit = max(1, connection_limit)
+        db = Prisma(datasource={"url": url}) if url else Prisma()
         await db.connect()
+        await _warm_up(db)
     return db
 
 async def disconnect_database():
@@ -26,20 +139,41 @@ async def disconnect_database():
         db = None
 
 @asynccontextmanager
-async def get_database():
-    """获取数据库连接的上下文管理器"""
+async def database_session():
+    """
+    获取数据库会话的上下文管理器
+
+    用于后台写入，以及需要在数据库访问之间执行慢操作（如上传Blob）的接口，
+    只在数据库读写期间占用会话
+
+    Raises:
+        DatabaseBusy: 在DATABASE_ACQUIRE_TIMEOUT内未获得会话
+    """
     database = await connect_database()
+    await _sessions.acquire()
     try:
         yield database
     finally:
-        # 保持连接，不在这里断开
-        pass
+        _sessions.release()
+
+async def get_database():
+    """FastAPI依赖：请求期间持有一个数据库会话，请求结束时释放"""
+    async with database_session() as database:
+        yield database
+
+def get_pool_stats() -> Dict[str, object]:
+    """连接池配置和饱和度指标"""
+    return {
+        **_sessions.stats(),
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "acquire_timeout": DATABASE_ACQUIRE_TIMEOUT
+    }
 
 async def init_database():
     """初始化数据库"""
     database = await connect_database()
-    
+
     # 这里可以添加初始化数据
     # 例如创建默认配置等
-    
+
     return database
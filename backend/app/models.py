@@ -77,6 +77,7 @@ class VoiceResponse(BaseModel):
 class VoiceListResponse(BaseModel):
     voices: List[VoiceResponse]
     total: int
+    next_cursor: Optional[str] = None
 
 # 任务相关模型
 class TaskCreate(BaseModel):
@@ -101,6 +102,12 @@ class TaskResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TaskProgressUpdate(BaseModel):
+    progress: float = Field(..., ge=0, le=100)
+    status: Optional[TaskStatus] = None
+    error: Optional[str] = None
+    output_url: Optional[str] = None
+
 # TTS请求模型
 class TTSRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=500)
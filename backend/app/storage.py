@@ -6,7 +6,7 @@ import os
 import aiofiles
 from typing import BinaryIO, Optional
 from fastapi import UploadFile
-import httpx
+from http_client import get_http_client
 import uuid
 from datetime import datetime
 import mimetypes
@@ -55,21 +55,21 @@ class BlobStorage:
             content = await file.read()
             
             # 上传到Vercel Blob (使用HTTP API)
-            async with httpx.AsyncClient() as client:
-                response = await client.put(
-                    "https://blob.vercel-storage.com",
-                    headers={
-                        "authorization": f"Bearer {self.token}",
-                        "x-content-type": file.content_type or "application/octet-stream"
-                    },
-                    params={"filename": blob_path},
-                    content=content
-                )
+            client = get_http_client("blob")
+            response = await client.put(
+                "https://blob.vercel-storage.com",
+                headers={
+                    "authorization": f"Bearer {self.token}",
+                    "x-content-type": file.content_type or "application/octet-stream"
+                },
+                params={"filename": blob_path},
+                content=content
+            )
 
-                if response.status_code != 200:
-                    raise Exception(f"Upload failed: {response.status_code}")
+            if response.status_code != 200:
+                raise Exception(f"Upload failed: {response.status_code}")
 
-                result = response.json()
+            result = response.json()
             
             return {
                 "url": result.get("url", f"https://blob.vercel-storage.com/{blob_path}"),
@@ -4,8 +4,11 @@
 
 import os
 import asyncio
-from typing import Optional, Dict, List, Any
+import bisect
+import itertools
+from typing import Optional, Dict, List, Any, Iterable, Set, Tuple
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 # 模拟数据库存储（生产环境应使用真实数据库）
@@ -21,6 +24,150 @@ _memory_db = {
     }
 }
 
+class _Record:
+    """
+    查询结果记录基类：字段固定为__slots__，构造时从存储的字典复制字段值，
+    与Prisma返回的模型对象一样是快照，修改不会影响存储
+    """
+
+    __slots__ = ()
+
+    def __init__(self, data: Dict):
+        for field in self.__slots__:
+            setattr(self, field, data.get(field))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r})"
+
+
+class User(_Record):
+    __slots__ = ("id", "email", "username", "nickname", "wechatOpenId", "createdAt", "updatedAt")
+
+
+class Voice(_Record):
+    __slots__ = ("id", "name", "description", "audioUrl", "audioSize", "audioDuration", "audioFormat",
+                 "voice_model_url", "voice_model_size", "userId", "status", "quality",
+                 "createdAt", "updatedAt")
+
+
+class Task(_Record):
+    __slots__ = ("id", "type", "status", "inputText", "voiceId", "userId", "progress", "error",
+                 "outputUrl", "outputSize", "createdAt", "updatedAt", "completedAt")
+
+
+class Config(_Record):
+    __slots__ = ("id", "key", "value")
+
+
+def check_update_fields(record_type: type, data: Dict):
+    """更新字段必须是记录已有的字段，拼写错误或模型外的字段直接报错而不是被静默丢弃"""
+    unknown = set(data) - set(record_type.__slots__)
+    if "id" in data or unknown:
+        raise ValueError(f"{record_type.__name__}不支持更新字段: {sorted(unknown | ({'id'} & set(data)))}")
+
+
+class _TableIndex:
+    """
+    内存表的二级索引
+
+    - 唯一键：值 -> 记录ID 的哈希索引
+    - 过滤字段：值 -> 记录ID集合 的倒排索引
+    - createdAt：按 (createdAt, id) 排序的有序索引
+    """
+
+    def __init__(self, rows: Dict[str, Dict], unique: Iterable[str] = (), postings: Iterable[str] = ()):
+        self.rows = rows
+        self.unique: Dict[str, Dict[Any, str]] = {field: {} for field in unique}
+        self.postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in postings}
+        self.ordered: List[Tuple[str, str]] = []
+
+    def add(self, record: Dict):
+        record_id = record["id"]
+        for field, index in self.unique.items():
+            if record.get(field) is not None:
+                index[record[field]] = record_id
+        for field, index in self.postings.items():
+            index.setdefault(record.get(field), set()).add(record_id)
+        bisect.insort(self.ordered, (record["createdAt"], record_id))
+
+    def remove(self, record: Dict):
+        record_id = record["id"]
+        for field, index in self.unique.items():
+            if index.get(record.get(field)) == record_id:
+                del index[record[field]]
+        for field, index in self.postings.items():
+            ids = index.get(record.get(field))
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del index[record.get(field)]
+        key = (record["createdAt"], record_id)
+        position = bisect.bisect_left(self.ordered, key)
+        if position < len(self.ordered) and self.ordered[position] == key:
+            del self.ordered[position]
+
+    def lookup(self, field: str, value: Any) -> Optional[str]:
+        """按唯一键查找记录ID"""
+        return self.unique[field].get(value)
+
+    def matching(self, where: Optional[Dict]) -> Optional[Set[str]]:
+        """返回满足过滤条件的记录ID集合；没有可用条件时返回None（表示全部记录）"""
+        sets = [
+            self.postings[field].get(value, set())
+            for field, value in (where or {}).items()
+            if field in self.postings and value
+        ]
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+
+    def ordered_ids(self, ids: Optional[Set[str]], descending: bool,
+                    cursor_id: Optional[str] = None) -> Iterable[str]:
+        """
+        按 (createdAt, id) 顺序返回记录ID，ids为None时遍历全表
+
+        指定cursor_id时从该记录开始（含该记录，与Prisma的cursor语义一致），
+        全表遍历时通过二分查找直接定位，不需要跳过前面的记录
+        """
+        if cursor_id is not None:
+            cursor = self.rows.get(cursor_id)
+            if cursor is None:
+                return iter(())
+            cursor_key = (cursor["createdAt"], cursor_id)
+
+        if ids is None:
+            if cursor_id is None:
+                entries = reversed(self.ordered) if descending else iter(self.ordered)
+            elif descending:
+                position = bisect.bisect_right(self.ordered, cursor_key)
+                entries = (self.ordered[i] for i in range(position - 1, -1, -1))
+            else:
+                position = bisect.bisect_left(self.ordered, cursor_key)
+                entries = (self.ordered[i] for i in range(position, len(self.ordered)))
+            return (record_id for _, record_id in entries)
+
+        keys = [(self.rows[record_id]["createdAt"], record_id) for record_id in ids]
+        if cursor_id is not None:
+            keys = [key for key in keys if (key <= cursor_key if descending else key >= cursor_key)]
+        keys.sort(reverse=descending)
+        return (record_id for _, record_id in keys)
+
+
+_user_index = _TableIndex(_memory_db["users"], unique=("email", "wechatOpenId"))
+_voice_index = _TableIndex(_memory_db["voices"], postings=("userId", "status"))
+
+# 自增ID（删除记录后不会复用已有ID）
+_id_counters = {table: itertools.count(1) for table in ("users", "voices", "tasks")}
+
+
+def _next_id(table: str, prefix: str) -> str:
+    while True:
+        record_id = f"{prefix}_{next(_id_counters[table])}"
+        if record_id not in _memory_db[table]:
+            return record_id
+
+
 class MockDatabase:
     """模拟数据库类"""
 
@@ -48,20 +195,23 @@ class MockDatabase:
     class user:
         @staticmethod
         async def find_unique(where: Dict):
-            """查找唯一用户"""
-            for user_id, user in _memory_db["users"].items():
-                if where.get("id") == user_id:
-                    return type('User', (), user)()
-                if where.get("email") == user.get("email"):
-                    return type('User', (), user)()
-                if where.get("wechatOpenId") == user.get("wechatOpenId"):
-                    return type('User', (), user)()
-            return None
+            """查找唯一用户（按ID或唯一键索引）"""
+            if where.get("id"):
+                user_id = where["id"]
+            elif where.get("email"):
+                user_id = _user_index.lookup("email", where["email"])
+            elif where.get("wechatOpenId"):
+                user_id = _user_index.lookup("wechatOpenId", where["wechatOpenId"])
+            else:
+                return None
+
+            user = _memory_db["users"].get(user_id)
+            return User(user) if user else None
         
         @staticmethod
         async def create(data: Dict):
             """创建用户"""
-            user_id = f"user_{len(_memory_db['users']) + 1}"
+            user_id = _next_id("users", "user")
             user_data = {
                 "id": user_id,
                 "email": data.get("email"),
@@ -72,52 +222,45 @@ class MockDatabase:
                 "updatedAt": datetime.now().isoformat()
             }
             _memory_db["users"][user_id] = user_data
-            return type('User', (), user_data)()
+            _user_index.add(user_data)
+            return User(user_data)
     
     # 音色相关操作
     class voice:
         @staticmethod
         async def find_unique(where: Dict):
             """查找唯一音色"""
-            for voice_id, voice in _memory_db["voices"].items():
-                if where.get("id") == voice_id:
-                    return type('Voice', (), voice)()
-            return None
+            voice = _memory_db["voices"].get(where.get("id"))
+            return Voice(voice) if voice else None
         
         @staticmethod
-        async def find_many(where: Dict = None, skip: int = 0, take: int = 20, order_by: Dict = None):
-            """查找多个音色"""
-            voices = list(_memory_db["voices"].values())
-            
-            # 简单过滤
-            if where:
-                if where.get("userId"):
-                    voices = [v for v in voices if v.get("userId") == where["userId"]]
-                if where.get("status"):
-                    voices = [v for v in voices if v.get("status") == where["status"]]
-            
-            # 分页
-            voices = voices[skip:skip + take]
-            
-            return [type('Voice', (), voice)() for voice in voices]
+        async def find_many(where: Dict = None, skip: int = 0, take: int = 20,
+                            order: Any = None, cursor: Dict = None):
+            """
+            查找多个音色（按userId/status倒排索引过滤，按 (createdAt, id) 有序索引排序）
+
+            参数与Prisma一致：order为 {"createdAt": "desc"} 或其列表，
+            cursor为 {"id": ...}，结果从游标记录开始，通常配合skip=1跳过游标本身
+            """
+            ids = _voice_index.matching(where)
+            orders = order if isinstance(order, list) else [order or {}]
+            descending = any(item.get("createdAt") == "desc" for item in orders)
+            cursor_id = (cursor or {}).get("id")
+            ordered = _voice_index.ordered_ids(ids, descending, cursor_id)
+            page = itertools.islice(ordered, skip, skip + take)
+
+            return [Voice(_memory_db["voices"][voice_id]) for voice_id in page]
         
         @staticmethod
         async def count(where: Dict = None):
             """统计音色数量"""
-            voices = list(_memory_db["voices"].values())
-            
-            if where:
-                if where.get("userId"):
-                    voices = [v for v in voices if v.get("userId") == where["userId"]]
-                if where.get("status"):
-                    voices = [v for v in voices if v.get("status") == where["status"]]
-            
-            return len(voices)
+            ids = _voice_index.matching(where)
+            return len(_memory_db["voices"]) if ids is None else len(ids)
         
         @staticmethod
         async def create(data: Dict):
             """创建音色"""
-            voice_id = f"voice_{len(_memory_db['voices']) + 1}"
+            voice_id = _next_id("voices", "voice")
             voice_data = {
                 "id": voice_id,
                 "name": data.get("name"),
@@ -135,31 +278,44 @@ class MockDatabase:
                 "updatedAt": datetime.now().isoformat()
             }
             _memory_db["voices"][voice_id] = voice_data
-            return type('Voice', (), voice_data)()
+            _voice_index.add(voice_data)
+            return Voice(voice_data)
+        
+        @staticmethod
+        async def update(where: Dict, data: Dict):
+            """更新音色（同步维护索引）"""
+            check_update_fields(Voice, data)
+            voice = _memory_db["voices"].get(where.get("id"))
+            if voice is None:
+                return None
+
+            _voice_index.remove(voice)
+            voice.update(data)
+            voice["updatedAt"] = datetime.now().isoformat()
+            _voice_index.add(voice)
+            return Voice(voice)
         
         @staticmethod
         async def delete(where: Dict):
             """删除音色"""
-            voice_id = where.get("id")
-            if voice_id in _memory_db["voices"]:
-                del _memory_db["voices"][voice_id]
-                return True
-            return False
+            voice = _memory_db["voices"].pop(where.get("id"), None)
+            if voice is None:
+                return False
+            _voice_index.remove(voice)
+            return True
     
     # 任务相关操作
     class task:
         @staticmethod
         async def find_unique(where: Dict):
             """查找唯一任务"""
-            for task_id, task in _memory_db["tasks"].items():
-                if where.get("id") == task_id:
-                    return type('Task', (), task)()
-            return None
+            task = _memory_db["tasks"].get(where.get("id"))
+            return Task(task) if task else None
         
         @staticmethod
         async def create(data: Dict):
             """创建任务"""
-            task_id = f"task_{len(_memory_db['tasks']) + 1}"
+            task_id = _next_id("tasks", "task")
             task_data = {
                 "id": task_id,
                 "type": data.get("type"),
@@ -169,21 +325,38 @@ class MockDatabase:
                 "userId": data.get("userId"),
                 "progress": data.get("progress", 0),
                 "error": data.get("error"),
+                "outputUrl": data.get("outputUrl"),
+                "outputSize": data.get("outputSize"),
                 "createdAt": datetime.now().isoformat(),
-                "updatedAt": datetime.now().isoformat()
+                "updatedAt": datetime.now().isoformat(),
+                "completedAt": data.get("completedAt")
             }
             _memory_db["tasks"][task_id] = task_data
-            return type('Task', (), task_data)()
+            return Task(task_data)
         
         @staticmethod
         async def update(where: Dict, data: Dict):
             """更新任务"""
+            check_update_fields(Task, data)
             task_id = where.get("id")
             if task_id in _memory_db["tasks"]:
                 _memory_db["tasks"][task_id].update(data)
                 _memory_db["tasks"][task_id]["updatedAt"] = datetime.now().isoformat()
-                return type('Task', (), _memory_db["tasks"][task_id])()
+                return Task(_memory_db["tasks"][task_id])
             return None
+        
+        @staticmethod
+        async def batch_update(updates: Dict[str, Dict]):
+            """批量更新任务（{任务ID: 更新字段}，不存在的任务忽略，未知字段抛出ValueError）"""
+            for data in updates.values():
+                check_update_fields(Task, data)
+
+            now = datetime.now().isoformat()
+            for task_id, data in updates.items():
+                task = _memory_db["tasks"].get(task_id)
+                if task is not None:
+                    task.update(data)
+                    task["updatedAt"] = now
     
     # 配置相关操作
     class config:
@@ -192,11 +365,11 @@ class MockDatabase:
             """查找配置"""
             key = where.get("key")
             if key in _memory_db["configs"]:
-                return type('Config', (), {
+                return Config({
                     "id": key,
                     "key": key,
                     "value": _memory_db["configs"][key]
-                })()
+                })
             return None
         
         @staticmethod
@@ -205,17 +378,23 @@ class MockDatabase:
             key = data.get("key")
             value = data.get("value")
             _memory_db["configs"][key] = value
-            return type('Config', (), {
+            return Config({
                 "id": key,
                 "key": key,
                 "value": value
-            })()
+            })
         
         @staticmethod
         async def count():
             """统计配置数量"""
             return len(_memory_db["configs"])
 
+class DatabaseBusy(Exception):
+    """等待数据库连接超时（与app.database接口一致，进程内实现不会抛出）"""
+
+# 存储后端：memory（进程内，默认）或 sqlite（持久化，同机多个worker共享）
+DATABASE_BACKEND = (os.getenv("DATABASE_BACKEND") or "memory").lower()
+
 # 全局数据库实例
 db: Optional[MockDatabase] = None
 
@@ -223,7 +402,11 @@ async def connect_database():
     """连接数据库"""
     global db
     if db is None:
-        db = MockDatabase()
+        if DATABASE_BACKEND == "sqlite":
+            from sqlite_database import SQLiteDatabase
+            db = SQLiteDatabase()
+        else:
+            db = MockDatabase()
         await db.connect()
     return db
 
@@ -234,13 +417,25 @@ async def disconnect_database():
         await db.disconnect()
         db = None
 
+@asynccontextmanager
+async def database_session():
+    """获取数据库会话的上下文管理器（与app.database接口一致，进程内实现不限流）"""
+    yield await connect_database()
+
 async def get_database():
     """获取数据库连接"""
     database = await connect_database()
     return database
 
+def get_pool_stats() -> Dict[str, Any]:
+    """连接池指标（进程内/SQLite实现没有连接池）"""
+    return {"backend": DATABASE_BACKEND}
+
 async def init_database():
     """初始化数据库"""
     database = await connect_database()
-    print("✅ 模拟数据库初始化完成")
+    if DATABASE_BACKEND == "sqlite":
+        print(f"✅ SQLite数据库初始化完成: {database.path}")
+    else:
+        print("✅ 模拟数据库初始化完成")
     return database
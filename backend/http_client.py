@@ -0,0 +1,71 @@
+"""
+共享HTTP客户端模块
+按上游服务维护应用生命周期内复用的httpx.AsyncClient，保持长连接和TLS会话，
+每个上游独立限制连接数，应用关闭时统一释放
+"""
+
+import os
+import importlib.util
+from typing import Dict, Optional
+
+import httpx
+
+# 连接池配置（每个上游服务一个客户端，限制即为单主机限制）
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+# HTTP/2需要安装h2包，未安装时自动退回HTTP/1.1
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def get_http_client(name: str = "default", base_url: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    获取指定上游的共享客户端（延迟创建）
+
+    Args:
+        name: 上游名称，如 "ai-service"、"blob"
+        base_url: 上游基础地址，仅在首次创建时生效
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url or "",
+            timeout=HTTP_DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            http2=_http2_available()
+        )
+        _clients[name] = client
+    return client
+
+
+async def close_http_clients():
+    """关闭全部共享客户端（应用关闭时调用）"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            print(f"⚠️ 关闭HTTP客户端失败: {str(e)}")
+
+
+def get_http_client_stats() -> Dict[str, object]:
+    """共享客户端配置和状态"""
+    return {
+        "clients": sorted(name for name, client in _clients.items() if not client.is_closed),
+        "max_connections_per_host": HTTP_MAX_CONNECTIONS_PER_HOST,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+        "http2": _http2_available()
+    }
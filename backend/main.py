@@ -3,13 +3,14 @@
 极简设计的AI语音克隆应用后端服务
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 import uvicorn
 import os
+import time
 import uuid
 import asyncio
 import tempfile
@@ -63,35 +64,92 @@ class VoiceInfo(BaseModel):
 # AI服务配置
 AI_SERVICE_URL = "http://localhost:8001"
 
-# HTTP客户端
+# 单次合成的最大文本长度（AI服务对长文本分段并行合成）
+MAX_TEXT_LENGTH = 2000
+
+# 音色样本上传大小限制（请求体逐块转发，超过限制立即中止）
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+
+# AI服务任务回调配置
+# BACKEND_PUBLIC_URL为AI服务可访问的本服务地址，与CALLBACK_SECRET同时配置后AI服务在任务状态变化时
+# 主动回调，轮询降级为低频兜底；任一未配置时不接受回调，仍按原频率轮询
+BACKEND_PUBLIC_URL = os.getenv("BACKEND_PUBLIC_URL", "").rstrip("/")
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET", "")
+# 启用回调后的兜底轮询间隔（秒）
+CALLBACK_FALLBACK_POLL_INTERVAL = 15
+# 训练任务超过该时长（秒）未从AI服务获得排队中/训练中的状态时判定超时；
+# AI服务每次报告任务仍在排队或训练都会重新计时，排队较久的任务不会被误判
+TRAINING_STALL_TIMEOUT = 600
+
+# HTTP客户端（按上游复用连接池）
 import httpx
+from http_client import get_http_client, close_http_clients, get_http_client_stats
+from voice_catalogue import VoiceCatalogue, etag_matches
+from media_files import serve_audio_file
+from request_coalescer import RequestCoalescer, normalize_text
+from task_store import TaskStore
+from request_signing import verify_signature
 
 # 内存存储（MVP版本使用，生产环境应使用数据库）
 voices_db = {}
-tasks_db = {}
+# 任务表：已结束的任务保留一段时间后自动淘汰
+tasks_db = TaskStore()
+
+async def sync_voices_from_ai_service() -> bool:
+    """从AI服务同步音色到voices_db（保留本地记录的其他字段），返回是否成功"""
+    client = get_http_client("ai-service")
+    response = await client.get(f"{AI_SERVICE_URL}/voices", timeout=10)
+    if response.status_code != 200:
+        print(f"⚠️ AI服务连接失败: {response.status_code}")
+        return False
+
+    data = response.json()
+    if not data.get("success"):
+        print("⚠️ AI服务返回错误")
+        return False
+
+    for voice in data.get("data", []):
+        entry = voices_db.setdefault(voice["id"], {
+            "created_at": voice.get("created_at", datetime.now().isoformat())
+        })
+        entry.update({
+            "id": voice["id"],
+            "name": voice["name"],
+            "status": voice["status"],
+            "type": voice.get("type", "system")
+        })
+    return True
+
+async def load_voice_catalogue() -> List[dict]:
+    """音色目录加载函数：同步AI服务音色后返回可用音色，AI服务不可用时使用本地缓存"""
+    try:
+        await sync_voices_from_ai_service()
+    except Exception as e:
+        print(f"获取AI服务音色失败: {str(e)}")
+
+    return [
+        {
+            "id": voice["id"],
+            "name": voice["name"],
+            "status": voice["status"]
+        }
+        for voice in voices_db.values()
+        if voice["status"] == "ready"
+    ]
+
+# 音色目录缓存：TTL到期、训练完成或删除音色时重新加载
+voice_catalogue = VoiceCatalogue(load_voice_catalogue)
+
+# TTS请求合并：相同音色和文本的合成进行中时复用同一任务
+tts_coalescer = RequestCoalescer()
 
 # 初始化时从AI服务获取音色列表
 async def init_voices_from_ai_service():
     """从AI服务初始化音色列表"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{AI_SERVICE_URL}/voices", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    for voice in data.get("data", []):
-                        voices_db[voice["id"]] = {
-                            "id": voice["id"],
-                            "name": voice["name"],
-                            "status": voice["status"],
-                            "type": voice.get("type", "system"),
-                            "created_at": voice.get("created_at", datetime.now().isoformat())
-                        }
-                    print(f"✅ 从AI服务加载了 {len(voices_db)} 个音色")
-                else:
-                    print("⚠️ AI服务返回错误")
-            else:
-                print(f"⚠️ AI服务连接失败: {response.status_code}")
+        if await sync_voices_from_ai_service():
+            print(f"✅ 从AI服务加载了 {len(voices_db)} 个音色")
     except Exception as e:
         print(f"⚠️ 无法连接AI服务: {str(e)}")
         # 使用默认音色作为备选
@@ -121,62 +179,63 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "teacher-call-me-to-school-api"
+        "service": "teacher-call-me-to-school-api",
+        "ai_task_updates": "callback" if _callbacks_enabled() else "polling",
+        "http_clients": get_http_client_stats(),
+        "voice_catalogue": voice_catalogue.stats(),
+        "tts_coalescing": tts_coalescer.stats(),
+        "task_store": tasks_db.stats()
     }
 
 # ==================== 核心API接口 ====================
 
 @app.get("/api/voices")
-async def get_voices():
-    """获取可用音色列表 - 从AI服务获取"""
+async def get_voices(request: Request):
+    """获取可用音色列表 - 读取音色目录缓存，支持If-None-Match条件请求"""
+    voices, etag = await voice_catalogue.get()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    # 与响应体取自同一快照的ETag比较，期间目录重新加载也不会错配
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(
+        content={
+            "success": True,
+            "data": voices
+        },
+        headers=headers
+    )
+
+@app.delete("/api/voices/{voice_id}")
+async def delete_voice(voice_id: str):
+    """删除克隆音色 - 转发到AI服务并刷新音色目录"""
+    voice = voices_db.get(voice_id)
+    if voice is None:
+        raise HTTPException(status_code=404, detail="音色不存在")
+
+    if voice.get("type") == "system":
+        raise HTTPException(status_code=400, detail="系统音色不能删除")
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{AI_SERVICE_URL}/voices", timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    # 更新本地缓存
-                    for voice in data.get("data", []):
-                        voices_db[voice["id"]] = {
-                            "id": voice["id"],
-                            "name": voice["name"],
-                            "status": voice["status"],
-                            "type": voice.get("type", "system")
-                        }
-
-                    # 返回简化的音色列表
-                    voices = [
-                        {
-                            "id": voice["id"],
-                            "name": voice["name"],
-                            "status": voice["status"]
-                        }
-                        for voice in data.get("data", [])
-                        if voice["status"] == "ready"
-                    ]
-
-                    return {
-                        "success": True,
-                        "data": voices
-                    }
+        client = get_http_client("ai-service")
+        response = await client.delete(f"{AI_SERVICE_URL}/voice/{voice_id}", timeout=10)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="AI服务响应超时")
     except Exception as e:
-        print(f"获取AI服务音色失败: {str(e)}")
+        print(f"删除音色失败: {str(e)}")
+        raise HTTPException(status_code=500, detail="删除服务暂时不可用")
 
-    # 备选方案：返回本地缓存
-    voices = [
-        {
-            "id": voice["id"],
-            "name": voice["name"],
-            "status": voice["status"]
-        }
-        for voice in voices_db.values()
-        if voice["status"] == "ready"
-    ]
+    # AI服务返回404说明模型已不存在，本地记录同样删除
+    if response.status_code not in (200, 404):
+        raise HTTPException(status_code=response.status_code, detail=f"AI服务错误: {response.text}")
+
+    del voices_db[voice_id]
+    voice_catalogue.invalidate()
 
     return {
         "success": True,
-        "data": voices
+        "message": "音色删除成功"
     }
 
 @app.post("/api/tts")
@@ -187,60 +246,76 @@ async def text_to_speech(request: TTSRequest):
     if not request.text.strip():
         raise HTTPException(status_code=400, detail="文本不能为空")
 
-    if len(request.text) > 200:
-        raise HTTPException(status_code=400, detail="文本长度不能超过200字符")
-
-    try:
-        # 调用AI服务进行语音合成
-        async with httpx.AsyncClient() as client:
-            form_data = {
-                "text": request.text,
-                "voice_id": request.voice_id or "default"
-            }
+    if len(request.text) > MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"文本长度不能超过{MAX_TEXT_LENGTH}字符")
 
-            response = await client.post(
-                f"{AI_SERVICE_URL}/synthesize",
-                data=form_data,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    ai_task_id = data["data"]["task_id"]
-
-                    # 创建本地任务映射
-                    local_task_id = str(uuid.uuid4())
-                    task = {
-                        "id": local_task_id,
-                        "ai_task_id": ai_task_id,
-                        "text": request.text,
-                        "voice_id": request.voice_id or "default",
-                        "voice_name": voices_db.get(request.voice_id or "default", {}).get("name", "未知音色"),
-                        "status": "processing",
-                        "progress": 0,
-                        "audio_url": None,
-                        "created_at": datetime.now().isoformat()
-                    }
+    voice_id = request.voice_id or "default"
+    coalesce_key = f"{voice_id}\x00{normalize_text(request.text)}"
 
-                    tasks_db[local_task_id] = task
+    async def submit_synthesis() -> str:
+        # 调用AI服务进行语音合成
+        client = get_http_client("ai-service")
+        local_task_id = str(uuid.uuid4())
+        form_data = {
+            "text": request.text,
+            "voice_id": voice_id
+        }
+        if _callbacks_enabled():
+            form_data["callback_url"] = f"{BACKEND_PUBLIC_URL}/api/callbacks/tts/{local_task_id}"
+
+        response = await client.post(
+            f"{AI_SERVICE_URL}/synthesize",
+            data=form_data,
+            timeout=30
+        )
+
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"AI服务请求失败: {response.status_code}")
+
+        data = response.json()
+        if not data.get("success"):
+            raise HTTPException(status_code=500, detail="AI服务返回错误")
+
+        # 创建本地任务映射
+        tasks_db[local_task_id] = {
+            "id": local_task_id,
+            "ai_task_id": data["data"]["task_id"],
+            "text": request.text,
+            "voice_id": voice_id,
+            "voice_name": voices_db.get(voice_id, {}).get("name", "未知音色"),
+            "status": "processing",
+            "progress": 0,
+            "audio_url": None,
+            "coalesce_key": coalesce_key,
+            "merged_requests": 0,
+            "created_at": datetime.now().isoformat()
+        }
 
-                    # 启动状态轮询
-                    asyncio.create_task(poll_ai_service_task(local_task_id))
+        # 启动状态轮询（启用回调时为低频兜底）
+        asyncio.create_task(poll_ai_service_task(local_task_id))
+        return local_task_id
 
-                    return {
-                        "success": True,
-                        "data": {
-                            "task_id": local_task_id,
-                            "status": "processing",
-                            "message": "正在生成语音..."
-                        }
-                    }
-                else:
-                    raise HTTPException(status_code=500, detail="AI服务返回错误")
-            else:
-                raise HTTPException(status_code=500, detail=f"AI服务请求失败: {response.status_code}")
+    try:
+        # 相同音色和文本的合成仍在进行时直接复用该任务，不重复提交AI服务
+        local_task_id, merged = await tts_coalescer.run(
+            coalesce_key,
+            submit_synthesis,
+            lambda task_id: tasks_db.get(task_id, {}).get("status") == "processing"
+        )
+        if merged:
+            tasks_db[local_task_id]["merged_requests"] += 1
+
+        return {
+            "success": True,
+            "data": {
+                "task_id": local_task_id,
+                "status": "processing",
+                "message": "正在生成语音..."
+            }
+        }
 
+    except HTTPException:
+        raise
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="AI服务响应超时")
     except Exception as e:
@@ -269,88 +344,104 @@ async def get_tts_status(task_id: str):
     }
 
 @app.get("/api/audio/{filename}")
-async def get_audio_file(filename: str):
-    """获取音频文件"""
+async def get_audio_file(filename: str, request: Request):
+    """获取音频文件，支持Range分段请求和ETag条件请求"""
     file_path = AUDIO_DIR / filename
-    if not file_path.exists():
+    try:
+        return await serve_audio_file(request, str(file_path))
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="音频文件不存在")
 
-    return FileResponse(
-        file_path,
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": f"inline; filename={filename}"}
-    )
+class UploadTooLarge(Exception):
+    """上传内容超过大小限制"""
+
+async def stream_request_body(request: Request, max_bytes: int):
+    """逐块读取请求体并累计大小，超过限制时立即中止"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise UploadTooLarge()
+        yield chunk
 
 @app.post("/api/voice/upload")
-async def upload_voice_sample(
-    audio_file: UploadFile = File(...),
-    voice_name: str = Form(...)
-):
-    """上传音频样本用于声音克隆 - 使用AI服务"""
-
-    # 验证文件类型
-    if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
+async def upload_voice_sample(request: Request):
+    """
+    上传音频样本用于声音克隆 - 使用AI服务
+
+    multipart请求体（audio_file、voice_name字段）不在本服务解析，逐块转发给AI服务，
+    文件类型和音色名称由AI服务校验
+    """
+
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
         raise HTTPException(status_code=400, detail="请上传音频文件")
 
-    # 验证音色名称
-    if not voice_name.strip() or len(voice_name) > 20:
-        raise HTTPException(status_code=400, detail="音色名称长度应在1-20字符之间")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"文件大小不能超过{MAX_UPLOAD_MB}MB")
 
     try:
-        # 准备文件数据
-        content = await audio_file.read()
-
         # 调用AI服务上传音频
-        async with httpx.AsyncClient() as client:
-            files = {
-                "audio_file": (audio_file.filename, content, audio_file.content_type)
-            }
-            data = {
-                "voice_name": voice_name.strip()
-            }
-
-            response = await client.post(
-                f"{AI_SERVICE_URL}/voice/upload",
-                files=files,
-                data=data,
-                timeout=60
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("success"):
-                    upload_data = result["data"]
-
-                    # 添加到本地音色数据库
-                    voice_id = upload_data["voice_id"]
-                    voices_db[voice_id] = {
-                        "id": voice_id,
-                        "name": voice_name.strip(),
+        client = get_http_client("ai-service")
+        headers = {"Content-Type": content_type}
+        if content_length:
+            headers["Content-Length"] = content_length
+        if _callbacks_enabled():
+            # AI服务生成音色ID，回调地址按AI训练任务ID路由
+            headers["X-Callback-Url"] = f"{BACKEND_PUBLIC_URL}/api/callbacks/voice"
+
+        response = await client.post(
+            f"{AI_SERVICE_URL}/voice/upload",
+            content=stream_request_body(request, MAX_UPLOAD_BYTES),
+            headers=headers,
+            timeout=60
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            if result.get("success"):
+                upload_data = result["data"]
+                voice_name = upload_data["voice_name"].strip()
+
+                # 添加到本地音色数据库
+                voice_id = upload_data["voice_id"]
+                voices_db[voice_id] = {
+                    "id": voice_id,
+                    "name": voice_name,
+                    "status": "training",
+                    "type": "cloned",
+                    "created_at": datetime.now().isoformat(),
+                    "ai_task_id": upload_data["task_id"]
+                }
+
+                # 启动训练状态轮询（启用回调时为低频兜底）
+                asyncio.create_task(poll_training_status(voice_id, upload_data["task_id"]))
+
+                return {
+                    "success": True,
+                    "data": {
+                        "voice_id": voice_id,
+                        "name": voice_name,
                         "status": "training",
-                        "type": "cloned",
-                        "created_at": datetime.now().isoformat(),
-                        "ai_task_id": upload_data["task_id"]
-                    }
-
-                    # 启动训练状态轮询
-                    asyncio.create_task(poll_training_status(voice_id, upload_data["task_id"]))
-
-                    return {
-                        "success": True,
-                        "data": {
-                            "voice_id": voice_id,
-                            "name": voice_name,
-                            "status": "training",
-                            "estimated_time": upload_data.get("estimated_time", 60),
-                            "message": "正在训练音色模型..."
-                        }
+                        "estimated_time": upload_data.get("estimated_time", 60),
+                        "message": "正在训练音色模型..."
                     }
-                else:
-                    raise HTTPException(status_code=400, detail=result.get("error", "上传失败"))
+                }
             else:
-                error_text = response.text
-                raise HTTPException(status_code=response.status_code, detail=f"AI服务错误: {error_text}")
-
+                raise HTTPException(status_code=400, detail=result.get("error", "上传失败"))
+        else:
+            # 参数校验错误原样返回
+            try:
+                detail = response.json().get("detail")
+            except ValueError:
+                detail = None
+            if response.status_code in (400, 413, 422) and detail:
+                raise HTTPException(status_code=response.status_code, detail=detail)
+            raise HTTPException(status_code=response.status_code, detail=f"AI服务错误: {response.text}")
+
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"文件大小不能超过{MAX_UPLOAD_MB}MB")
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="上传超时，请重试")
     except HTTPException:
@@ -361,114 +452,215 @@ async def upload_voice_sample(
 
 # ==================== 异步任务处理 ====================
 
+def _callbacks_enabled() -> bool:
+    return bool(BACKEND_PUBLIC_URL and CALLBACK_SECRET)
+
+def apply_ai_tts_status(task: dict, ai_task: dict) -> bool:
+    """用AI服务返回的合成任务状态更新本地任务，返回是否已到达终态"""
+    task["status"] = ai_task["status"]
+    task["progress"] = ai_task["progress"]
+
+    if ai_task["status"] == "completed":
+        # 获取音频URL
+        if ai_task["audio_url"]:
+            # 转换AI服务的URL为本地URL
+            audio_filename = ai_task["audio_url"].split("/")[-1]
+            task["audio_url"] = f"/api/audio/{audio_filename}"
+
+        task["completed_at"] = datetime.now().isoformat()
+        return True
+    elif ai_task["status"] in ("failed", "cancelled"):
+        task["status"] = "failed"
+        task["error"] = ai_task.get("error") or "AI服务处理失败"
+        return True
+    return False
+
+def apply_ai_training_status(voice: dict, ai_task: dict) -> bool:
+    """用AI服务返回的训练任务状态更新本地音色，返回是否已到达终态"""
+    if ai_task["status"] == "completed":
+        voice["status"] = "ready"
+        voice["completed_at"] = datetime.now().isoformat()
+        # 新音色可用，音色目录需要重新加载
+        voice_catalogue.invalidate()
+        return True
+    elif ai_task["status"] in ("failed", "cancelled"):
+        voice["status"] = "failed"
+        voice["error"] = ai_task.get("error") or "训练失败"
+        return True
+
+    voice["progress"] = ai_task.get("progress", 0)
+    return False
+
 async def poll_ai_service_task(local_task_id: str):
-    """轮询AI服务的TTS任务状态"""
+    """
+    轮询AI服务的TTS任务状态
+
+    启用回调时状态由回调更新，轮询降级为低频兜底，只负责补漏和超时判定
+    """
     try:
         task = tasks_db[local_task_id]
         ai_task_id = task["ai_task_id"]
 
-        max_attempts = 60  # 最多轮询60次 (60秒)
-        attempt = 0
+        timeout_seconds = 60  # 最多等待60秒
+        interval = CALLBACK_FALLBACK_POLL_INTERVAL if _callbacks_enabled() else 1
+        deadline = time.monotonic() + timeout_seconds
+
+        client = get_http_client("ai-service")
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            # 回调已更新到终态
+            if task["status"] != "processing":
+                return
 
-        while attempt < max_attempts:
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{AI_SERVICE_URL}/synthesize/status/{ai_task_id}",
-                        timeout=10
-                    )
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("success"):
-                            ai_task = data["data"]
-
-                            # 更新本地任务状态
-                            task["status"] = ai_task["status"]
-                            task["progress"] = ai_task["progress"]
-
-                            if ai_task["status"] == "completed":
-                                # 获取音频URL
-                                if ai_task["audio_url"]:
-                                    # 转换AI服务的URL为本地URL
-                                    audio_filename = ai_task["audio_url"].split("/")[-1]
-                                    task["audio_url"] = f"/api/audio/{audio_filename}"
-
-                                task["completed_at"] = datetime.now().isoformat()
-                                break
-                            elif ai_task["status"] == "failed":
-                                task["error"] = ai_task.get("error", "AI服务处理失败")
-                                break
+                response = await client.get(
+                    f"{AI_SERVICE_URL}/synthesize/status/{ai_task_id}",
+                    timeout=10
+                )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get("success") and apply_ai_tts_status(task, data["data"]):
+                        return
 
             except Exception as e:
                 print(f"轮询AI服务状态失败: {str(e)}")
 
-            attempt += 1
-            await asyncio.sleep(1)  # 等待1秒后重试
-
         # 如果超时仍未完成
-        if attempt >= max_attempts and task["status"] == "processing":
+        if task["status"] == "processing":
             task["status"] = "failed"
             task["error"] = "处理超时"
 
     except Exception as e:
         task["status"] = "failed"
         task["error"] = str(e)
+    finally:
+        # 任务已结束，后续相同请求重新提交合成
+        tts_coalescer.release(tasks_db.get(local_task_id, {}).get("coalesce_key", ""))
 
 async def poll_training_status(voice_id: str, ai_task_id: str):
-    """轮询AI服务的训练任务状态"""
+    """
+    轮询AI服务的训练任务状态
+
+    启用回调时状态由回调更新，轮询降级为低频兜底，只负责补漏和超时判定；
+    AI服务报告任务仍在排队或训练时延长等待期限
+    """
     try:
         voice = voices_db[voice_id]
 
-        max_attempts = 300  # 最多轮询5分钟
-        attempt = 0
+        interval = CALLBACK_FALLBACK_POLL_INTERVAL if _callbacks_enabled() else 2
+        deadline = time.monotonic() + TRAINING_STALL_TIMEOUT
+
+        client = get_http_client("ai-service")
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            # 回调已更新到终态
+            if voice["status"] != "training":
+                return
 
-        while attempt < max_attempts:
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{AI_SERVICE_URL}/voice/training/status/{ai_task_id}",
-                        timeout=10
-                    )
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get("success"):
-                            ai_task = data["data"]
-
-                            # 更新本地音色状态
-                            if ai_task["status"] == "completed":
-                                voice["status"] = "ready"
-                                voice["completed_at"] = datetime.now().isoformat()
-                                break
-                            elif ai_task["status"] == "failed":
-                                voice["status"] = "failed"
-                                voice["error"] = ai_task.get("error", "训练失败")
-                                break
+                response = await client.get(
+                    f"{AI_SERVICE_URL}/voice/training/status/{ai_task_id}",
+                    timeout=10
+                )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get("success"):
+                        if apply_ai_training_status(voice, data["data"]):
+                            return
+                        # 任务仍在排队或训练，重新计时
+                        deadline = time.monotonic() + TRAINING_STALL_TIMEOUT
 
             except Exception as e:
                 print(f"轮询训练状态失败: {str(e)}")
 
-            attempt += 1
-            await asyncio.sleep(2)  # 等待2秒后重试
-
-        # 如果超时仍未完成
-        if attempt >= max_attempts and voice["status"] == "training":
+        # 长时间得不到AI服务的任务状态；之后到达的终态回调仍可覆盖该结果
+        if voice["status"] == "training":
             voice["status"] = "failed"
             voice["error"] = "训练超时"
+            voice["timed_out"] = True
 
     except Exception as e:
         voice["status"] = "failed"
         voice["error"] = str(e)
 
+# ==================== AI服务回调 ====================
+
+async def read_signed_callback(request: Request) -> dict:
+    """读取并校验AI服务回调（HMAC-SHA256签名 + 时间戳防重放）"""
+    # 未配置密钥时无法验证来源，一律拒绝
+    if not CALLBACK_SECRET:
+        raise HTTPException(status_code=403, detail="未启用任务回调")
+
+    body = await request.body()
+    error = verify_signature(CALLBACK_SECRET, request.headers, body)
+    if error:
+        raise HTTPException(status_code=401, detail=f"回调{error}")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="回调内容无效")
+
+    if not isinstance(payload, dict) or not isinstance(payload.get("data"), dict):
+        raise HTTPException(status_code=400, detail="回调内容无效")
+    return payload
+
+@app.post("/api/callbacks/tts/{task_id}")
+async def tts_task_callback(task_id: str, request: Request):
+    """AI服务合成任务状态回调"""
+    payload = await read_signed_callback(request)
+
+    task = tasks_db.get(task_id)
+    if task is None or task.get("ai_task_id") is None:
+        # 任务可能尚未登记（回调先于提交响应到达），返回409让AI服务重试
+        raise HTTPException(status_code=409, detail="任务尚未登记")
+    if task["ai_task_id"] != payload.get("task_id"):
+        raise HTTPException(status_code=400, detail="任务ID不匹配")
+
+    if task["status"] == "processing":
+        apply_ai_tts_status(task, payload["data"])
+
+    return {"success": True}
+
+@app.post("/api/callbacks/voice")
+async def voice_training_callback(request: Request):
+    """AI服务训练任务状态回调"""
+    payload = await read_signed_callback(request)
+
+    voice = voices_db.get(payload["data"].get("voice_id"))
+    if voice is None:
+        # 音色可能尚未登记（回调先于上传响应到达），返回409让AI服务重试
+        raise HTTPException(status_code=409, detail="音色尚未登记")
+    if voice.get("ai_task_id") != payload.get("task_id"):
+        raise HTTPException(status_code=400, detail="任务ID不匹配")
+
+    if voice["status"] == "training":
+        apply_ai_training_status(voice, payload["data"])
+    elif voice.get("timed_out") and payload["data"].get("status") in ("completed", "failed", "cancelled"):
+        # 本地轮询超时后AI服务仍完成了训练，以签名回调报告的终态为准
+        voice.pop("timed_out")
+        voice.pop("error", None)
+        apply_ai_training_status(voice, payload["data"])
+
+    return {"success": True}
+
 # 应用启动事件
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化"""
+    if BACKEND_PUBLIC_URL and not CALLBACK_SECRET:
+        print("⚠️ 已配置BACKEND_PUBLIC_URL但未配置CALLBACK_SECRET，任务回调已禁用，使用轮询")
     print("🔄 正在初始化音色列表...")
     await init_voices_from_ai_service()
     print("✅ 初始化完成")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放共享HTTP连接"""
+    await close_http_clients()
+
 if __name__ == "__main__":
     print("🎤 老师喊我去上学 API 服务启动中...")
     print("📱 极简AI语音克隆应用 - 集成真实AI服务")
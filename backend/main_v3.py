@@ -3,7 +3,7 @@
 集成Vercel Blob存储和PostgreSQL数据库
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
@@ -16,21 +16,59 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, List
 import json
-import httpx
 
 # 导入自定义模块
 try:
-    from app.database import connect_database, disconnect_database, get_database
+    from app.database import (connect_database, disconnect_database, database_session, get_database,
+                              get_pool_stats, DatabaseBusy)
     from app.storage import storage
     from app.models import *
 except ImportError:
     # Vercel部署时的备用导入
     import sys
     sys.path.append('.')
-    from database import connect_database, disconnect_database, get_database
+    from database import (connect_database, disconnect_database, database_session, get_database,
+                          get_pool_stats, DatabaseBusy)
     from storage import storage
     from models import *
 
+# 显式指定 DATABASE_BACKEND=memory/sqlite 时使用简化版数据库层（database.py），不使用Prisma
+if os.getenv("DATABASE_BACKEND", "").lower() in ("memory", "sqlite"):
+    from database import (connect_database, disconnect_database, database_session, get_database,  # noqa: F811
+                          get_pool_stats, DatabaseBusy)
+from http_client import close_http_clients, get_http_client
+from task_updates import TaskUpdateBuffer
+from request_signing import verify_signature
+
+# 任务到达这些状态时立即写入数据库
+TERMINAL_TASK_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+def submit_task_update(task_id: str, data: dict):
+    """登记任务更新；到达终态时记录完成时间并立即写入"""
+    terminal = data.get("status") in TERMINAL_TASK_STATUSES
+    if terminal:
+        data = {**data, "completedAt": datetime.now()}
+    task_update_buffer.submit(task_id, data, terminal=terminal)
+
+async def write_task_updates(updates: dict):
+    """批量写入合并后的任务更新（与请求共用数据库会话限额）"""
+    async with database_session() as db:
+        if hasattr(db, "batch_"):
+            # Prisma：整批在一个事务中提交；update_many在任务不存在时不报错，不会拖累整批
+            async with db.batch_() as batcher:
+                for task_id, data in updates.items():
+                    batcher.task.update_many(where={"id": task_id}, data=data)
+        else:
+            # 模拟数据库/SQLite以ISO字符串存储时间
+            await db.task.batch_update({
+                task_id: {key: value.isoformat() if isinstance(value, datetime) else value
+                          for key, value in data.items()}
+                for task_id, data in updates.items()
+            })
+
+# 任务进度写回缓冲：进度更新合并后定时批量落库，终态立即落库
+task_update_buffer = TaskUpdateBuffer(write_task_updates)
+
 # 应用生命周期管理
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -41,7 +79,7 @@ async def lifespan(app: FastAPI):
 
     # 创建默认用户
     try:
-        db = await get_database()
+        db = await connect_database()
         existing_user = await db.get_user("user_1")
         if not existing_user:
             default_user = {
@@ -61,8 +99,10 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     print("🔄 关闭应用...")
+    await task_update_buffer.close()
     await disconnect_database()
     print("✅ 数据库连接已关闭")
+    await close_http_clients()
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -83,8 +123,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(DatabaseBusy)
+async def database_busy_handler(request, exc: DatabaseBusy):
+    """数据库连接池饱和时快速失败，提示客户端稍后重试"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"数据库繁忙，请稍后重试: {str(exc)}"},
+        headers={"Retry-After": "1"}
+    )
+
 # AI服务配置
 AI_SERVICE_URL = os.getenv("AI_SERVICE_URL", "http://localhost:8001")
+# AI服务上报任务进度的HMAC签名密钥（与AI服务的CALLBACK_SECRET一致），未配置时拒绝上报
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET", "")
 
 # ==================== 健康检查 ====================
 
@@ -99,7 +150,9 @@ async def health_check():
             "database": "connected",
             "storage": "connected",
             "ai_service": AI_SERVICE_URL
-        }
+        },
+        "task_updates": task_update_buffer.stats(),
+        "database_pool": get_pool_stats()
     }
 
 # ==================== 用户管理 ====================
@@ -108,36 +161,35 @@ async def health_check():
 async def create_user(user_data: UserCreate, db = Depends(get_database)):
     """创建用户"""
     try:
-        async with db:
-            # 检查用户是否已存在
-            existing_user = None
-            if user_data.email:
-                existing_user = await db.user.find_unique(where={"email": user_data.email})
-            elif user_data.wechat_open_id:
-                existing_user = await db.user.find_unique(where={"wechatOpenId": user_data.wechat_open_id})
-            
-            if existing_user:
-                return BaseResponse(
-                    success=False,
-                    message="用户已存在"
-                )
-            
-            # 创建新用户
-            user = await db.user.create(
-                data={
-                    "email": user_data.email,
-                    "username": user_data.username,
-                    "nickname": user_data.nickname,
-                    "wechatOpenId": user_data.wechat_open_id
-                }
-            )
-            
+        # 检查用户是否已存在
+        existing_user = None
+        if user_data.email:
+            existing_user = await db.user.find_unique(where={"email": user_data.email})
+        elif user_data.wechat_open_id:
+            existing_user = await db.user.find_unique(where={"wechatOpenId": user_data.wechat_open_id})
+        
+        if existing_user:
             return BaseResponse(
-                success=True,
-                message="用户创建成功",
-                data={"user_id": user.id}
+                success=False,
+                message="用户已存在"
             )
-            
+        
+        # 创建新用户
+        user = await db.user.create(
+            data={
+                "email": user_data.email,
+                "username": user_data.username,
+                "nickname": user_data.nickname,
+                "wechatOpenId": user_data.wechat_open_id
+            }
+        )
+        
+        return BaseResponse(
+            success=True,
+            message="用户创建成功",
+            data={"user_id": user.id}
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"创建用户失败: {str(e)}")
 
@@ -145,13 +197,12 @@ async def create_user(user_data: UserCreate, db = Depends(get_database)):
 async def get_user(user_id: str, db = Depends(get_database)):
     """获取用户信息"""
     try:
-        async with db:
-            user = await db.user.find_unique(where={"id": user_id})
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            return UserResponse.from_orm(user)
-            
+        user = await db.user.find_unique(where={"id": user_id})
+        if not user:
+            raise HTTPException(status_code=404, detail="用户不存在")
+        
+        return UserResponse.from_orm(user)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -164,10 +215,9 @@ async def create_voice(
     name: str = Form(...),
     description: Optional[str] = Form(None),
     user_id: str = Form(...),
-    audio_file: UploadFile = File(...),
-    db = Depends(get_database)
+    audio_file: UploadFile = File(...)
 ):
-    """创建音色"""
+    """创建音色 - 只在数据库读写期间持有会话，上传Blob时不占用连接"""
     try:
         # 验证音频文件
         if not audio_file.content_type.startswith('audio/'):
@@ -176,19 +226,20 @@ async def create_voice(
         if audio_file.size > 10 * 1024 * 1024:  # 10MB限制
             raise HTTPException(status_code=400, detail="文件过大，请上传小于10MB的文件")
         
-        async with db:
-            # 检查用户是否存在
+        # 检查用户是否存在
+        async with database_session() as db:
             user = await db.user.find_unique(where={"id": user_id})
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            # 上传音频文件到Vercel Blob
-            upload_result = await storage.upload_file(
-                file=audio_file,
-                folder="voices",
-                custom_filename=f"{user_id}_{uuid.uuid4().hex[:8]}_{audio_file.filename}"
-            )
-            
+        if not user:
+            raise HTTPException(status_code=404, detail="用户不存在")
+        
+        # 上传音频文件到Vercel Blob
+        upload_result = await storage.upload_file(
+            file=audio_file,
+            folder="voices",
+            custom_filename=f"{user_id}_{uuid.uuid4().hex[:8]}_{audio_file.filename}"
+        )
+        
+        async with database_session() as db:
             # 创建音色记录
             voice = await db.voice.create(
                 data={
@@ -212,19 +263,19 @@ async def create_voice(
                     "status": TaskStatus.PENDING
                 }
             )
-            
-            # 异步调用AI服务开始训练
-            asyncio.create_task(start_voice_training(voice.id, task.id))
-            
-            return BaseResponse(
-                success=True,
-                message="音色创建成功，开始训练",
-                data={
-                    "voice_id": voice.id,
-                    "task_id": task.id
-                }
-            )
-            
+        
+        # 异步调用AI服务开始训练
+        asyncio.create_task(start_voice_training(voice.id, task.id))
+        
+        return BaseResponse(
+            success=True,
+            message="音色创建成功，开始训练",
+            data={
+                "voice_id": voice.id,
+                "task_id": task.id
+            }
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -236,34 +287,45 @@ async def list_voices(
     status: Optional[VoiceStatus] = None,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     db = Depends(get_database)
 ):
-    """获取音色列表"""
+    """
+    获取音色列表
+
+    按创建时间倒序；传入上一页返回的next_cursor时按 (createdAt, id) 游标翻页，
+    深分页不需要跳过前面的记录，offset仅用于兼容旧客户端
+    """
     try:
-        async with db:
-            # 构建查询条件
-            where_conditions = {}
-            if user_id:
-                where_conditions["userId"] = user_id
-            if status:
-                where_conditions["status"] = status
-            
-            # 查询音色列表
-            voices = await db.voice.find_many(
-                where=where_conditions,
-                skip=offset,
-                take=limit,
-                order_by={"createdAt": "desc"}
-            )
-            
-            # 查询总数
-            total = await db.voice.count(where=where_conditions)
-            
-            return VoiceListResponse(
-                voices=[VoiceResponse.from_orm(voice) for voice in voices],
-                total=total
-            )
-            
+        # 构建查询条件
+        where_conditions = {}
+        if user_id:
+            where_conditions["userId"] = user_id
+        if status:
+            where_conditions["status"] = status
+        
+        # 查询音色列表（id作为同一时间创建的记录的次序）
+        query = {
+            "where": where_conditions,
+            "take": limit,
+            "order": [{"createdAt": "desc"}, {"id": "desc"}]
+        }
+        if cursor:
+            # 从游标记录开始，跳过游标本身
+            query.update(cursor={"id": cursor}, skip=1)
+        else:
+            query["skip"] = offset
+        voices = await db.voice.find_many(**query)
+        
+        # 查询总数
+        total = await db.voice.count(where=where_conditions)
+        
+        return VoiceListResponse(
+            voices=[VoiceResponse.from_orm(voice) for voice in voices],
+            total=total,
+            next_cursor=voices[-1].id if len(voices) == limit else None
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取音色列表失败: {str(e)}")
 
@@ -271,40 +333,40 @@ async def list_voices(
 async def get_voice(voice_id: str, db = Depends(get_database)):
     """获取音色详情"""
     try:
-        async with db:
-            voice = await db.voice.find_unique(where={"id": voice_id})
-            if not voice:
-                raise HTTPException(status_code=404, detail="音色不存在")
-            
-            return VoiceResponse.from_orm(voice)
-            
+        voice = await db.voice.find_unique(where={"id": voice_id})
+        if not voice:
+            raise HTTPException(status_code=404, detail="音色不存在")
+        
+        return VoiceResponse.from_orm(voice)
+        
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取音色失败: {str(e)}")
 
 @app.delete("/api/voices/{voice_id}", response_model=BaseResponse)
-async def delete_voice(voice_id: str, db = Depends(get_database)):
-    """删除音色"""
+async def delete_voice(voice_id: str):
+    """删除音色 - 删除云存储文件时不占用数据库会话"""
     try:
-        async with db:
+        async with database_session() as db:
             voice = await db.voice.find_unique(where={"id": voice_id})
-            if not voice:
-                raise HTTPException(status_code=404, detail="音色不存在")
-            
-            # 删除云存储中的文件
-            await storage.delete_file(voice.audioUrl)
-            if voice.modelUrl:
-                await storage.delete_file(voice.modelUrl)
-            
-            # 删除数据库记录
+        if not voice:
+            raise HTTPException(status_code=404, detail="音色不存在")
+        
+        # 删除云存储中的文件
+        await storage.delete_file(voice.audioUrl)
+        if voice.modelUrl:
+            await storage.delete_file(voice.modelUrl)
+        
+        # 删除数据库记录
+        async with database_session() as db:
             await db.voice.delete(where={"id": voice_id})
-            
-            return BaseResponse(
-                success=True,
-                message="音色删除成功"
-            )
-            
+        
+        return BaseResponse(
+            success=True,
+            message="音色删除成功"
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -320,35 +382,34 @@ async def create_tts_task(
 ):
     """创建TTS任务"""
     try:
-        async with db:
-            # 检查音色是否存在
-            voice = await db.voice.find_unique(where={"id": request.voice_id})
-            if not voice:
-                raise HTTPException(status_code=404, detail="音色不存在")
-            
-            if voice.status != VoiceStatus.COMPLETED:
-                raise HTTPException(status_code=400, detail="音色尚未训练完成")
-            
-            # 创建TTS任务
-            task = await db.task.create(
-                data={
-                    "type": TaskType.TTS_SYNTHESIS,
-                    "inputText": request.text,
-                    "voiceId": request.voice_id,
-                    "userId": user_id,
-                    "status": TaskStatus.PENDING
-                }
-            )
-            
-            # 异步调用AI服务进行语音合成
-            asyncio.create_task(start_tts_synthesis(task.id))
-            
-            return TTSResponse(
-                task_id=task.id,
-                status=TaskStatus.PENDING,
-                message="TTS任务创建成功"
-            )
-            
+        # 检查音色是否存在
+        voice = await db.voice.find_unique(where={"id": request.voice_id})
+        if not voice:
+            raise HTTPException(status_code=404, detail="音色不存在")
+        
+        if voice.status != VoiceStatus.COMPLETED:
+            raise HTTPException(status_code=400, detail="音色尚未训练完成")
+        
+        # 创建TTS任务
+        task = await db.task.create(
+            data={
+                "type": TaskType.TTS_SYNTHESIS,
+                "inputText": request.text,
+                "voiceId": request.voice_id,
+                "userId": user_id,
+                "status": TaskStatus.PENDING
+            }
+        )
+        
+        # 异步调用AI服务进行语音合成
+        asyncio.create_task(start_tts_synthesis(task.id))
+        
+        return TTSResponse(
+            task_id=task.id,
+            status=TaskStatus.PENDING,
+            message="TTS任务创建成功"
+        )
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -360,94 +421,100 @@ async def create_tts_task(
 async def get_task(task_id: str, db = Depends(get_database)):
     """获取任务状态"""
     try:
-        async with db:
-            task = await db.task.find_unique(where={"id": task_id})
-            if not task:
-                raise HTTPException(status_code=404, detail="任务不存在")
-            
-            return TaskResponse.from_orm(task)
-            
+        task = await db.task.find_unique(where={"id": task_id})
+        if not task:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        
+        # 叠加尚未落库的进度更新
+        for field, value in (task_update_buffer.pending(task_id) or {}).items():
+            if hasattr(task, field):
+                setattr(task, field, value)
+        
+        return TaskResponse.from_orm(task)
+        
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取任务失败: {str(e)}")
 
+async def require_signed_request(request: Request):
+    """校验内部调用方的HMAC签名（与任务回调相同的签名方案）"""
+    if not CALLBACK_SECRET:
+        raise HTTPException(status_code=403, detail="未配置CALLBACK_SECRET，不接受进度上报")
+
+    error = verify_signature(CALLBACK_SECRET, request.headers, await request.body())
+    if error:
+        raise HTTPException(status_code=401, detail=f"请求{error}")
+
+@app.post("/api/tasks/{task_id}/progress", response_model=BaseResponse,
+          dependencies=[Depends(require_signed_request)])
+async def report_task_progress(task_id: str, update: TaskProgressUpdate):
+    """上报任务进度（AI服务调用，需签名）- 写入缓冲后批量落库，不逐条写数据库"""
+    data = {"progress": update.progress}
+    if update.status is not None:
+        data["status"] = update.status.value
+    if update.error is not None:
+        data["error"] = update.error
+    if update.output_url is not None:
+        data["outputUrl"] = update.output_url
+
+    submit_task_update(task_id, data)
+    return BaseResponse(success=True, message="进度已接收")
+
 # ==================== AI服务集成 ====================
 
 async def start_voice_training(voice_id: str, task_id: str):
     """开始音色训练"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{AI_SERVICE_URL}/train",
-                json={
-                    "voice_id": voice_id,
-                    "task_id": task_id
-                },
-                timeout=30.0
+        client = get_http_client("ai-service")
+        response = await client.post(
+            f"{AI_SERVICE_URL}/train",
+            json={
+                "voice_id": voice_id,
+                "task_id": task_id
+            },
+            timeout=30.0
+        )
+        
+        if response.status_code != 200:
+            # 更新任务状态为失败
+            submit_task_update(
+                task_id,
+                {"status": TaskStatus.FAILED.value, "error": f"AI服务调用失败: {response.status_code}"}
             )
-            
-            if response.status_code != 200:
-                # 更新任务状态为失败
-                async with get_database() as db:
-                    await db.task.update(
-                        where={"id": task_id},
-                        data={
-                            "status": TaskStatus.FAILED,
-                            "error": f"AI服务调用失败: {response.status_code}"
-                        }
-                    )
-                    
+                
     except Exception as e:
         print(f"音色训练启动失败: {str(e)}")
         # 更新任务状态为失败
-        try:
-            async with get_database() as db:
-                await db.task.update(
-                    where={"id": task_id},
-                    data={
-                        "status": TaskStatus.FAILED,
-                        "error": str(e)
-                    }
-                )
-        except:
-            pass
+        submit_task_update(
+            task_id,
+            {"status": TaskStatus.FAILED.value, "error": str(e)}
+        )
 
 async def start_tts_synthesis(task_id: str):
     """开始TTS语音合成"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{AI_SERVICE_URL}/synthesize",
-                json={"task_id": task_id},
-                timeout=30.0
+        client = get_http_client("ai-service")
+        response = await client.post(
+            f"{AI_SERVICE_URL}/synthesize",
+            json={"task_id": task_id},
+            timeout=30.0
+        )
+        
+        if response.status_code != 200:
+            # 更新任务状态为失败
+            submit_task_update(
+                task_id,
+                {"status": TaskStatus.FAILED.value, "error": f"AI服务调用失败: {response.status_code}"}
             )
-            
-            if response.status_code != 200:
-                # 更新任务状态为失败
-                async with get_database() as db:
-                    await db.task.update(
-                        where={"id": task_id},
-                        data={
-                            "status": TaskStatus.FAILED,
-                            "error": f"AI服务调用失败: {response.status_code}"
-                        }
-                    )
-                    
+                
     except Exception as e:
         print(f"TTS合成启动失败: {str(e)}")
         # 更新任务状态为失败
-        try:
-            async with get_database() as db:
-                await db.task.update(
-                    where={"id": task_id},
-                    data={
-                        "status": TaskStatus.FAILED,
-                        "error": str(e)
-                    }
-                )
-        except:
-            pass
+        submit_task_update(
+            task_id,
+            {"status": TaskStatus.FAILED.value, "error": str(e)}
+        )
 
 # ==================== 启动应用 ====================
 
@@ -0,0 +1,108 @@
+"""
+请求合并模块
+相同请求在前一个仍在处理时直接复用其结果（single-flight），
+例如同一时刻大量用户合成同一句话时只向AI服务提交一次任务
+"""
+
+import re
+import asyncio
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """文本归一化：NFKC（全角转半角等）并合并空白"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class RequestCoalescer:
+    """
+    请求合并器
+
+    每个键同一时刻只有一个领头请求真正执行；其余请求等待领头请求的结果，
+    结果失效（is_live返回False）后下一个请求重新成为领头请求
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.leaders = 0
+        self.merged = 0
+        self.failed = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]],
+                  is_live: Callable[[Any], bool]) -> Tuple[Any, bool]:
+        """
+        执行或合并请求
+
+        Args:
+            key: 请求键
+            factory: 领头请求的执行函数
+            is_live: 判断已有结果是否仍可复用（如任务仍在处理中）
+
+        Returns:
+            (结果, 是否为合并的请求)
+        """
+        while key in self._inflight:
+            future = self._inflight[key]
+            if not future.done():
+                # 领头请求仍在提交，等待其结果（领头失败时同样抛出异常）
+                try:
+                    result = await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                    # 领头请求被取消，重新竞争领头
+                    continue
+                self.merged += 1
+                return result, True
+
+            if not future.cancelled() and future.exception() is None and is_live(future.result()):
+                self.merged += 1
+                return future.result(), True
+
+            del self._inflight[key]
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            self._discard(key, future)
+            future.cancel()
+            raise
+        except Exception as e:
+            self.failed += 1
+            self._discard(key, future)
+            future.set_exception(e)
+            # 没有等待者时避免"异常未被获取"的警告
+            future.exception()
+            raise
+
+        future.set_result(result)
+        return result, False
+
+    def _discard(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def release(self, key: str):
+        """领头请求的结果不再可复用时移除（如任务已结束）"""
+        future = self._inflight.get(key)
+        if future is not None and future.done():
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """合并统计信息"""
+        total = self.leaders + self.merged
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "merged": self.merged,
+            "failed": self.failed,
+            "merge_ratio": round(self.merged / total, 4) if total else 0.0
+        }
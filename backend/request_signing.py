@@ -0,0 +1,38 @@
+"""
+请求签名校验模块
+AI服务等内部调用方对 "时间戳.请求体" 计算HMAC-SHA256签名，本服务校验签名和时间戳（防重放）
+"""
+
+import hmac
+import time
+import hashlib
+from typing import Mapping, Optional
+
+SIGNATURE_HEADER = "X-Callback-Signature"
+TIMESTAMP_HEADER = "X-Callback-Timestamp"
+
+# 时间戳允许的最大偏差（秒）
+MAX_CLOCK_SKEW = 300
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """对 "时间戳.请求体" 计算HMAC-SHA256签名"""
+    message = timestamp.encode("ascii") + b"." + body
+    return "sha256=" + hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, headers: Mapping[str, str], body: bytes,
+                     max_skew: int = MAX_CLOCK_SKEW) -> Optional[str]:
+    """
+    校验请求签名
+
+    Returns:
+        校验失败的原因；通过时返回None
+    """
+    timestamp = headers.get(TIMESTAMP_HEADER, "")
+    signature = headers.get(SIGNATURE_HEADER, "")
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > max_skew:
+        return "时间戳无效"
+    if not hmac.compare_digest(sign_payload(secret, timestamp, body), signature):
+        return "签名无效"
+    return None
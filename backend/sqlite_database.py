@@ -0,0 +1,395 @@
+"""
+SQLite数据库模块
+与MockDatabase接口一致的持久化实现：WAL模式下同一台机器上的多个worker进程共享同一数据库，
+重启不丢失数据；所有SQL在专用线程中执行，不阻塞事件循环
+"""
+
+import os
+import uuid
+import sqlite3
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from database import User, Voice, Task, Config, _memory_db, check_update_fields
+
+# 数据库文件路径
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/app.db")
+# 等待其他进程释放写锁的时间（毫秒）
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE,
+    username TEXT,
+    nickname TEXT,
+    wechatOpenId TEXT UNIQUE,
+    createdAt TEXT NOT NULL,
+    updatedAt TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS voices (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    audioUrl TEXT,
+    audioSize INTEGER,
+    audioDuration REAL,
+    audioFormat TEXT,
+    voice_model_url TEXT,
+    voice_model_size INTEGER,
+    userId TEXT,
+    status TEXT NOT NULL,
+    quality REAL,
+    createdAt TEXT NOT NULL,
+    updatedAt TEXT NOT NULL
+);
+-- 音色列表按 (createdAt, id) 排序和游标分页，可按用户/状态过滤
+CREATE INDEX IF NOT EXISTS idx_voices_created ON voices (createdAt, id);
+CREATE INDEX IF NOT EXISTS idx_voices_user_created ON voices (userId, createdAt, id);
+CREATE INDEX IF NOT EXISTS idx_voices_status_created ON voices (status, createdAt, id);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    status TEXT NOT NULL,
+    inputText TEXT,
+    voiceId TEXT,
+    userId TEXT,
+    progress REAL,
+    error TEXT,
+    outputUrl TEXT,
+    outputSize INTEGER,
+    createdAt TEXT NOT NULL,
+    updatedAt TEXT NOT NULL,
+    completedAt TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_created ON tasks (userId, createdAt);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+
+CREATE TABLE IF NOT EXISTS configs (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 音色列表可过滤的字段
+VOICE_FILTERS = ("userId", "status")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _dict_row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _new_id(prefix: str) -> str:
+    # 多进程同时写入时不能依赖进程内计数器
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+
+def _insert_sql(table: str, fields: tuple) -> str:
+    return f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+
+
+class _Table:
+    """表操作基类：SQL通过所属数据库的专用线程执行"""
+
+    def __init__(self, database: "SQLiteDatabase"):
+        self._db = database
+
+    async def _run(self, func: Callable, *args) -> Any:
+        return await self._db.run(func, *args)
+
+
+class _UserTable(_Table):
+    INSERT = _insert_sql("users", User.__slots__)
+
+    async def find_unique(self, where: Dict):
+        """查找唯一用户（按ID或唯一键）"""
+        for field in ("id", "email", "wechatOpenId"):
+            if where.get(field):
+                row = await self._run(self._fetch_one, field, where[field])
+                return User(row) if row else None
+        return None
+
+    def _fetch_one(self, conn: sqlite3.Connection, field: str, value: Any) -> Optional[Dict]:
+        return conn.execute(f"SELECT * FROM users WHERE {field} = ?", (value,)).fetchone()
+
+    async def create(self, data: Dict):
+        """创建用户"""
+        now = _now()
+        user_data = {
+            "id": _new_id("user"),
+            "email": data.get("email"),
+            "username": data.get("username"),
+            "nickname": data.get("nickname"),
+            "wechatOpenId": data.get("wechatOpenId"),
+            "createdAt": now,
+            "updatedAt": now
+        }
+        await self._run(self._insert, user_data)
+        return User(user_data)
+
+    def _insert(self, conn: sqlite3.Connection, data: Dict):
+        conn.execute(self.INSERT, [data[field] for field in User.__slots__])
+
+
+class _VoiceTable(_Table):
+    INSERT = _insert_sql("voices", Voice.__slots__)
+
+    async def find_unique(self, where: Dict):
+        """查找唯一音色"""
+        row = await self._run(self._fetch_by_id, where.get("id"))
+        return Voice(row) if row else None
+
+    def _fetch_by_id(self, conn: sqlite3.Connection, voice_id: str) -> Optional[Dict]:
+        return conn.execute("SELECT * FROM voices WHERE id = ?", (voice_id,)).fetchone()
+
+    @staticmethod
+    def _where_clause(where: Optional[Dict]) -> tuple:
+        conditions, params = [], []
+        for field in VOICE_FILTERS:
+            if (where or {}).get(field):
+                conditions.append(f"{field} = ?")
+                params.append(where[field])
+        return conditions, params
+
+    async def find_many(self, where: Dict = None, skip: int = 0, take: int = 20,
+                        order: Any = None, cursor: Dict = None):
+        """
+        查找多个音色
+
+        参数与Prisma一致；cursor为 {"id": ...} 时按 (createdAt, id) 做键集比较，
+        由复合索引直接定位，不需要OFFSET跳过前面的记录
+        """
+        orders = order if isinstance(order, list) else [order or {}]
+        descending = any(item.get("createdAt") == "desc" for item in orders)
+        rows = await self._run(self._select_page, where, skip, take, descending, (cursor or {}).get("id"))
+        return [Voice(row) for row in rows]
+
+    def _select_page(self, conn: sqlite3.Connection, where: Optional[Dict], skip: int, take: int,
+                     descending: bool, cursor_id: Optional[str]) -> List[Dict]:
+        conditions, params = self._where_clause(where)
+        direction = "DESC" if descending else "ASC"
+        if cursor_id is not None:
+            conditions.append(
+                f"(createdAt, id) {'<=' if descending else '>='} "
+                "(SELECT createdAt, id FROM voices WHERE id = ?)"
+            )
+            params.append(cursor_id)
+
+        sql = "SELECT * FROM voices"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY createdAt {direction}, id {direction} LIMIT ? OFFSET ?"
+        return conn.execute(sql, params + [take, skip]).fetchall()
+
+    async def count(self, where: Dict = None):
+        """统计音色数量"""
+        return await self._run(self._count, where)
+
+    def _count(self, conn: sqlite3.Connection, where: Optional[Dict]) -> int:
+        conditions, params = self._where_clause(where)
+        sql = "SELECT COUNT(*) AS total FROM voices"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return conn.execute(sql, params).fetchone()["total"]
+
+    async def create(self, data: Dict):
+        """创建音色"""
+        now = _now()
+        voice_data = {field: data.get(field) for field in Voice.__slots__}
+        voice_data.update({
+            "id": _new_id("voice"),
+            "status": data.get("status", "PENDING"),
+            "createdAt": now,
+            "updatedAt": now
+        })
+        await self._run(self._insert, voice_data)
+        return Voice(voice_data)
+
+    def _insert(self, conn: sqlite3.Connection, data: Dict):
+        conn.execute(self.INSERT, [data[field] for field in Voice.__slots__])
+
+    async def update(self, where: Dict, data: Dict):
+        """更新音色"""
+        check_update_fields(Voice, data)
+        row = await self._run(_update_row, "voices", where.get("id"), data)
+        return Voice(row) if row else None
+
+    async def delete(self, where: Dict):
+        """删除音色"""
+        return await self._run(self._delete, where.get("id"))
+
+    def _delete(self, conn: sqlite3.Connection, voice_id: str) -> bool:
+        return conn.execute("DELETE FROM voices WHERE id = ?", (voice_id,)).rowcount > 0
+
+
+class _TaskTable(_Table):
+    INSERT = _insert_sql("tasks", Task.__slots__)
+
+    async def find_unique(self, where: Dict):
+        """查找唯一任务"""
+        row = await self._run(self._fetch_by_id, where.get("id"))
+        return Task(row) if row else None
+
+    def _fetch_by_id(self, conn: sqlite3.Connection, task_id: str) -> Optional[Dict]:
+        return conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+    async def create(self, data: Dict):
+        """创建任务"""
+        now = _now()
+        task_data = {field: data.get(field) for field in Task.__slots__}
+        task_data.update({
+            "id": _new_id("task"),
+            "status": data.get("status", "PENDING"),
+            "progress": data.get("progress", 0),
+            "createdAt": now,
+            "updatedAt": now
+        })
+        await self._run(self._insert, task_data)
+        return Task(task_data)
+
+    def _insert(self, conn: sqlite3.Connection, data: Dict):
+        conn.execute(self.INSERT, [data[field] for field in Task.__slots__])
+
+    async def update(self, where: Dict, data: Dict):
+        """更新任务"""
+        check_update_fields(Task, data)
+        row = await self._run(_update_row, "tasks", where.get("id"), data)
+        return Task(row) if row else None
+
+    async def batch_update(self, updates: Dict[str, Dict]):
+        """批量更新任务（{任务ID: 更新字段}，不存在的任务忽略，未知字段抛出ValueError），在一个事务中提交"""
+        await self._run(self._batch_update, updates)
+
+    def _batch_update(self, conn: sqlite3.Connection, updates: Dict[str, Dict]):
+        # 字段相同的更新合并为一条预编译语句批量执行
+        groups: Dict[tuple, List[list]] = {}
+        now = _now()
+        for data in updates.values():
+            check_update_fields(Task, data)
+        for task_id, data in updates.items():
+            changes = {**data, "updatedAt": now}
+            groups.setdefault(tuple(changes), []).append([*changes.values(), task_id])
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for fields, rows in groups.items():
+                assignments = ", ".join(f"{field} = ?" for field in fields)
+                conn.executemany(f"UPDATE tasks SET {assignments} WHERE id = ?", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class _ConfigTable(_Table):
+
+    async def find_unique(self, where: Dict):
+        """查找配置"""
+        key = where.get("key")
+        row = await self._run(self._fetch, key)
+        return Config({"id": key, "key": key, "value": row["value"]}) if row else None
+
+    def _fetch(self, conn: sqlite3.Connection, key: str) -> Optional[Dict]:
+        return conn.execute("SELECT value FROM configs WHERE key = ?", (key,)).fetchone()
+
+    async def create(self, data: Dict):
+        """创建配置"""
+        key = data.get("key")
+        value = data.get("value")
+        await self._run(self._upsert, key, value)
+        return Config({"id": key, "key": key, "value": value})
+
+    def _upsert(self, conn: sqlite3.Connection, key: str, value: Any):
+        conn.execute("INSERT OR REPLACE INTO configs (key, value) VALUES (?, ?)", (key, value))
+
+    async def count(self):
+        """统计配置数量"""
+        return await self._run(self._count)
+
+    def _count(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) AS total FROM configs").fetchone()["total"]
+
+
+def _update_row(conn: sqlite3.Connection, table: str, record_id: str, data: Dict) -> Optional[Dict]:
+    """更新记录并返回更新后的行"""
+    changes = {**data, "updatedAt": _now()}
+    assignments = ", ".join(f"{field} = ?" for field in changes)
+    conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", [*changes.values(), record_id])
+    return conn.execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,)).fetchone()
+
+
+class SQLiteDatabase:
+    """SQLite数据库（接口与MockDatabase一致）"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self.connected = False
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3连接不能跨线程使用，所有操作在同一个专用线程中串行执行
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.user = _UserTable(self)
+        self.voice = _VoiceTable(self)
+        self.task = _TaskTable(self)
+        self.config = _ConfigTable(self)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """在数据库线程中执行 func(conn, *args)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._conn, *args))
+
+    def _open(self):
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        # isolation_level=None：每条语句自动提交，尽快释放写锁；
+        # 参数化SQL由连接的语句缓存复用预编译结果
+        conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=256)
+        conn.row_factory = _dict_row
+        conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT OR IGNORE INTO configs (key, value) VALUES (?, ?)",
+            _memory_db["configs"].items()
+        )
+        self._conn = conn
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def connect(self):
+        """连接数据库（首次连接时建表）"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+            await self.run(lambda conn: self._open())
+        self.connected = True
+        return self
+
+    async def disconnect(self):
+        """断开连接"""
+        if self._executor is not None:
+            await self.run(lambda conn: self._close())
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.connected = False
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        pass
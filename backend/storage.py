@@ -3,7 +3,7 @@
 """
 
 import os
-import httpx
+from http_client import get_http_client
 import uuid
 from datetime import datetime
 import mimetypes
@@ -45,29 +45,29 @@ class BlobStorage:
             
             if self.token:
                 # 使用真实的Vercel Blob API
-                async with httpx.AsyncClient() as client:
-                    response = await client.put(
-                        "https://blob.vercel-storage.com",
-                        headers={
-                            "authorization": f"Bearer {self.token}",
-                            "x-content-type": file.content_type or "application/octet-stream"
-                        },
-                        params={"filename": blob_path},
-                        content=content,
-                        timeout=30.0
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        return {
-                            "url": result.get("url", f"https://blob.vercel-storage.com/{blob_path}"),
-                            "size": len(content),
-                            "filename": filename,
-                            "path": blob_path,
-                            "content_type": file.content_type or mimetypes.guess_type(filename)[0]
-                        }
-                    else:
-                        raise Exception(f"Upload failed: {response.status_code} - {response.text}")
+                client = get_http_client("blob")
+                response = await client.put(
+                    "https://blob.vercel-storage.com",
+                    headers={
+                        "authorization": f"Bearer {self.token}",
+                        "x-content-type": file.content_type or "application/octet-stream"
+                    },
+                    params={"filename": blob_path},
+                    content=content,
+                    timeout=30.0
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    return {
+                        "url": result.get("url", f"https://blob.vercel-storage.com/{blob_path}"),
+                        "size": len(content),
+                        "filename": filename,
+                        "path": blob_path,
+                        "content_type": file.content_type or mimetypes.guess_type(filename)[0]
+                    }
+                else:
+                    raise Exception(f"Upload failed: {response.status_code} - {response.text}")
             else:
                 # 模拟存储（开发/测试环境）
                 mock_url = f"https://mock-storage.example.com/{blob_path}"
@@ -97,29 +97,29 @@ class BlobStorage:
             
             if self.token:
                 # 使用真实的Vercel Blob API
-                async with httpx.AsyncClient() as client:
-                    response = await client.put(
-                        "https://blob.vercel-storage.com",
-                        headers={
-                            "authorization": f"Bearer {self.token}",
-                            "x-content-type": content_type or "application/octet-stream"
-                        },
-                        params={"filename": blob_path},
-                        content=content,
-                        timeout=30.0
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        return {
-                            "url": result.get("url", f"https://blob.vercel-storage.com/{blob_path}"),
-                            "size": len(content),
-                            "filename": filename,
-                            "path": blob_path,
-                            "content_type": content_type
-                        }
-                    else:
-                        raise Exception(f"Upload failed: {response.status_code} - {response.text}")
+                client = get_http_client("blob")
+                response = await client.put(
+                    "https://blob.vercel-storage.com",
+                    headers={
+                        "authorization": f"Bearer {self.token}",
+                        "x-content-type": content_type or "application/octet-stream"
+                    },
+                    params={"filename": blob_path},
+                    content=content,
+                    timeout=30.0
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    return {
+                        "url": result.get("url", f"https://blob.vercel-storage.com/{blob_path}"),
+                        "size": len(content),
+                        "filename": filename,
+                        "path": blob_path,
+                        "content_type": content_type
+                    }
+                else:
+                    raise Exception(f"Upload failed: {response.status_code} - {response.text}")
             else:
                 # 模拟存储
                 mock_url = f"https://mock-storage.example.com/{blob_path}"
@@ -140,13 +140,13 @@ class BlobStorage:
         """
         try:
             if self.token and "blob.vercel-storage.com" in url:
-                async with httpx.AsyncClient() as client:
-                    response = await client.delete(
-                        url,
-                        headers={"authorization": f"Bearer {self.token}"},
-                        timeout=30.0
-                    )
-                    return response.status_code == 200
+                client = get_http_client("blob")
+                response = await client.delete(
+                    url,
+                    headers={"authorization": f"Bearer {self.token}"},
+                    timeout=30.0
+                )
+                return response.status_code == 200
             else:
                 # 模拟删除
                 print(f"Mock delete: {url}")
@@ -161,21 +161,21 @@ class BlobStorage:
         """
         try:
             if self.token:
-                async with httpx.AsyncClient() as client:
-                    params = {}
-                    if prefix:
-                        params["prefix"] = prefix
-                    
-                    response = await client.get(
-                        "https://blob.vercel-storage.com",
-                        headers={"authorization": f"Bearer {self.token}"},
-                        params=params,
-                        timeout=30.0
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        return result.get("blobs", [])
+                client = get_http_client("blob")
+                params = {}
+                if prefix:
+                    params["prefix"] = prefix
+                
+                response = await client.get(
+                    "https://blob.vercel-storage.com",
+                    headers={"authorization": f"Bearer {self.token}"},
+                    params=params,
+                    timeout=30.0
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    return result.get("blobs", [])
             
             # 模拟文件列表
             return []
@@ -0,0 +1,162 @@
+"""
+任务更新写回缓冲模块
+进度更新先在内存中按任务合并，每隔固定时间批量写入数据库一次；
+任务到达终态时立即写入，数据库写入量取决于任务数而不是进度上报次数；
+写入失败的更新有重试上限，超过上限后逐条写入，仍然失败的更新记录日志后丢弃，不会阻塞后续写入
+"""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+# 批量写入间隔（毫秒）
+TASK_UPDATE_FLUSH_MS = int(os.getenv("TASK_UPDATE_FLUSH_MS", "500"))
+# 单个任务更新的最大写入失败次数
+TASK_UPDATE_MAX_RETRIES = int(os.getenv("TASK_UPDATE_MAX_RETRIES", "5"))
+
+# 批量写入函数：参数为 {任务ID: 合并后的更新字段}
+BatchWriter = Callable[[Dict[str, Dict[str, Any]]], Awaitable[None]]
+
+
+class TaskUpdateBuffer:
+    """任务更新写回缓冲"""
+
+    def __init__(self, writer: BatchWriter, flush_interval_ms: int = TASK_UPDATE_FLUSH_MS,
+                 max_retries: int = TASK_UPDATE_MAX_RETRIES):
+        self.writer = writer
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.max_retries = max(1, max_retries)
+
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # 正在写入数据库、尚未提交的批次
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        # 任务ID -> 连续写入失败次数
+        self._failures: Dict[str, int] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Set[asyncio.Task] = set()
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    def submit(self, task_id: str, data: Dict[str, Any], terminal: bool = False):
+        """
+        登记任务更新（须在事件循环线程中调用）
+
+        同一任务的多次更新按字段合并，后到的值覆盖先到的值；terminal为True时立即写入
+        """
+        self.submitted += 1
+        pending = self._pending.get(task_id)
+        if pending is None:
+            self._pending[task_id] = dict(data)
+        else:
+            self.coalesced += 1
+            pending.update(data)
+
+        if terminal:
+            # 终态不等待定时器，立即写入
+            self._cancel_timer()
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+
+    def pending(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """尚未写入数据库的更新，包括正在写入的批次（读取任务时叠加，保证读到最新进度）"""
+        inflight = self._inflight.get(task_id)
+        pending = self._pending.get(task_id)
+        if inflight is None:
+            return pending
+        if pending is None:
+            return inflight
+        # 写入期间到达的更新较新
+        return {**inflight, **pending}
+
+    def _on_timer(self):
+        self._timer = None
+        self._start_flush()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start_flush(self):
+        task = asyncio.create_task(self.flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def flush(self):
+        """将已合并的更新批量写入数据库"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            # 写入提交前批次仍对pending()可见，读取不会退回到旧值
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+            try:
+                await self.writer(batch)
+                self.flushes += 1
+                self.rows_written += len(batch)
+                for task_id in batch:
+                    self._failures.pop(task_id, None)
+            except Exception as e:
+                self.failed_flushes += 1
+                print(f"⚠️ 任务更新批量写入失败（{len(batch)}个任务）: {str(e)}")
+                await self._handle_failed_batch(batch)
+            finally:
+                self._inflight = {}
+
+    async def _handle_failed_batch(self, batch: Dict[str, Dict[str, Any]]):
+        """失败次数未到上限的更新放回缓冲稍后重试；到达上限的逐条写入，仍失败则丢弃"""
+        exhausted = {}
+        for task_id, data in batch.items():
+            failures = self._failures.get(task_id, 0) + 1
+            if failures >= self.max_retries:
+                exhausted[task_id] = data
+                continue
+            self._failures[task_id] = failures
+            # 写入期间到达的更新较新，保留其字段值
+            self._pending[task_id] = {**data, **self._pending.get(task_id, {})}
+
+        # 逐条写入，把导致整批失败的任务和正常任务分开
+        for task_id, data in exhausted.items():
+            self._failures.pop(task_id, None)
+            try:
+                await self.writer({task_id: data})
+                self.rows_written += 1
+            except Exception as e:
+                self.dropped += 1
+                print(f"❌ 任务 {task_id} 的更新连续写入失败{self.max_retries}次，已丢弃: {data} ({str(e)})")
+
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+
+    async def close(self):
+        """停止定时写入并写入剩余更新（应用关闭时调用）"""
+        self._cancel_timer()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        await self.flush()
+        # 最后一次写入失败时不再重试
+        self._cancel_timer()
+
+    def stats(self) -> Dict[str, Any]:
+        """写回缓冲统计信息"""
+        return {
+            "pending_tasks": len(self._pending),
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped
+        }
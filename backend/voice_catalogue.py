@@ -0,0 +1,89 @@
+"""
+音色目录缓存模块
+在内存中缓存对外展示的音色列表，按TTL或显式失效后才重新加载；
+ETag只由列表内容摘要生成，多进程部署下各worker对相同内容给出相同的ETag
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 目录缓存有效期（秒）
+VOICE_CATALOGUE_TTL = float(os.getenv("VOICE_CATALOGUE_TTL", "60"))
+
+# 目录加载函数：返回对外展示的音色列表
+CatalogueLoader = Callable[[], Awaitable[List[Dict]]]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断客户端的If-None-Match是否与ETag一致（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+class VoiceCatalogue:
+    """带TTL的音色目录"""
+
+    def __init__(self, loader: CatalogueLoader, ttl: float = VOICE_CATALOGUE_TTL):
+        self.loader = loader
+        self.ttl = ttl
+
+        # (音色列表, ETag) 快照，整体替换，列表与ETag始终对应同一份内容
+        self._snapshot: Tuple[List[Dict], str] = ([], "")
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self.changes = 0
+        self.hits = 0
+        self.reloads = 0
+
+    async def get(self) -> Tuple[List[Dict], str]:
+        """返回 (音色列表, ETag)，缓存过期时重新加载（并发请求只加载一次）"""
+        if time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # 等锁期间其他请求可能已完成加载
+            if time.monotonic() >= self._expires_at:
+                self._update(await self.loader())
+                self._expires_at = time.monotonic() + self.ttl
+                self.reloads += 1
+            else:
+                self.hits += 1
+
+        return self._snapshot
+
+    def _update(self, voices: List[Dict]):
+        digest = hashlib.sha256(
+            json.dumps(voices, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        etag = f'"{digest[:32]}"'
+        if etag != self._snapshot[1]:
+            self._snapshot = (voices, etag)
+            self.changes += 1
+
+    def invalidate(self):
+        """标记目录已过期，下次读取时重新加载"""
+        self._expires_at = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        """目录缓存统计信息"""
+        return {
+            "etag": self._snapshot[1],
+            "changes": self.changes,
+            "voices": len(self._snapshot[0]),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "reloads": self.reloads
+        }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+模拟数据库性能测试脚本
+对比查询结果的两种构造方式：每次调用动态创建类（旧实现）与固定__slots__记录类，
+并测量MockDatabase常用操作的单次耗时
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import database  # noqa: E402
+
+ITERATIONS = 20000
+REPEATS = 5
+SEED_VOICES = 1000
+
+
+def best_of(func, iterations: int = ITERATIONS) -> float:
+    """返回最优一次的单次耗时（微秒）"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+async def async_best_of(func, iterations: int = ITERATIONS) -> float:
+    """异步版本的best_of"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+async def seed(db) -> str:
+    user = await db.user.create({"email": "bench@example.com", "wechatOpenId": "wx_bench"})
+    for i in range(SEED_VOICES):
+        await db.voice.create({
+            "name": f"音色{i}",
+            "userId": user.id if i % 10 == 0 else f"other_{i % 7}",
+            "status": "COMPLETED" if i % 3 else "PENDING",
+            "audioUrl": f"https://example.com/{i}.wav",
+            "audioSize": 1024,
+            "audioDuration": 10.0,
+            "audioFormat": "wav"
+        })
+    return user.id
+
+
+async def main():
+    print("🔍 模拟数据库性能测试")
+    print(f"每项 {ITERATIONS} 次，重复 {REPEATS} 次取最优，预置 {SEED_VOICES} 个音色\n")
+
+    db = database.MockDatabase()
+    user_id = await seed(db)
+    stored = next(iter(database._memory_db["voices"].values()))
+    voice_id = stored["id"]
+
+    print("记录构造（单次，微秒）")
+    legacy = best_of(lambda: type('Voice', (), stored)())
+    slotted = best_of(lambda: database.Voice(stored))
+    print(f"{'动态类 type()':>16} {legacy:>8.2f}")
+    print(f"{'__slots__记录':>16} {slotted:>8.2f}   {legacy / slotted:.1f}x\n")
+
+    print("MockDatabase操作（单次，微秒）")
+    operations = [
+        ("user.find_unique(email)", lambda: db.user.find_unique({"email": "bench@example.com"})),
+        ("voice.find_unique(id)", lambda: db.voice.find_unique({"id": voice_id})),
+        ("voice.update", lambda: db.voice.update({"id": voice_id}, {"quality": 0.9})),
+        ("voice.find_many(userId)", lambda: db.voice.find_many(
+            where={"userId": user_id}, take=20, order=[{"createdAt": "desc"}])),
+        ("voice.count(status)", lambda: db.voice.count({"status": "COMPLETED"})),
+    ]
+    for name, operation in operations:
+        elapsed = await async_best_of(operation, ITERATIONS // 10)
+        print(f"{name:>26} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
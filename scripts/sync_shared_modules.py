@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+共享模块同步脚本
+backend、ai-service、api/tts 分别独立部署，无法导入同一个包，
+共享模块以 shared/ 下的文件为唯一来源，复制到各服务目录；
+--check 只检查副本是否与来源一致（CI使用），不一致时以非零状态退出
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 共享模块 -> 副本所在目录
+SHARED_MODULES = {
+    "task_store.py": ["backend", "ai-service", "api/tts"],
+    "media_files.py": ["backend", "ai-service"],
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="同步 shared/ 下的共享模块到各服务目录")
+    parser.add_argument("--check", action="store_true", help="只检查副本是否一致，不写入")
+    args = parser.parse_args()
+
+    stale = []
+    for module, targets in SHARED_MODULES.items():
+        source = (ROOT / "shared" / module).read_bytes()
+        for target in targets:
+            path = ROOT / target / module
+            if path.exists() and path.read_bytes() == source:
+                continue
+            relative = path.relative_to(ROOT)
+            if args.check:
+                stale.append(str(relative))
+            else:
+                path.write_bytes(source)
+                print(f"✅ 已同步 {relative}")
+
+    if stale:
+        print("❌ 以下副本与 shared/ 不一致，请修改 shared/ 下的文件后运行 python scripts/sync_shared_modules.py：")
+        for path in stale:
+            print(f"   {path}")
+        return 1
+
+    if args.check:
+        print("✅ 共享模块副本一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())